@@ -14,6 +14,10 @@ Strategy:
    - UBL-Signature-Entities-{version}.gc
    - UBL-Endorsed-Entities-{version}.gc
 5. Version transitions use git mv to preserve file provenance
+6. Commits go through git add/commit in the work tree, through batched git
+   plumbing with --git-session, through a single git fast-import stream
+   with --fast-import, or through an asyncio pipeline that overlaps the
+   build with git with --pipeline (same commits in every case)
 """
 
 import subprocess
@@ -22,17 +26,28 @@ import os
 import tempfile
 import shutil
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Union
 import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
 
 # Add lib directory to path
 sys.path.insert(0, str(Path(__file__).parent / 'lib'))
 
-from release_manifest import RELEASES, get_release_pairs
-from gc_diff import GCDiff, GCFileState
+from release_manifest import (RELEASES, build_content_hashes, get_release_file, get_release_pairs,
+                              get_source_path, get_target_name)
+from gc_diff import GCDiff, GCFileState, compute_changes
+from gc_fast_import import FastImportStream
+from gc_git import GitSession
+from gc_pipeline import CommitPipeline
+from gc_planner import format_plan, plan_history
 from gc_analyzer import GCAnalyzer
 from gc_builder import GCBuilder
 from gc_commit_builder import GCCommitBuilder
+from gc_loader import get_persistent_cache, load_gc_file, set_persistent_cache
+from gc_cache import ReleaseCache
+from gc_writer import IncrementalWriter
 
 DEFAULT_BRANCH = "history"
 
@@ -40,11 +55,59 @@ DEFAULT_BRANCH = "history"
 class HistoryBuilder:
     """Orchestrates the building of git history from UBL releases"""
 
-    def __init__(self, repo_root: str, work_dir: str, dry_run: bool = False):
+    def __init__(self, repo_root: str, work_dir: str, dry_run: bool = False,
+                 row_level: bool = False, fast_import: bool = False,
+                 git_session: bool = False, jobs: int = 1, pipeline: bool = False):
         self.repo_root = Path(repo_root)
         self.work_dir = Path(work_dir)
-        self.dry_run = dry_run
+        self.dry_run = dry_run  # build() only prints the gc_planner plan
+        self.row_level = row_level  # Row-level patches for modified ABIEs
         self.commits_created = 0
+        self._content_hashes = None  # Release file path -> SHA-256, built on first use
+
+        # With jobs > 1 (and always with the pipeline, as its diff stage),
+        # build() computes diffs ahead in a process pool
+        # while commits are made in manifest order
+        self.jobs = jobs
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._workers = 0  # Processes in the pool
+        self._diff_queue: deque = deque()  # (old_file, new_file) not yet submitted
+        self._diff_futures: dict = {}  # (old_file, new_file) -> Future
+
+        # Commit through one `git fast-import` process instead of per-commit
+        # git add/commit; the work tree is only updated by finish()
+        self.stream: Optional[Union[FastImportStream, CommitPipeline]] = None
+        if fast_import and not dry_run:
+            self.stream = FastImportStream(str(self.work_dir))
+
+        # Or run the build in a producer thread feeding asyncio store/commit
+        # stages (set up by build(); same interface as the stream)
+        self.pipeline = pipeline and not dry_run and not fast_import
+
+        # Or stage in memory and commit through persistent git plumbing
+        # processes; the index is only refreshed by finish()
+        self.session: Optional[GitSession] = None
+        if git_session and not dry_run and not fast_import and not self.pipeline:
+            self.session = GitSession(str(self.work_dir))
+
+    def finish(self) -> None:
+        """Close the commit backend and bring the work tree/index up to date"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.stream is None:
+            return
+        self.stream.close()
+        kind = "pipeline" if isinstance(self.stream, CommitPipeline) else "fast-import"
+        print(f"{kind}: {self.stream.commits} commits, "
+              f"{self.stream.bytes_sent / 1e6:.1f} MB of file content")
+        self.stream = None
+        subprocess.run(
+            ["git", "reset", "-q", "--hard"],
+            cwd=self.work_dir,
+            check=True,
+            capture_output=True,
+        )
 
     def get_source_path(
         self, release: dict, file_type: str
@@ -58,20 +121,68 @@ class HistoryBuilder:
         Returns:
             Path to source file, or None if not applicable
         """
-        if file_type == "entities":
-            key = "entities_file"
-        elif file_type == "signature":
-            key = "signature_file"
-        elif file_type == "endorsed":
-            key = "endorsed_file"
-        else:
-            raise ValueError(f"Unknown file type: {file_type}")
-
-        filename = release.get(key)
-        if filename is None:
-            return None
-
-        return self.repo_root / release["dir"] / filename
+        return get_source_path(self.repo_root, release, file_type)
+
+    def get_content_hash(self, release: dict, file_type: str) -> Optional[str]:
+        """SHA-256 of a release file from the manifest's content-hash table."""
+        if self._content_hashes is None:
+            self._content_hashes = build_content_hashes(self.repo_root)
+        return self._content_hashes.get(get_release_file(release, file_type) or "")
+
+    def needs_diff(self, old_rel: dict, new_rel: dict, file_type: str) -> bool:
+        """Whether a file exists in both releases with different content."""
+        old_file = self.get_source_path(old_rel, file_type)
+        new_file = self.get_source_path(new_rel, file_type)
+        if old_file is None or new_file is None:
+            return False
+        old_hash = self.get_content_hash(old_rel, file_type)
+        return old_hash is None or old_hash != self.get_content_hash(new_rel, file_type)
+
+    def _start_diff_pool(self, pairs: List[Tuple[dict, dict]]) -> None:
+        """Queue every diff of pairs for computation in worker processes."""
+        # The pipeline's diff stage is this pool, so it always has a worker
+        workers = max(self.jobs, 1) if self.pipeline else self.jobs
+        if workers <= 1 and not self.pipeline:
+            return
+        self._workers = workers
+        self._diff_queue = deque(
+            (str(self.get_source_path(old_rel, file_type)),
+             str(self.get_source_path(new_rel, file_type)))
+            for old_rel, new_rel in pairs
+            for file_type in ["entities", "signature", "endorsed"]
+            if self.needs_diff(old_rel, new_rel, file_type)
+        )
+        # spawn, not fork: forked workers would inherit the pipes of the
+        # git fast-import / plumbing processes and keep them open
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=set_persistent_cache,
+            initargs=(get_persistent_cache(),),
+        )
+        print(f"Computing {len(self._diff_queue)} diffs with {workers} workers")
+        self._fill_diff_pool()
+
+    def _fill_diff_pool(self) -> None:
+        # Results wait in memory until committed, so only run a few ahead
+        while self._diff_queue and len(self._diff_futures) < 2 * self._workers:
+            key = self._diff_queue.popleft()
+            self._diff_futures[key] = self._pool.submit(compute_changes, *key, self.row_level)
+
+    def _stop_diff_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._diff_queue.clear()
+        self._diff_futures.clear()
+
+    def _compute_changes(self, differ: GCDiff) -> list:
+        """The differ's changes, from the worker pool if it computed them."""
+        future: Optional[Future] = self._diff_futures.pop((differ.old_file, differ.new_file), None)
+        if future is None:
+            return differ.compute()
+        self._fill_diff_pool()
+        return differ.attach(future.result())
 
     @staticmethod
     def get_target_name(file_type: str, version: str) -> str:
@@ -80,14 +191,7 @@ class HistoryBuilder:
         Preserves the original OASIS naming convention with version numbers.
         At version transitions, git mv is used to rename the file.
         """
-        if file_type == "entities":
-            return f"UBL-Entities-{version}.gc"
-        elif file_type == "signature":
-            return f"UBL-Signature-Entities-{version}.gc"
-        elif file_type == "endorsed":
-            return f"UBL-Endorsed-Entities-{version}.gc"
-        else:
-            raise ValueError(f"Unknown file type: {file_type}")
+        return get_target_name(file_type, version)
 
     def set_git_env(self, release: dict) -> dict:
         """Set git environment variables for commit author/date."""
@@ -102,12 +206,30 @@ class HistoryBuilder:
         return env
 
     def git_add_and_commit(
-        self, filename: str, message: str, release: dict, env: dict
+        self, filename: str, message: str, release: dict, env: dict,
+        content=None,
     ) -> None:
-        """Add a file and create a git commit with proper author/date."""
-        if self.dry_run:
-            print(f"  [DRY-RUN] git add {filename}")
-            print(f"  [DRY-RUN] git commit: {message.splitlines()[0]}")
+        """Add a file and create a git commit with proper author/date.
+
+        content (bytes, a source Path or TextBlocks) is only used with the
+        fast-import stream or the pipeline; otherwise the file must already
+        be in the work tree.
+        """
+        if self.stream is not None:
+            if content is None:
+                content = self.work_dir / filename
+            if self.stream.commit(message, env, modify={filename: content}):
+                self.commits_created += 1
+            else:
+                print(f"    Skipping no-op commit: {message.splitlines()[0]}")
+            return
+
+        if self.session is not None:
+            self.session.add(filename)
+            if self.session.commit(message, env):
+                self.commits_created += 1
+            else:
+                print(f"    Skipping no-op commit: {message.splitlines()[0]}")
             return
 
         subprocess.run(
@@ -166,8 +288,11 @@ class HistoryBuilder:
 
     def git_commit_staged(self, message: str, release: dict, env: dict) -> None:
         """Commit whatever is already staged (used after git rm)."""
-        if self.dry_run:
-            print(f"  [DRY-RUN] git commit: {message.splitlines()[0]}")
+        if self.session is not None:
+            if self.session.commit(message, env):
+                self.commits_created += 1
+            else:
+                print(f"    Skipping no-op commit: {message.splitlines()[0]}")
             return
 
         subprocess.run(
@@ -183,23 +308,26 @@ class HistoryBuilder:
         self, old_name: str, new_name: str, release: dict, env: dict
     ) -> None:
         """Rename a file using git mv and commit the rename."""
-        if self.dry_run:
-            print(f"  [DRY-RUN] git mv {old_name} {new_name}")
-            print(f"  [DRY-RUN] git commit: Rename {old_name} -> {new_name}")
-            self.commits_created += 1
-            return
-
-        subprocess.run(
-            ["git", "mv", old_name, new_name],
-            cwd=self.work_dir,
-            check=True,
-            capture_output=True,
-        )
-
         version = release["version"]
         stage = release["stage"].upper()
         msg = (f"UBL {version} {stage}: Rename {old_name} to {new_name}\n\n"
                f"Release: {release['label']}\nDate: {release['date']}")
+
+        if self.stream is not None:
+            if not self.stream.commit(msg, env, rename={old_name: new_name}):
+                raise ValueError(f"Cannot rename {old_name}: not in the branch")
+            self.commits_created += 1
+            return
+
+        if self.session is not None:
+            self.session.move(old_name, new_name)
+        else:
+            subprocess.run(
+                ["git", "mv", old_name, new_name],
+                cwd=self.work_dir,
+                check=True,
+                capture_output=True,
+            )
         self.git_commit_staged(msg, release, env)
 
     def process_first_release(
@@ -218,15 +346,10 @@ class HistoryBuilder:
 
         target_name = self.get_target_name("entities", release["version"])
 
-        if self.dry_run:
-            print(f"  [DRY-RUN] Would analyze {source_file}")
-            print(f"  [DRY-RUN] Would create ~131 ABIE-by-ABIE commits to {target_name}")
-            self.commits_created += 131
-            return
-
         # Analyze source file
         print(f"  Analyzing {source_file.name}...")
-        analyzer = GCAnalyzer(str(source_file))
+        document = load_gc_file(str(source_file))
+        analyzer = GCAnalyzer(str(source_file), document=document)
         analyzer.parse()
         analyzer.build_abies()
         analyzer.build_dependency_graph()
@@ -244,7 +367,10 @@ class HistoryBuilder:
         try:
             # Create commits using GCCommitBuilder
             print(f"  Creating {len(steps) + 1} commits...")
-            commit_builder = GCCommitBuilder(str(source_file), target_name, str(self.work_dir))
+            commit_builder = GCCommitBuilder(
+                str(source_file), target_name, str(self.work_dir), document=document,
+                fast_import=self.stream, git_session=self.session,
+            )
             commit_builder.analyzer_abies = analyzer.abies
 
             # Create initial empty file
@@ -308,6 +434,18 @@ class HistoryBuilder:
                         old_target, new_target, new_rel, env
                     )
 
+                # Byte-identical files need no parsing or diffing at all
+                if not self.needs_diff(old_rel, new_rel, file_type):
+                    print(f"  {new_target}: identical to {old_rel['stage'].upper()} - skipping")
+                    continue
+
+                # Known hashes let the loader reuse an already parsed document
+                # (and its state) with the same content
+                for path, rel in ((old_file, old_rel), (new_file, new_rel)):
+                    digest = self.get_content_hash(rel, file_type)
+                    if digest is not None:
+                        load_gc_file(str(path), digest)
+
                 self._diff_and_commit(
                     old_file, new_file, new_target, old_rel, new_rel
                 )
@@ -329,19 +467,14 @@ class HistoryBuilder:
         self, new_file: Path, target_name: str, release: dict
     ) -> None:
         """Add a small file (Signature-Entities) in one commit."""
-        if self.dry_run:
-            print(f"    [DRY-RUN] Copy {new_file.name} -> {target_name}")
-            self.commits_created += 1
-            return
-
-        target_path = self.work_dir / target_name
-        shutil.copy2(new_file, target_path)
+        if self.stream is None:
+            shutil.copy2(new_file, self.work_dir / target_name)
 
         env = self.set_git_env(release)
         version = release["version"]
         stage = release["stage"].upper()
         msg = f"UBL {version} {stage}: Add {target_name}\n\nRelease: {release['label']}\nDate: {release['date']}"
-        self.git_add_and_commit(target_name, msg, release, env)
+        self.git_add_and_commit(target_name, msg, release, env, content=new_file)
 
     def _add_large_file(
         self, new_file: Path, target_name: str, release: dict
@@ -349,13 +482,8 @@ class HistoryBuilder:
         """Add a large file (Endorsed-Entities) using ABIE-by-ABIE creation."""
         print(f"    Using ABIE-by-ABIE creation for {target_name}")
 
-        if self.dry_run:
-            print(f"    [DRY-RUN] Would analyze {new_file.name}")
-            print(f"    [DRY-RUN] Would create multiple ABIE commits")
-            self.commits_created += 10  # Rough estimate
-            return
-
-        analyzer = GCAnalyzer(str(new_file))
+        document = load_gc_file(str(new_file))
+        analyzer = GCAnalyzer(str(new_file), document=document)
         analyzer.parse()
         analyzer.build_abies()
         analyzer.build_dependency_graph()
@@ -369,7 +497,10 @@ class HistoryBuilder:
         old_env = self._set_git_env_global(release)
 
         try:
-            commit_builder = GCCommitBuilder(str(new_file), target_name, str(self.work_dir))
+            commit_builder = GCCommitBuilder(
+                str(new_file), target_name, str(self.work_dir), document=document,
+                fast_import=self.stream, git_session=self.session,
+            )
             commit_builder.analyzer_abies = analyzer.abies
 
             # Create initial empty file
@@ -393,9 +524,21 @@ class HistoryBuilder:
         """Remove a file from the history."""
         print(f"  Removing file: {target_name}")
 
-        if self.dry_run:
-            print(f"    [DRY-RUN] git rm {target_name}")
-            self.commits_created += 1
+        env = self.set_git_env(release)
+        version = release["version"]
+        stage = release["stage"].upper()
+        msg = (f"UBL {version} {stage}: Remove {target_name}\n\n"
+               f"Release: {release['label']}\nDate: {release['date']}")
+
+        if self.stream is not None:
+            if self.stream.commit(msg, env, delete=[target_name]):
+                self.commits_created += 1
+            return
+
+        if self.session is not None:
+            if self.session.exists(target_name):
+                self.session.remove(target_name)
+                self.git_commit_staged(msg, release, env)
             return
 
         target_path = self.work_dir / target_name
@@ -406,12 +549,6 @@ class HistoryBuilder:
                 check=True,
                 capture_output=True,
             )
-
-            env = self.set_git_env(release)
-            version = release["version"]
-            stage = release["stage"].upper()
-            msg = (f"UBL {version} {stage}: Remove {target_name}\n\n"
-                   f"Release: {release['label']}\nDate: {release['date']}")
             self.git_commit_staged(msg, release, env)
 
     def _diff_and_commit(
@@ -425,13 +562,8 @@ class HistoryBuilder:
         """Compute diff and create commits for each change."""
         print(f"  Diffing {target_name}...")
 
-        if self.dry_run:
-            print(f"    [DRY-RUN] Would compute diff for {target_name}")
-            self.commits_created += 1  # Conservative estimate
-            return
-
-        differ = GCDiff(str(old_file), str(new_file))
-        changes = differ.compute()
+        differ = GCDiff(str(old_file), str(new_file), row_level=self.row_level)
+        changes = self._compute_changes(differ)
 
         if not changes:
             # No changes - skip commit (file is identical to previous release)
@@ -440,27 +572,37 @@ class HistoryBuilder:
             print(f"    {target_name}: No changes from {old_rel['stage'].upper()} - skipping")
             return
 
-        # Apply changes incrementally
-        state = GCDiff.parse_file(str(old_file))
+        # Apply changes incrementally, starting from the already-loaded old state.
+        # The work tree file holds the old release, so each change only
+        # rewrites the bytes from the first affected block on. With
+        # fast-import the state's blocks are streamed instead.
+        state = differ.old_state
         env = self.set_git_env(new_rel)
         version = new_rel["version"]
         stage = new_rel["stage"].upper()
+        writer = None
+        if self.stream is None:
+            writer = IncrementalWriter(self.work_dir / target_name, state)
 
         for i, change in enumerate(changes, 1):
             # Apply the change
             state = differ.apply_change(state, change)
 
             # Write the updated state
-            target_path = self.work_dir / target_name
-            GCDiff.write_state(state, str(target_path))
+            content = None
+            if writer is not None:
+                writer.write(state, change)
+            else:
+                content = state.text_blocks()
 
             # Create commit
             msg = (f"UBL {version} {stage}: {change.description}\n\n"
                    f"Release: {new_rel['label']}\nFile: {target_name}\n"
                    f"Date: {new_rel['date']}")
-            self.git_add_and_commit(target_name, msg, new_rel, env)
+            self.git_add_and_commit(target_name, msg, new_rel, env, content=content)
 
-        print(f"    Created {len(changes)} commits for {target_name}")
+        written = f" ({writer.bytes_written / 1e6:.1f} MB written)" if writer else ""
+        print(f"    Created {len(changes)} commits for {target_name}{written}")
 
     def build(self, start_at: int = 0) -> None:
         """Build the entire history starting from a specific release index."""
@@ -471,23 +613,48 @@ class HistoryBuilder:
         print(f"Processing {len(RELEASES)} releases...")
         print(f"Starting at index {start_at}")
 
-        # Process first release separately
-        if start_at == 0:
-            self.process_first_release(RELEASES[0])
-
-        # Process remaining releases as transitions
-        for old_rel, new_rel in get_release_pairs():
-            old_idx = RELEASES.index(old_rel)
-            if old_idx < start_at:
-                continue
-
-            self.process_transition(old_rel, new_rel)
+        if self.dry_run:
+            # The planner runs the real analysis and diffs without git, so
+            # its counts are the ones a real build would produce
+            plans = plan_history(self.repo_root, start_at=start_at, workers=self.jobs,
+                                 row_level=self.row_level)
+            print(format_plan(plans, verbose=True))
+            self.commits_created = sum(plan.commits for plan in plans)
+        elif self.pipeline:
+            self.stream = CommitPipeline(str(self.work_dir))
+            self.stream.run(self._process_releases, start_at)
+        else:
+            self._process_releases(start_at)
 
         print("\n" + "=" * 70)
         print("BUILD COMPLETE")
         print("=" * 70)
         print(f"Total commits created: {self.commits_created}")
 
+    def _process_releases(self, start_at: int) -> None:
+        """Make every commit from start_at on, then finish() (also on failure)."""
+        pairs = [(old_rel, new_rel) for old_rel, new_rel in get_release_pairs()
+                 if RELEASES.index(old_rel) >= start_at]
+
+        # Diffs do not depend on earlier commits, so they can be computed
+        # ahead in parallel; commits are still made strictly in order
+        self._start_diff_pool(pairs)
+        try:
+            # Process first release separately
+            if start_at == 0:
+                self.process_first_release(RELEASES[0])
+
+            # Process remaining releases as transitions
+            for old_rel, new_rel in pairs:
+                self.process_transition(old_rel, new_rel)
+        finally:
+            try:
+                self._stop_diff_pool()
+            finally:
+                # Even after a failure, so the commits made so far end up on
+                # the branch and --keep-work-dir / --start-at can resume
+                self.finish()
+
 
 def setup_work_dir(repo_root: Path, branch_name: str) -> Path:
     """Create temporary directory and clone repo."""
@@ -626,7 +793,15 @@ def main():
     parser.add_argument(
         "--dry-run",
         action="store_true",
-        help="Print what would be done without creating commits",
+        help="Plan the build (exact commit and byte counts, projected time) "
+             "without cloning or running git",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for computing diffs and --dry-run planning "
+             "(default: 1, diffs computed inline)",
     )
     parser.add_argument(
         "--push",
@@ -638,6 +813,37 @@ def main():
         action="store_true",
         help="Keep temporary work directory for inspection",
     )
+    parser.add_argument(
+        "--row-diff",
+        action="store_true",
+        help="Diff modified ABIEs row by row (row counts in commit subjects)",
+    )
+    parser.add_argument(
+        "--fast-import",
+        action="store_true",
+        help="Stream all commits through one git fast-import process",
+    )
+    parser.add_argument(
+        "--git-session",
+        action="store_true",
+        help="Stage in memory and commit via persistent git plumbing processes",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap the build with git in asyncio store and commit stages",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse parsed releases from the on-disk (pickle) cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for the parsed-release cache; implies --cache "
+             "(default: $XDG_CACHE_HOME/ubl-gc or ~/.cache/ubl-gc)",
+    )
 
     args = parser.parse_args()
 
@@ -654,15 +860,36 @@ def main():
 
     print(f"Target branch: {args.branch}")
 
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = ReleaseCache(args.cache_dir)
+        set_persistent_cache(cache)
+        print(f"Release cache: {cache.cache_dir}")
+
+    jobs = max(args.jobs, 1)
+    if args.dry_run:
+        # Run the real analysis and diffs, but no git at all (so no work dir)
+        builder = HistoryBuilder(repo_root, str(repo_root), dry_run=True,
+                                 row_level=args.row_diff, jobs=jobs)
+        builder.build(start_at=args.start_at)
+        return
+
     work_dir = None
     try:
         work_dir = setup_work_dir(repo_root, args.branch)
 
-        builder = HistoryBuilder(repo_root, work_dir, dry_run=args.dry_run)
+        builder = HistoryBuilder(repo_root, work_dir,
+                                 row_level=args.row_diff,
+                                 fast_import=args.fast_import,
+                                 git_session=args.git_session,
+                                 pipeline=args.pipeline,
+                                 jobs=jobs)
         builder.build(start_at=args.start_at)
 
-        if not args.dry_run:
-            push_results(work_dir, args.branch, do_push=args.push)
+        if cache is not None:
+            print(f"Release cache: {cache.hits} hits, {cache.misses} misses")
+
+        push_results(work_dir, args.branch, do_push=args.push)
 
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
@@ -5,17 +5,23 @@ GenericCode File Analyzer
 Analyzes UBL GenericCode (.gc) files to:
 1. Parse the semantic model structure
 2. Build dependency graphs between ABIEs
-3. Find strongly connected components (Tarjan's algorithm)
+3. Find strongly connected components (iterative Tarjan over integer node ids)
 4. Produce topological ordering of SCC-condensed DAG
 5. Determine optimal ABIE-group insertion order for git history
+
+Rows come from the XML (streamed), a loaded GCDocument, or a
+gc_columnar.ColumnarRelease (the columnar backend).
 """
 
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Optional
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Set, Optional
 from collections import defaultdict
 import sys
 
+from gc_graph import CSRGraph, condense, tarjan_scc, topological_order
+from gc_loader import ORPHANED_ROWS, GCDocument, attach, persist
+
 
 @dataclass
 class Row:
@@ -27,7 +33,7 @@ class Row:
     property_term: Optional[str] = None
     associated_object_class: Optional[str] = None  # For ASBIEs
     cardinality: Optional[str] = None
-    xml_data: ET.Element = None  # Original XML element
+    xml_data: ET.Element = None  # Original XML element (only kept on request)
 
     def __hash__(self):
         return hash((self.row_num, self.dictionary_entry_name))
@@ -64,8 +70,11 @@ class SCCGroup:
 class GCAnalyzer:
     """Analyzes GenericCode files and builds dependency graphs"""
 
-    def __init__(self, gc_file_path: str):
+    def __init__(self, gc_file_path: str, document: Optional[GCDocument] = None,
+                 columnar: Optional[object] = None):
         self.file_path = gc_file_path
+        self.document = document  # Pre-loaded file shared with GCDiff/GCCommitBuilder
+        self.columnar = columnar  # gc_columnar.ColumnarRelease to analyse instead of the file
         self.tree = None
         self.root = None
         self.rows: List[Row] = []
@@ -73,23 +82,91 @@ class GCAnalyzer:
         self.dependency_graph: Dict[str, Set[str]] = defaultdict(set)
         self.sccs: List[SCCGroup] = []
         self.scc_order: List[SCCGroup] = []  # Topologically sorted
+        self._node_names: List[str] = []  # Node id -> object class (sorted)
+        self._graph: Optional[CSRGraph] = None
+        self._cached: Optional[dict] = None  # Analysis reused from the document
+
+    def parse(self, streaming: bool = True, keep_xml_data: bool = False) -> None:
+        """Parse the GenericCode XML file
+
+        Args:
+            streaming: Read rows incrementally with iterparse and discard each
+                      <Row> element once it has been converted. When False the
+                      whole document is loaded and kept in self.tree/self.root.
+            keep_xml_data: Keep each row's XML element in Row.xml_data.
+                          Always true for non-streaming parses, where the DOM
+                          is retained anyway.
+
+        If the analyzer was created with a GCDocument, rows are built from
+        its already-parsed values (or taken from its cached analysis) and
+        the file is not read again. With a ColumnarRelease (the columnar
+        backend), rows are built from its arrays and share its interned
+        strings.
+        """
+        if self.columnar is not None:
+            self.rows.extend(self.columnar.rows())
+        elif self.document is not None and self.document.analysis:
+            self._cached = self.document.analysis
+            self.rows.extend(self._cached['rows'])
+        elif self.document is not None:
+            self.rows.extend(self._rows_from_document(self.document))
+        elif streaming:
+            for row_data in self.iter_rows(keep_xml_data=keep_xml_data):
+                self.rows.append(row_data)
+        else:
+            self.tree = ET.parse(self.file_path)
+            self.root = self.tree.getroot()
+
+            # Parse all rows
+            row_elements = self.root.findall('.//Row')
+
+            for idx, row_elem in enumerate(row_elements, start=1):
+                row_data = self._parse_row(row_elem, idx)
+                if row_data:
+                    self.rows.append(row_data)
+
+        print(f"Parsed {len(self.rows)} rows from {self.file_path}")
+
+    def iter_rows(self, keep_xml_data: bool = False) -> Iterator[Row]:
+        """
+        Stream Row objects from the file using iterparse.
+
+        Each <Row> element is detached from its parent and cleared as soon as
+        it has been converted, so memory stays bounded by a single row instead
+        of the whole DOM. Row numbers match the non-streaming parse.
+        """
+        row_num = 0
+        container = None  # <SimpleCodeList> holding the rows
 
-    def parse(self) -> None:
-        """Parse the GenericCode XML file"""
-        self.tree = ET.parse(self.file_path)
-        self.root = self.tree.getroot()
+        for event, elem in ET.iterparse(self.file_path, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'SimpleCodeList':
+                    container = elem
+                continue
+            if elem.tag != 'Row':
+                continue
 
-        # Parse all rows
-        row_elements = self.root.findall('.//Row')
+            row_num += 1
+            row_data = self._parse_row(elem, row_num, keep_xml_data=keep_xml_data)
+
+            if container is not None:
+                container.remove(elem)
+            if not keep_xml_data:
+                elem.clear()
 
-        for idx, row_elem in enumerate(row_elements, start=1):
-            row_data = self._parse_row(row_elem, idx)
             if row_data:
-                self.rows.append(row_data)
+                yield row_data
 
-        print(f"Parsed {len(self.rows)} rows from {self.file_path}")
+    @staticmethod
+    def _rows_from_document(document: GCDocument) -> Iterator[Row]:
+        """Build Row objects from a loaded GCDocument's row values"""
+        for row_num, values in document.row_values.items():
+            row_data = GCAnalyzer._row_from_values(values, row_num)
+            if row_data:
+                yield row_data
 
-    def _parse_row(self, row_elem: ET.Element, row_num: int) -> Optional[Row]:
+    def _parse_row(self, row_elem: ET.Element, row_num: int,
+                   keep_xml_data: bool = True) -> Optional[Row]:
         """Parse a single row element"""
         values = {}
         for value_elem in row_elem.findall('Value'):
@@ -98,6 +175,14 @@ class GCAnalyzer:
             if simple_value is not None and simple_value.text:
                 values[col_ref] = simple_value.text.strip()
 
+        row_data = self._row_from_values(values, row_num)
+        if row_data and keep_xml_data:
+            row_data.xml_data = row_elem
+        return row_data
+
+    @staticmethod
+    def _row_from_values(values: Dict[str, str], row_num: int) -> Optional[Row]:
+        """Build a Row from its ColumnRef -> value mapping"""
         component_type = values.get('ComponentType', '').strip()
         if not component_type:
             return None
@@ -110,7 +195,6 @@ class GCAnalyzer:
             property_term=values.get('PropertyTerm'),
             associated_object_class=values.get('AssociatedObjectClass'),
             cardinality=values.get('Cardinality'),
-            xml_data=row_elem
         )
 
     def build_abies(self) -> None:
@@ -155,42 +239,16 @@ class GCAnalyzer:
         Find strongly connected components using Tarjan's algorithm.
         Returns SCCs in reverse topological order (leaves first).
         """
-        index_counter = [0]
-        stack = []
-        lowlink = {}
-        index = {}
-        on_stack = {}
-        sccs_raw = []
-
-        def strongconnect(v):
-            index[v] = index_counter[0]
-            lowlink[v] = index_counter[0]
-            index_counter[0] += 1
-            stack.append(v)
-            on_stack[v] = True
-
-            for w in self.dependency_graph.get(v, set()):
-                if w not in self.abies:
-                    continue
-                if w not in index:
-                    strongconnect(w)
-                    lowlink[v] = min(lowlink[v], lowlink[w])
-                elif on_stack.get(w, False):
-                    lowlink[v] = min(lowlink[v], index[w])
-
-            if lowlink[v] == index[v]:
-                scc = []
-                while True:
-                    w = stack.pop()
-                    on_stack[w] = False
-                    scc.append(w)
-                    if w == v:
-                        break
-                sccs_raw.append(scc)
-
-        for v in sorted(self.abies.keys()):
-            if v not in index:
-                strongconnect(v)
+        cached = self._cached_analysis()
+        if cached:
+            self.sccs = cached['sccs']
+            print(f"Found {len(self.sccs)} SCCs ({sum(1 for s in self.sccs if s.is_cycle)} with cycles)")
+            return self.sccs
+
+        # Nodes are numbered in sorted name order, so roots and edges are
+        # visited alphabetically
+        graph = self._id_graph()
+        sccs_raw = [[self._node_names[v] for v in scc] for scc in tarjan_scc(graph)]
 
         # Build SCCGroup objects
         self_refs = {oc for oc, abie in self.abies.items()
@@ -216,41 +274,45 @@ class GCAnalyzer:
         if not self.sccs:
             self.find_sccs_tarjan()
 
-        # Map each ABIE to its SCC
-        scc_map = {}
-        for scc in self.sccs:
-            for member in scc.members:
-                scc_map[member] = scc.index
-
-        # Build SCC-level DAG
-        scc_deps = defaultdict(set)
-        for node in self.abies:
-            for ref in self.dependency_graph.get(node, set()):
-                if ref in self.abies and scc_map[node] != scc_map[ref]:
-                    scc_deps[scc_map[node]].add(scc_map[ref])
-
-        # Topological sort via DFS (post-order)
-        visited = set()
-        topo_order = []
-
-        def dfs(n):
-            if n in visited:
-                return
-            visited.add(n)
-            for dep in scc_deps[n]:
-                dfs(dep)
-            topo_order.append(n)
-
-        for scc in self.sccs:
-            dfs(scc.index)
+        cached = self._cached_analysis()
+        if cached:
+            scc_by_index = {scc.index: scc for scc in self.sccs}
+            self.scc_order = [scc_by_index[i] for i in cached['scc_order']]
+            print(f"Topological order: {len(self.scc_order)} groups")
+            return self.scc_order
+
+        # Build the SCC-level DAG and sort it (DFS post-order)
+        graph = self._id_graph()
+        node_ids = {name: i for i, name in enumerate(self._node_names)}
+        _, dag = condense(graph, [[node_ids[m] for m in scc.members] for scc in self.sccs])
+        topo_order = topological_order(dag)
 
         # Map back to SCCGroup objects
         scc_by_index = {scc.index: scc for scc in self.sccs}
         self.scc_order = [scc_by_index[i] for i in topo_order]
 
+        if self.document is not None:
+            attach(self.document, 'analysis', {
+                'rows': self.rows,
+                'sccs': self.sccs,
+                'scc_order': topo_order,
+            })
+            persist(self.document)
+
         print(f"Topological order: {len(self.scc_order)} groups")
         return self.scc_order
 
+    def _id_graph(self) -> CSRGraph:
+        """The dependency graph over integer node ids (sorted object classes)"""
+        if self._graph is None:
+            self._node_names = sorted(self.abies)
+            self._graph = CSRGraph.from_adjacency(self._node_names, self.dependency_graph)
+        return self._graph
+
+    def _cached_analysis(self) -> Optional[dict]:
+        """SCC results cached on the document, if parse() used them"""
+        return self._cached
+
     def get_abie_commit_order(self) -> List[List[ABIE]]:
         """
         Get the optimal commit order: one commit per SCC group.
@@ -312,15 +374,43 @@ class GCAnalyzer:
             print(f"  ... and {len(commit_order) - 10} more")
 
 
+def abie_dependencies(document: GCDocument,
+                      object_classes: Optional[Iterable[str]] = None) -> Dict[str, FrozenSet[str]]:
+    """
+    AssociatedObjectClass references of ABIE groups, read straight from a
+    document's row values (the ABIE.depends_on sets, without building
+    Rows). Defaults to every ABIE in the document.
+    """
+    if object_classes is None:
+        object_classes = document.abie_groups
+    deps = {}
+    for object_class in object_classes:
+        row_nums = document.abie_groups.get(object_class)
+        if object_class == ORPHANED_ROWS or not row_nums:
+            continue
+        rows = [document.row_values[n] for n in row_nums]
+        deps[object_class] = frozenset(
+            values['AssociatedObjectClass'] for values in rows
+            if values.get('ComponentType', '').strip() == 'ASBIE'
+            and values.get('AssociatedObjectClass')
+        )
+    return deps
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: gc_analyzer.py <path-to-gc-file>")
+    args = [arg for arg in sys.argv[1:] if arg != '--columnar']
+    if not args:
+        print("Usage: gc_analyzer.py [--columnar] <path-to-gc-file>")
         sys.exit(1)
 
-    gc_file = sys.argv[1]
+    gc_file = args[0]
     print(f"Analyzing: {gc_file}\n")
 
-    analyzer = GCAnalyzer(gc_file)
+    columnar = None
+    if '--columnar' in sys.argv:
+        from gc_columnar import ColumnarRelease, StringTable
+        columnar = ColumnarRelease.load(gc_file, StringTable())
+    analyzer = GCAnalyzer(gc_file, columnar=columnar)
     analyzer.parse()
     analyzer.build_abies()
     analyzer.build_dependency_graph()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Categorical Column Bitmap Index
+
+Per-release bitmap indexes over the GenericCode columns that take few
+distinct values, so filters such as "optional ASBIEs of type Party" are
+bitwise ANDs and ORs rather than a loop over every Row:
+1. One bitmap per (column, value), with bit i standing for row i + 1 of
+   the file. Values are whitespace-stripped; empty values are not indexed
+2. Roaring-style containers: a value held by many rows is a plain int
+   bitset, a rare one a sorted array of row positions that is only turned
+   into a bitset when a query uses it
+3. select() ANDs its predicates and ORs the values given for one column;
+   bitmap(), invert() and rows() let callers combine bitmaps freely
+
+Each release's bitmaps are kept on its GCDocument (and in the release
+cache), like its DependencyIndex, so they are built once per release.
+"""
+
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_loader import GCDocument, attach, load_gc_file, persist
+
+CATEGORICAL_COLUMNS = ('ComponentType', 'RepresentationTerm', 'DataType', 'Cardinality', 'ModelName',
+                       'ObjectClass', 'AssociatedObjectClass')
+SPARSE_FRACTION = 32  # Values on fewer than 1/32 of the rows are stored as row arrays
+
+Container = Union[int, array]
+
+
+def _bitset(positions: Iterable[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for p in positions:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _positions(bits: int) -> List[int]:
+    """Positions of the set bits, ascending"""
+    positions = []
+    for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            positions.append(i * 8 + low.bit_length() - 1)
+            byte ^= low
+    return positions
+
+
+class ReleaseBitmaps:
+    """Bitmap indexes over the categorical columns of one GenericCode file"""
+
+    def __init__(self, row_count: int, index: Dict[str, Dict[str, Container]]):
+        self.row_count = row_count
+        self.all = (1 << row_count) - 1  # Every row
+        self._index = index  # column -> value -> int bitset or array of positions
+
+    @classmethod
+    def from_document(cls, document: GCDocument,
+                      columns: Iterable[str] = CATEGORICAL_COLUMNS) -> 'ReleaseBitmaps':
+        size = document.row_count
+        index = {}
+        for column in columns:
+            positions: Dict[str, array] = {}
+            for row_num, values in document.row_values.items():
+                value = values.get(column, '').strip()
+                if value:
+                    positions.setdefault(value, array('I')).append(row_num - 1)
+            index[column] = {
+                value: _bitset(rows, size) if len(rows) * SPARSE_FRACTION >= size else rows
+                for value, rows in sorted(positions.items())
+            }
+        return cls(size, index)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._index)
+
+    def _column(self, column: str) -> Dict[str, Container]:
+        if column not in self._index:
+            raise KeyError(f"{column} is not indexed (one of {', '.join(self._index)})")
+        return self._index[column]
+
+    def values(self, column: str) -> Dict[str, int]:
+        """value -> number of rows, for every value of a column"""
+        return {value: c.bit_count() if isinstance(c, int) else len(c)
+                for value, c in self._column(column).items()}
+
+    def bitmap(self, column: str, *values: str) -> int:
+        """Rows whose column has any of the values"""
+        entries = self._column(column)
+        bits = 0
+        for value in values:
+            container = entries.get(value, 0)
+            bits |= container if isinstance(container, int) else _bitset(container, self.row_count)
+        return bits
+
+    def invert(self, bits: int) -> int:
+        return self.all & ~bits
+
+    def select(self, **predicates: Union[str, Iterable[str]]) -> int:
+        """
+        Rows matching every predicate: column=value, or column=(value, ...)
+        for any of several values. No predicates selects every row.
+        """
+        bits = self.all
+        for column, values in predicates.items():
+            bits &= self.bitmap(column, *([values] if isinstance(values, str) else values))
+            if not bits:
+                break
+        return bits
+
+    @staticmethod
+    def rows(bits: int) -> List[int]:
+        """The row numbers (1-based) in a bitmap"""
+        return [p + 1 for p in _positions(bits)]
+
+
+def release_bitmaps(document: GCDocument) -> ReleaseBitmaps:
+    """The document's bitmaps, built (and cached on it) on first use"""
+    if document.bitmaps is None:
+        attach(document, 'bitmaps', ReleaseBitmaps.from_document(document))
+        persist(document)
+    return document.bitmaps
+
+
+def query_releases(repo_root: str, releases: Iterable[dict],
+                   **predicates: Union[str, Iterable[str]]) -> Dict[Tuple[str, str], List[int]]:
+    """
+    Run select() over several releases' files.
+
+    Args:
+        repo_root: Repository root the manifest paths are relative to
+        releases: Release dicts from release_manifest.RELEASES
+        predicates: As for ReleaseBitmaps.select()
+
+    Returns:
+        (release label, file type) -> matching row numbers, for files on disk
+    """
+    from release_manifest import FILE_TYPES, get_release_file
+
+    results = {}
+    for release in releases:
+        for file_type in FILE_TYPES:
+            rel_path = get_release_file(release, file_type)
+            if rel_path is None or not os.path.exists(os.path.join(repo_root, rel_path)):
+                continue
+            bitmaps = release_bitmaps(load_gc_file(os.path.join(repo_root, rel_path)))
+            results[(release['label'], file_type)] = bitmaps.rows(bitmaps.select(**predicates))
+    return results
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: gc_bitmap.py <repo-root> <release-label|version> [<column>=<value>[,<value>...]]...")
+        print(f"\nColumns: {', '.join(CATEGORICAL_COLUMNS)}")
+        print("Example: gc_bitmap.py . 2.0 ComponentType=ASBIE Cardinality=0..1,0..n AssociatedObjectClass=Party")
+        sys.exit(1)
+
+    from release_manifest import RELEASES, get_release_file
+
+    repo_root, selector = sys.argv[1], sys.argv[2]
+    predicates = {}
+    for arg in sys.argv[3:]:
+        column, _, values = arg.partition('=')
+        predicates[column] = values.split(',')
+    releases = [r for r in RELEASES if selector in (r['label'], r['version'])]
+    if not releases:
+        print(f"No release labelled {selector!r} and no version {selector!r}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = query_releases(repo_root, releases, **predicates)
+    elapsed = time.perf_counter() - start
+    by_label = {release['label']: release for release in releases}
+    for (label, file_type), rows in results.items():
+        document = load_gc_file(os.path.join(repo_root, get_release_file(by_label[label], file_type)))
+        print(f"{label} {file_type}: {len(rows)} rows")
+        for row in rows[:10]:
+            print(f"  row {row}: {document.row_values[row].get('DictionaryEntryName', '').strip()}")
+        if len(rows) > 10:
+            print(f"  ... {len(rows) - 10} more")
+    print(f"{len(results)} files queried in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
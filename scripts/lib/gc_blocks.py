@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+ABIE Ordering Structures
+
+Persistent ordered map of ABIE name -> TextBlock used by GCFileState. It is
+persistent: every update returns a new BlockMap and leaves the original
+untouched, sharing all unchanged structure with it. This lets GCDiff
+replay a transition change by change while every intermediate state stays
+valid, without copying the whole model on each step:
+1. Lookups, replacements, removals and moves cost O(log n)
+2. Position queries (index, predecessor, byte offset) cost O(log n)
+3. Iteration in file order is O(n), and can start at any position
+
+Internally the map is two persistent treaps (randomised balanced trees
+updated by path copying). One is keyed by name and holds each ABIE's
+position key and block; the other is keyed by position key and yields
+the names in file order, with each subtree's total block size so byte
+offsets are prefix sums. Position keys are integers spaced GAP apart, so
+an insertion takes the midpoint between its neighbours. Only when a gap
+is exhausted is the map renumbered.
+
+FileOrder is the companion for the target file's ABIE order: it answers
+"position of X" in O(1) and "nearest ABIE before X that is already present
+in this state" in O(log n) with a Fenwick tree of presence bits, which
+GCDiff keeps in step with the states it produces.
+
+longest_increasing_subsequence() is used to keep the largest set of ABIEs
+(or rows) that are already in order in place and move only the rest.
+"""
+
+import random
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from gc_loader import TextBlock
+
+# Spacing between position keys; supports ~20 insertions at the same spot
+# before the map has to be renumbered.
+GAP = 1 << 20
+
+# Deterministic priorities keep tree shapes (and so timings) reproducible
+_rng = random.Random(0x6763)
+
+
+class _Node:
+    """Immutable treap node.
+
+    size is the number of nodes in the subtree and total the sum of their
+    weights (the byte length of each block in the position tree).
+    """
+    __slots__ = ('key', 'value', 'prio', 'left', 'right', 'weight', 'size', 'total')
+
+    def __init__(self, key, value, prio, left=None, right=None, weight=0):
+        self.key = key
+        self.value = value
+        self.prio = prio
+        self.left = left
+        self.right = right
+        self.weight = weight
+        self.size = 1
+        self.total = weight
+        if left is not None:
+            self.size += left.size
+            self.total += left.total
+        if right is not None:
+            self.size += right.size
+            self.total += right.total
+
+
+def _copy(node: _Node, left: Optional[_Node], right: Optional[_Node]) -> _Node:
+    """Path copy of node with new children"""
+    return _Node(node.key, node.value, node.prio, left, right, node.weight)
+
+
+def _split(node: Optional[_Node], key) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into (keys < key, keys >= key), copying only the search path"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        return _copy(node, node.left, left), right
+    left, right = _split(node.left, key)
+    return left, _copy(node, right, node.right)
+
+
+def _insert(node: Optional[_Node], key, value, prio: float, weight: int = 0) -> _Node:
+    """Insert a key that is not yet present"""
+    if node is None:
+        return _Node(key, value, prio, weight=weight)
+    if prio > node.prio:
+        left, right = _split(node, key)
+        return _Node(key, value, prio, left, right, weight)
+    if key < node.key:
+        return _copy(node, _insert(node.left, key, value, prio, weight), node.right)
+    return _copy(node, node.left, _insert(node.right, key, value, prio, weight))
+
+
+def _replace(node: _Node, key, value, weight: int = 0) -> _Node:
+    """Replace the value (and weight) of a key that is present"""
+    if key < node.key:
+        return _copy(node, _replace(node.left, key, value, weight), node.right)
+    if node.key < key:
+        return _copy(node, node.left, _replace(node.right, key, value, weight))
+    return _Node(key, value, node.prio, node.left, node.right, weight)
+
+
+def _merge(a: Optional[_Node], b: Optional[_Node]) -> Optional[_Node]:
+    """Join two treaps where every key in a is smaller than every key in b"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        return _copy(a, a.left, _merge(a.right, b))
+    return _copy(b, _merge(a, b.left), b.right)
+
+
+def _delete(node: Optional[_Node], key) -> Optional[_Node]:
+    if node is None:
+        return None
+    if key < node.key:
+        return _copy(node, _delete(node.left, key), node.right)
+    if node.key < key:
+        return _copy(node, node.left, _delete(node.right, key))
+    return _merge(node.left, node.right)
+
+
+def _find(node: Optional[_Node], key) -> Optional[_Node]:
+    while node is not None:
+        if key < node.key:
+            node = node.left
+        elif node.key < key:
+            node = node.right
+        else:
+            return node
+    return None
+
+
+def _rank(node: Optional[_Node], key) -> int:
+    """Number of keys smaller than key"""
+    rank = 0
+    while node is not None:
+        if node.key < key:
+            rank += 1 + (node.left.size if node.left else 0)
+            node = node.right
+        else:
+            node = node.left
+    return rank
+
+
+def _weight_before(node: Optional[_Node], rank: int) -> int:
+    """Sum of the weights of the first rank nodes in key order"""
+    total = 0
+    while node is not None and rank > 0:
+        left_size = node.left.size if node.left else 0
+        if rank <= left_size:
+            node = node.left
+        else:
+            total += (node.left.total if node.left else 0) + node.weight
+            rank -= left_size + 1
+            node = node.right
+    return total
+
+
+def _neighbour(node: Optional[_Node], key, after: bool) -> Optional[_Node]:
+    """Closest node strictly after (or before) key"""
+    best = None
+    while node is not None:
+        if after:
+            if key < node.key:
+                best, node = node, node.left
+            else:
+                node = node.right
+        else:
+            if node.key < key:
+                best, node = node, node.right
+            else:
+                node = node.left
+    return best
+
+
+def _edge(node: Optional[_Node], last: bool) -> Optional[_Node]:
+    while node is not None:
+        child = node.right if last else node.left
+        if child is None:
+            return node
+        node = child
+    return None
+
+
+def _iter_nodes(node: Optional[_Node], skip: int = 0) -> Iterator[_Node]:
+    """In-order traversal with an explicit stack, starting after skip nodes"""
+    stack = []
+    # Descend to the node of rank skip, stacking the nodes still to visit
+    while node is not None:
+        left_size = node.left.size if node.left else 0
+        if skip < left_size:
+            stack.append(node)
+            node = node.left
+        elif skip == left_size:
+            stack.append(node)
+            node = None
+        else:
+            skip -= left_size + 1
+            node = node.right
+    while stack:
+        node = stack.pop()
+        yield node
+        node = node.right
+        while node is not None:
+            stack.append(node)
+            node = node.left
+
+
+def _build(items: List[tuple]) -> Optional[_Node]:
+    """Build a treap from (key, value, weight) items sorted by key in O(n)"""
+    spine: List[list] = []  # Right spine of the Cartesian tree: [key, value, weight, prio, left, right]
+    for key, value, weight in items:
+        entry = [key, value, weight, _rng.random(), None, None]
+        last = None
+        while spine and spine[-1][3] < entry[3]:
+            last = spine.pop()
+        entry[4] = last
+        if spine:
+            spine[-1][5] = entry
+        spine.append(entry)
+    return _freeze(spine[0]) if spine else None
+
+
+def _freeze(entry: Optional[list]) -> Optional[_Node]:
+    if entry is None:
+        return None
+    key, value, weight, prio, left, right = entry
+    return _Node(key, value, prio, _freeze(left), _freeze(right), weight)
+
+
+def _map_values(node: Optional[_Node], fn: Callable) -> Optional[_Node]:
+    """Same tree shape with every value passed through fn"""
+    if node is None:
+        return None
+    return _Node(node.key, fn(node.value), node.prio,
+                 _map_values(node.left, fn), _map_values(node.right, fn), node.weight)
+
+
+def _reweigh(node: Optional[_Node], weight_of: Callable) -> Optional[_Node]:
+    """Same tree shape with every weight recomputed from the node's value"""
+    if node is None:
+        return None
+    return _Node(node.key, node.value, node.prio,
+                 _reweigh(node.left, weight_of), _reweigh(node.right, weight_of),
+                 weight_of(node.value))
+
+
+class BlockMap:
+    """Persistent ordered map of ABIE name -> TextBlock"""
+    __slots__ = ('_by_name', '_by_pos')
+
+    def __init__(self, items: Iterable[Tuple[str, TextBlock]] = ()):
+        items = list(items)
+        positions = [(i * GAP, name, len(block)) for i, (name, block) in enumerate(items)]
+        self._by_pos = _build(positions)
+        self._by_name = _build(sorted(
+            ((name, (pos, block), 0) for (pos, name, _), (_, block) in zip(positions, items)),
+            key=lambda entry: entry[0]
+        ))
+
+    @classmethod
+    def _make(cls, by_name: Optional[_Node], by_pos: Optional[_Node]) -> 'BlockMap':
+        new = cls.__new__(cls)
+        new._by_name = by_name
+        new._by_pos = by_pos
+        return new
+
+    # --- Read access (mirrors the parts of OrderedDict GCDiff uses) ---
+
+    def __len__(self) -> int:
+        return self._by_pos.size if self._by_pos else 0
+
+    def __contains__(self, name) -> bool:
+        return _find(self._by_name, name) is not None
+
+    def __getitem__(self, name: str) -> TextBlock:
+        node = _find(self._by_name, name)
+        if node is None:
+            raise KeyError(name)
+        return node.value[1]
+
+    def get(self, name: str, default=None):
+        node = _find(self._by_name, name)
+        return node.value[1] if node is not None else default
+
+    def __iter__(self) -> Iterator[str]:
+        return (node.value for node in _iter_nodes(self._by_pos))
+
+    def keys(self) -> Iterator[str]:
+        return iter(self)
+
+    def values(self) -> Iterator[TextBlock]:
+        by_name = self._by_name
+        return (_find(by_name, name).value[1] for name in self)
+
+    def items(self, start: int = 0) -> Iterator[Tuple[str, TextBlock]]:
+        """(name, block) pairs in file order, optionally from position start"""
+        by_name = self._by_name
+        return ((node.value, _find(by_name, node.value).value[1])
+                for node in _iter_nodes(self._by_pos, start))
+
+    def __repr__(self) -> str:
+        return f"BlockMap({list(self.keys())!r})"
+
+    # --- Position queries ---
+
+    def index(self, name: str) -> int:
+        """0-based position of an ABIE in file order"""
+        node = _find(self._by_name, name)
+        if node is None:
+            raise ValueError(f"{name!r} is not in BlockMap")
+        return _rank(self._by_pos, node.value[0])
+
+    def predecessor(self, name: str) -> Optional[str]:
+        """Name of the ABIE directly before name, or None if it is first"""
+        pos = _find(self._by_name, name).value[0]
+        node = _neighbour(self._by_pos, pos, after=False)
+        return node.value if node is not None else None
+
+    def byte_size(self) -> int:
+        """Total byte length of all blocks"""
+        return self._by_pos.total if self._by_pos else 0
+
+    def byte_offset(self, index: int) -> int:
+        """Byte length of the blocks before position index"""
+        return _weight_before(self._by_pos, index)
+
+    # --- Persistent updates (each returns a new BlockMap) ---
+
+    def set(self, name: str, block: TextBlock) -> 'BlockMap':
+        """Replace an ABIE's block in place, or append it if new"""
+        node = _find(self._by_name, name)
+        if node is not None:
+            pos, old_block = node.value
+            by_pos = self._by_pos
+            if len(block) != len(old_block):
+                by_pos = _replace(by_pos, pos, name, len(block))
+            return self._make(_replace(self._by_name, name, (pos, block)), by_pos)
+        last = _edge(self._by_pos, last=True)
+        return self._place(name, block, last.key + GAP if last else 0)
+
+    def remove(self, name: str) -> 'BlockMap':
+        """Drop an ABIE; a no-op if it is not present"""
+        node = _find(self._by_name, name)
+        if node is None:
+            return self
+        return self._make(_delete(self._by_name, name),
+                          _delete(self._by_pos, node.value[0]))
+
+    def insert_after(self, name: str, block: TextBlock, after: Optional[str]) -> 'BlockMap':
+        """Place an ABIE directly after another one (or first if after is None).
+
+        If name is already present it is moved, so this also implements
+        repositioning an existing ABIE.
+        """
+        base = self.remove(name)
+        if after is None:
+            anchor = None
+            neighbour = _edge(base._by_pos, last=False)
+        else:
+            anchor = _find(base._by_name, after).value[0]
+            neighbour = _neighbour(base._by_pos, anchor, after=True)
+
+        if anchor is None:
+            pos = neighbour.key - GAP if neighbour else 0
+        elif neighbour is None:
+            pos = anchor + GAP
+        elif neighbour.key - anchor > 1:
+            pos = (anchor + neighbour.key) // 2
+        else:
+            # Gap exhausted: renumber evenly (rare, O(n)) and retry
+            return BlockMap(base.items()).insert_after(name, block, after)
+        return base._place(name, block, pos)
+
+    def map_values(self, fn: Callable[[TextBlock], TextBlock]) -> 'BlockMap':
+        """Apply fn to every block, keeping names and order"""
+        by_name = _map_values(self._by_name, lambda v: (v[0], fn(v[1])))
+        by_pos = _reweigh(self._by_pos, lambda name: len(_find(by_name, name).value[1]))
+        return self._make(by_name, by_pos)
+
+    def _place(self, name: str, block: TextBlock, pos: int) -> 'BlockMap':
+        return self._make(_insert(self._by_name, name, (pos, block), _rng.random()),
+                          _insert(self._by_pos, pos, name, _rng.random(), len(block)))
+
+
+class FileOrder(Sequence):
+    """Target ABIE order with O(1) position lookup and present-predecessor queries.
+
+    Behaves like the list of names it wraps. present_before() tracks which
+    names are present in a BlockMap with a Fenwick tree; it is rebuilt
+    (O(n log n)) only when asked about a map it has not followed via
+    track(), so replaying a transition in order costs O(log n) per change.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._names = list(names)
+        self._pos = {name: i for i, name in enumerate(self._names)}
+        self._tree: List[int] = []
+        self._present: List[bool] = []
+        self._synced: Optional[BlockMap] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, i):
+        return self._names[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._pos
+
+    def index(self, name: str, *args) -> int:
+        return self._pos[name]
+
+    def __repr__(self) -> str:
+        return f"FileOrder({self._names!r})"
+
+    def __getstate__(self):
+        # Presence tracking follows BlockMaps by identity; a copy in another
+        # process starts unsynced and rebuilds it on first use
+        return self._names
+
+    def __setstate__(self, names):
+        self.__init__(names)
+
+    def present_before(self, name: str, blocks: BlockMap) -> Optional[str]:
+        """Nearest name before name in this order that is present in blocks"""
+        self._sync(blocks)
+        count = self._prefix(self._pos[name])
+        if count == 0:
+            return None
+        return self._names[self._kth(count)]
+
+    def track(self, before: BlockMap, after: BlockMap, names: Iterable[str]) -> None:
+        """Follow a state change from before to after that touched names"""
+        if self._synced is not before:
+            return
+        for name in names:
+            i = self._pos.get(name)
+            if i is not None and (name in after) != self._present[i]:
+                self._present[i] = not self._present[i]
+                self._add(i, 1 if self._present[i] else -1)
+        self._synced = after
+
+    def _sync(self, blocks: BlockMap) -> None:
+        if self._synced is blocks:
+            return
+        n = len(self._names)
+        self._present = [name in blocks for name in self._names]
+        # O(n) Fenwick construction from the presence bits
+        tree = [0] * (n + 1)
+        for i in range(1, n + 1):
+            tree[i] += self._present[i - 1]
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._synced = blocks
+
+    def _add(self, i: int, delta: int) -> None:
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i: int) -> int:
+        """Number of present names at positions [0, i)"""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _kth(self, k: int) -> int:
+        """0-based position of the k-th (1-based) present name"""
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] < k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos
+
+
+def longest_increasing_subsequence(values: List[int]) -> List[int]:
+    """Indices of one longest strictly increasing subsequence (O(n log n))"""
+    tail_values = []  # tail_values[k]: smallest last value of a run of length k+1
+    tail_indices = []
+    prev = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tail_values, value)
+        if k:
+            prev[i] = tail_indices[k - 1]
+        if k == len(tail_values):
+            tail_values.append(value)
+            tail_indices.append(i)
+        else:
+            tail_values[k] = value
+            tail_indices[k] = i
+
+    result = []
+    i = tail_indices[-1] if tail_indices else -1
+    while i >= 0:
+        result.append(i)
+        i = prev[i]
+    return result[::-1]
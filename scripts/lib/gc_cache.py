@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Persistent Release Cache
+
+On-disk cache of parsed GenericCode files, keyed by the SHA-256 of the
+source file plus a schema version. Each entry holds what gc_loader and
+gc_analyzer would otherwise recompute on every run:
+1. The byte-offset row index, row values, ColumnSet and ABIE grouping,
+   plus the row and ABIE content digests
+2. The analyzer's Row objects
+3. The analyzer's SCC groups and topological order
+4. The ABIE graph's DependencyIndex and ImpactIndex, once a diff has
+   built them
+5. The categorical column bitmaps (gc_bitmap), once a query has built
+   them
+
+Entries are pickled and written atomically. Loading an entry unpickles
+it, which can run arbitrary code, so the cache directory must only be
+writable by the user running the build; that is why the cache is opt-in
+(build_history.py --cache) and lives in the user's cache directory rather
+than in the repository. The cache is bounded by total size; reading an
+entry refreshes its mtime and the least recently used entries are
+evicted first.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+# Bump whenever the layout of cached payloads (or of the objects they
+# contain, e.g. Row/SCCGroup/GCRowIndex) changes.
+CACHE_SCHEMA_VERSION = 7
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'ubl-gc'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ReleaseCache:
+    """Size-bounded LRU cache of parsed release models on disk
+
+    Entries are trusted: load() unpickles whatever is in cache_dir, so
+    only point it at a directory no one else can write to.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}-v{CACHE_SCHEMA_VERSION}.pickle"
+
+    def load(self, digest: str) -> Optional[dict]:
+        """Return the cached payload for a content digest, or None"""
+        path = self._entry_path(digest)
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Truncated or incompatible entry: drop it and recompute
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return payload
+
+    def store(self, digest: str, payload: dict) -> None:
+        """Write (or replace) the payload for a content digest"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(digest)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until under max_bytes"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*.pickle'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove every cache entry"""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob('*.pickle'):
+            path.unlink(missing_ok=True)
+
+    def size_bytes(self) -> int:
+        if not self.cache_dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.cache_dir.glob('*.pickle'))
+
+
+def main():
+    cache = ReleaseCache(sys.argv[2] if len(sys.argv) > 2 else None)
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('info', 'clear'):
+        print("Usage: gc_cache.py info|clear [cache-dir]")
+        sys.exit(1)
+
+    if sys.argv[1] == 'clear':
+        cache.clear()
+        print(f"Cleared {cache.cache_dir}")
+    else:
+        count = len(list(cache.cache_dir.glob('*.pickle'))) if cache.cache_dir.exists() else 0
+        print(f"Cache directory: {cache.cache_dir}")
+        print(f"  {count} entries, {cache.size_bytes() / 1e6:.1f} MB "
+              f"(limit {cache.max_bytes / 1e6:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
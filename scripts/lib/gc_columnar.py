@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Columnar Release Model
+
+A compact, struct-of-arrays representation of GenericCode releases for
+holding many of them in memory at once (cross-release analysis), instead
+of a GCDocument's per-row dicts or GCAnalyzer's Row objects:
+1. StringTable: every distinct value is stored once and referred to by a
+   uint32 id. One table is shared by all the releases loaded with it, so
+   the thousands of names and definitions that survive from release to
+   release cost nothing after the first
+2. ColumnarRelease: one array('I') of string ids per ColumnSet column,
+   indexed by row (none for columns no row uses), plus the ABIE grouping
+   as integer arrays (each group's object class id and its row numbers
+   in CSR form)
+3. ColumnarArchive: the releases of the manifest loaded against one
+   StringTable; files that several releases share are loaded once
+
+Id 0 stands for "no value", so row_values() gives back exactly the
+document's mapping. GCAnalyzer(..., columnar=release) analyses a release
+from this model (see ColumnarRelease.rows()), with the Row strings shared
+through the table. The analysis still builds a full list of Row objects,
+so only the archive is compact, not an analysis run.
+"""
+
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_loader import GCDocument, load_gc_file
+
+# The columns GCAnalyzer builds Rows from
+ROW_COLUMNS = ('ComponentType', 'DictionaryEntryName', 'ObjectClass', 'PropertyTerm',
+               'AssociatedObjectClass', 'Cardinality')
+
+
+class StringTable:
+    """Interned strings by uint32 id; id 0 is the missing value"""
+
+    def __init__(self):
+        self.strings: List[Optional[str]] = [None]
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, string_id: int) -> Optional[str]:
+        return self.strings[string_id]
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def find(self, value: str) -> int:
+        """The id of value, or 0 if it was never interned"""
+        return self._ids.get(value, 0)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table"""
+        return (sys.getsizeof(self.strings) + sys.getsizeof(self._ids)
+                + sum(sys.getsizeof(s) for s in self.strings[1:]))
+
+
+class ColumnarRelease:
+    """One GenericCode file as per-column arrays of interned string ids"""
+
+    def __init__(self, file_path: str, strings: StringTable, columns: List[str], row_count: int):
+        self.file_path = file_path
+        self.strings = strings
+        self.columns = columns  # ColumnSet ids in order
+        self.row_count = row_count
+        self.data: Dict[str, array] = {c: array('I', bytes(4 * row_count)) for c in columns}  # Column -> ids
+        self.group_names = array('I')  # Object class id of each ABIE group, in file order
+        self.group_offsets = array('I', [0])  # Group i's rows: group_rows[offsets[i]:offsets[i + 1]]
+        self.group_rows = array('I')  # Row numbers (1-based)
+        self.content_hash = ''
+
+    @classmethod
+    def from_document(cls, document: GCDocument, strings: StringTable) -> 'ColumnarRelease':
+        columns = list(document.columns)
+        for values in document.row_values.values():
+            for column in values:
+                if column not in columns:
+                    columns.append(column)  # Values for columns outside the ColumnSet
+        release = cls(document.file_path, strings, columns, document.row_count)
+        intern = strings.intern
+        for row_num, values in document.row_values.items():
+            for column, value in values.items():
+                release.data[column][row_num - 1] = intern(value)
+        for column in columns:
+            if not any(release.data[column]):
+                del release.data[column]  # Unused column: no array at all
+        for object_class, row_nums in document.abie_groups.items():
+            release.group_names.append(intern(object_class))
+            release.group_rows.extend(row_nums)
+            release.group_offsets.append(len(release.group_rows))
+        release.content_hash = document.content_hash
+        return release
+
+    @classmethod
+    def load(cls, file_path: str, strings: StringTable,
+             content_hash: Optional[str] = None) -> 'ColumnarRelease':
+        return cls.from_document(load_gc_file(file_path, content_hash), strings)
+
+    def value(self, row_num: int, column: str) -> Optional[str]:
+        """A row's value in column (None if it has none)"""
+        ids = self.data.get(column)
+        return self.strings[ids[row_num - 1]] if ids is not None else None
+
+    def row_values(self, row_num: int) -> Dict[str, str]:
+        """ColumnRef -> value for one row, as in GCDocument.row_values"""
+        strings, i = self.strings.strings, row_num - 1
+        return {column: strings[ids[i]] for column, ids in self.data.items() if ids[i]}
+
+    def rows_where(self, column: str, value: str) -> List[int]:
+        """Row numbers whose column has exactly value"""
+        string_id = self.strings.find(value)
+        ids = self.data.get(column)
+        if not string_id or ids is None:
+            return []
+        return [i + 1 for i, v in enumerate(ids) if v == string_id]
+
+    def groups(self) -> Iterator[Tuple[str, array]]:
+        """(object class, row numbers) of each ABIE group, in file order"""
+        for i, name_id in enumerate(self.group_names):
+            yield self.strings[name_id], self.group_rows[self.group_offsets[i]:self.group_offsets[i + 1]]
+
+    def rows(self) -> Iterator:
+        """GCAnalyzer Rows (see GCAnalyzer._row_from_values), with interned strings"""
+        from gc_analyzer import GCAnalyzer
+
+        strings = self.strings.strings
+        present = [(c, self.data[c]) for c in ROW_COLUMNS if c in self.data]
+        for i in range(self.row_count):
+            values = {column: strings[ids[i]] for column, ids in present if ids[i]}
+            row = GCAnalyzer._row_from_values(values, i + 1)
+            if row:
+                yield row
+
+    def nbytes(self) -> int:
+        """Memory held by the release's own arrays (the string table is shared)"""
+        arrays = [*self.data.values(), self.group_names, self.group_offsets, self.group_rows]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class ColumnarArchive:
+    """Releases of the manifest loaded against one shared StringTable"""
+
+    def __init__(self, strings: Optional[StringTable] = None):
+        self.strings = strings or StringTable()
+        self.releases: Dict[Tuple[str, str], ColumnarRelease] = {}  # (label, file type) -> release
+
+    def load(self, repo_root: str, releases: Optional[Iterable[dict]] = None,
+             verbose: bool = False) -> None:
+        """Load the files of releases (default: every release) that exist on disk"""
+        from release_manifest import FILE_TYPES, RELEASES, build_content_hashes, get_release_file
+
+        hashes = build_content_hashes(str(repo_root))
+        by_content = {r.content_hash: r for r in self.releases.values() if r.content_hash}
+        for release in releases or RELEASES:
+            for file_type in FILE_TYPES:
+                rel_path = get_release_file(release, file_type)
+                content_hash = hashes.get(rel_path) if rel_path else None
+                if content_hash is None:
+                    continue
+                if content_hash not in by_content:
+                    by_content[content_hash] = ColumnarRelease.load(
+                        os.path.join(str(repo_root), rel_path), self.strings, content_hash)
+                self.releases[(release['label'], file_type)] = by_content[content_hash]
+                if verbose:
+                    print(f"  {release['label']} {file_type}: {len(self.strings)} strings")
+
+    def get(self, label: str, file_type: str = 'entities') -> Optional[ColumnarRelease]:
+        return self.releases.get((label, file_type))
+
+    def nbytes(self) -> int:
+        """Memory held by the distinct releases' arrays plus the string table"""
+        distinct = {id(r): r for r in self.releases.values()}
+        return self.strings.nbytes() + sum(r.nbytes() for r in distinct.values())
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: gc_columnar.py <repo-root> [<release-label>]")
+        print("\nLoads every release on disk into one columnar archive and reports its size;")
+        print("with a release label, also analyses that release through the columnar backend.")
+        sys.exit(1)
+
+    repo_root = sys.argv[1]
+    archive = ColumnarArchive()
+    start = time.perf_counter()
+    archive.load(repo_root)
+    elapsed = time.perf_counter() - start
+    rows = sum(r.row_count for r in archive.releases.values())
+    print(f"{len(archive.releases)} files, {rows} rows, {len(archive.strings)} distinct strings "
+          f"loaded in {elapsed:.2f}s")
+    print(f"Columnar size: {archive.nbytes() / 1e6:.1f} MB "
+          f"(string table {archive.strings.nbytes() / 1e6:.1f} MB)")
+
+    if len(sys.argv) > 2:
+        from gc_analyzer import GCAnalyzer
+
+        release = archive.get(sys.argv[2])
+        if release is None:
+            print(f"No entities file loaded for {sys.argv[2]!r}")
+            sys.exit(1)
+        analyzer = GCAnalyzer(release.file_path, columnar=release)
+        analyzer.parse()
+        analyzer.build_abies()
+        analyzer.build_dependency_graph()
+        analyzer.find_sccs_tarjan()
+        analyzer.topological_sort_sccs()
+        analyzer.analyze_dependencies()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,94 +11,84 @@ This preserves exact formatting, XML comments, namespace prefixes, and row order
 The final commit produces a file byte-identical to the original source.
 """
 
-import xml.etree.ElementTree as ET
 import subprocess
 import sys
 import os
-import re
 from pathlib import Path
+from typing import Optional
 
 from gc_analyzer import GCAnalyzer
 from gc_builder import GCBuilder, BuildStep
+from gc_fast_import import FastImportStream
+from gc_git import GitSession
+from gc_loader import GCDocument, TextBlock, load_gc_file
 
 class GCCommitBuilder:
     """Creates git commits by inserting raw text blocks from the source file"""
 
-    def __init__(self, source_gc_file: str, target_file: str, repo_path: str):
+    def __init__(self, source_gc_file: str, target_file: str, repo_path: str,
+                 document: Optional[GCDocument] = None,
+                 fast_import: Optional[FastImportStream] = None,
+                 git_session: Optional[GitSession] = None):
         self.source_gc_file = source_gc_file
         self.target_file = target_file
         self.repo_path = repo_path
         self.target_path = Path(repo_path) / target_file
 
-        # Parse the source file into header, row blocks, and footer
-        self.header_lines = []    # Everything before first <Row>
-        self.footer_lines = []    # Everything after last </Row>
-        self.row_blocks = {}      # row_num -> list of text lines for that row
+        # With a fast-import stream, file contents go straight into the
+        # stream (author/date from os.environ) and the work tree is untouched
+        self.fast_import = fast_import
+        self._pending: Optional[list[TextBlock]] = None
+
+        # With a git session, files are staged and committed in memory
+        self.git_session = git_session
+
+        # Source file split into header, row blocks, and footer
+        self.document = document or load_gc_file(source_gc_file)
+        self.header = None        # Everything before first <Row>
+        self.footer = None        # Everything after last </Row>
 
         self._parse_source_text()
 
     def _parse_source_text(self) -> None:
-        """Parse source file into text blocks: header, per-row blocks, footer"""
-        with open(self.source_gc_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-
-        # Find all <Row> and </Row> boundaries
-        row_starts = []  # (line_index, row_num)
-        row_ends = []    # line_index of </Row>
-
-        row_counter = 0
-        for i, line in enumerate(all_lines):
-            stripped = line.strip()
-            if stripped.startswith('<Row>') or stripped.startswith('<Row '):
-                row_counter += 1
-                row_starts.append((i, row_counter))
-            elif stripped == '</Row>':
-                row_ends.append(i)
-
-        if not row_starts:
+        """Take header and footer blocks from the loaded source document"""
+        if not self.document.row_count:
             raise ValueError(f"No <Row> elements found in {self.source_gc_file}")
 
-        # Header: everything before first <Row>
-        first_row_line = row_starts[0][0]
-        self.header_lines = all_lines[:first_row_line]
-
-        # Footer: everything after last </Row>
-        last_row_end = row_ends[-1]
-        self.footer_lines = all_lines[last_row_end + 1:]
+        self.header = self.document.header
+        self.footer = self.document.footer
 
-        # Extract each row block (including the <Row><!--N--> and </Row> lines)
-        for idx, (start_line, row_num) in enumerate(row_starts):
-            end_line = row_ends[idx]
-            block = all_lines[start_line:end_line + 1]
-            self.row_blocks[row_num] = block
-
-        print(f"Parsed source: {len(self.header_lines)} header lines, "
-              f"{len(self.row_blocks)} row blocks, "
-              f"{len(self.footer_lines)} footer lines")
+        print(f"Parsed source: {len(self.header)} header bytes, "
+              f"{self.document.row_count} row blocks, "
+              f"{len(self.footer)} footer bytes")
 
     def _write_file(self, row_nums: list[int]) -> None:
         """Write the GC file with header + selected rows (in order) + footer"""
-        self.target_path.parent.mkdir(parents=True, exist_ok=True)
+        # Sort row_nums to maintain original file order; adjacent rows are
+        # written as one span
+        blocks = [self.header, self.document.rows_block(sorted(row_nums)), self.footer]
 
-        # Sort row_nums to maintain original file order
-        sorted_nums = sorted(row_nums)
+        if self.fast_import is not None:
+            self._pending = blocks
+            return
 
-        with open(self.target_path, 'w', encoding='utf-8') as f:
-            # Header
-            for line in self.header_lines:
-                f.write(line)
-
-            # Row blocks in original order
-            for num in sorted_nums:
-                for line in self.row_blocks[num]:
-                    f.write(line)
-
-            # Footer
-            for line in self.footer_lines:
-                f.write(line)
+        self.target_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.target_path, 'wb') as f:
+            for block in blocks:
+                block.write_to(f)
 
     def _git_add_and_commit(self, message: str) -> None:
         """Add file and create git commit"""
+        if self.fast_import is not None:
+            self.fast_import.commit(message, os.environ,
+                                    modify={self.target_file: self._pending})
+            return
+
+        if self.git_session is not None:
+            self.git_session.add(self.target_file)
+            self.git_session.commit(message, os.environ)
+            return
+
         subprocess.run(
             ['git', 'add', self.target_file],
             cwd=self.repo_path, check=True
@@ -193,7 +183,8 @@ def main():
     print("ANALYZING SOURCE FILE")
     print("=" * 70)
 
-    analyzer = GCAnalyzer(source_file)
+    document = load_gc_file(source_file)
+    analyzer = GCAnalyzer(source_file, document=document)
     analyzer.parse()
     analyzer.build_abies()
     analyzer.build_dependency_graph()
@@ -215,7 +206,7 @@ def main():
     print("CREATING COMMITS")
     print("=" * 70)
 
-    commit_builder = GCCommitBuilder(source_file, target_file, repo_path)
+    commit_builder = GCCommitBuilder(source_file, target_file, repo_path, document=document)
     # Store analyzer reference for commit message generation
     commit_builder.analyzer_abies = analyzer.abies
 
@@ -7,20 +7,35 @@ and outputs an ordered list of change operations that can be applied incremental
 
 Works at the text line level to preserve exact formatting (whitespace, XML comments, etc.)
 and ensures final output is byte-identical to the new file.
+
+With row_level=True, modified ABIEs also carry a row-level patch keyed by
+DictionaryEntryName (see gc_row_diff.py), and applying them only touches
+the rows that changed.
+
+With compute(annotate=True), ABIE additions, modifications and removals
+carry their blast radius (details['blast_radius'], a gc_impact.BlastRadius):
+how many ABIEs and which document types use the ABIE, read from the
+release's ImpactIndex.
 """
 
-import xml.etree.ElementTree as ET
+import contextlib
+import io
 import sys
 import os
 import re
 import tempfile
 from pathlib import Path
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, OrderedDict
-from collections import OrderedDict as ODict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence, Set
 
 sys.path.insert(0, str(Path(__file__).parent))
-from gc_analyzer import GCAnalyzer
+from gc_analyzer import abie_dependencies
+from gc_blocks import BlockMap, FileOrder, longest_increasing_subsequence
+from gc_graph import DependencyIndex
+from gc_impact import ImpactIndex
+from gc_loader import (GCDocument, TextBlock, attach, column_adjusted_digest, load_gc_file, persist,
+                       remove_columns)
+from gc_row_diff import diff_abie_rows
 
 
 @dataclass
@@ -31,28 +46,44 @@ class ChangeOp:
     details: dict  # Operation-specific data
 
 
-@dataclass
+@dataclass(frozen=True)
 class GCFileState:
-    """Represents the state of a GenericCode file at a point in time"""
+    """Represents the state of a GenericCode file at a point in time.
+
+    States are persistent: applying a change returns a new state that
+    shares everything it did not touch with the old one, and the old state
+    stays valid. The header/footer line lists are shared, never mutated.
+    """
     header_lines: List[str] = field(default_factory=list)  # Before first <Row>
-    abie_blocks: ODict = field(default_factory=ODict)  # object_class -> list of text lines
+    abie_blocks: BlockMap = field(default_factory=BlockMap)  # object_class -> TextBlock, in file order
     footer_lines: List[str] = field(default_factory=list)  # After last </Row>
 
+    def text_blocks(self) -> List[TextBlock]:
+        """The file's content as blocks: header, ABIE blocks in order, footer"""
+        return [TextBlock.from_lines(self.header_lines), *self.abie_blocks.values(),
+                TextBlock.from_lines(self.footer_lines)]
+
 
 class GCDiff:
     """Computes semantic diffs between two GenericCode files"""
 
-    def __init__(self, old_file: str, new_file: str):
+    def __init__(self, old_file: str, new_file: str, row_level: bool = False):
         self.old_file = old_file
         self.new_file = new_file
+        self.row_level = row_level  # Diff modified ABIEs row by row
+        self.old_doc = None
+        self.new_doc = None
         self.old_state = None
         self.new_state = None
+        self._new_file_order = None
         self._parse_both_files()
 
     def _parse_both_files(self) -> None:
-        """Parse both files into GCFileState objects"""
-        self.old_state = self.parse_file(self.old_file)
-        self.new_state = self.parse_file(self.new_file)
+        """Load both files once and build GCFileState objects from them"""
+        self.old_doc = load_gc_file(self.old_file)
+        self.new_doc = load_gc_file(self.new_file)
+        self.old_state = self.state_from_document(self.old_doc)
+        self.new_state = self.state_from_document(self.new_doc)
 
     @staticmethod
     def parse_file(file_path: str) -> GCFileState:
@@ -64,99 +95,48 @@ class GCDiff:
         - abie_blocks: Text blocks for each ABIE group (ABIE + all children)
         - footer_lines: Everything after the last </Row> tag
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-
-        # Find all <Row> and </Row> boundaries
-        row_starts = []  # (line_index, row_num)
-        row_ends = []    # line_index of </Row>
-
-        row_counter = 0
-        for i, line in enumerate(all_lines):
-            stripped = line.strip()
-            if stripped.startswith('<Row>') or stripped.startswith('<Row '):
-                row_counter += 1
-                row_starts.append((i, row_counter))
-            elif stripped == '</Row>':
-                row_ends.append(i)
-
-        if not row_starts:
-            # No rows, just return header and footer
-            state = GCFileState()
-            state.header_lines = all_lines
-            state.footer_lines = []
-            return state
-
-        # Header: everything before first <Row>
-        first_row_line = row_starts[0][0]
-        header_lines = all_lines[:first_row_line]
-
-        # Footer: everything after last </Row>
-        last_row_end = row_ends[-1]
-        footer_lines = all_lines[last_row_end + 1:]
-
-        # Extract each row block (including <Row>...<!--N--> and </Row> lines)
-        row_blocks = {}
-        for idx, (start_line, row_num) in enumerate(row_starts):
-            end_line = row_ends[idx]
-            block = all_lines[start_line:end_line + 1]
-            row_blocks[row_num] = block
-
-        # Group rows into ABIE blocks
-        abie_blocks = ODict()
-        current_object_class = None
-        orphaned_rows = []  # Rows with no component type or other types
-
-        for row_num in sorted(row_blocks.keys()):
-            block_lines = row_blocks[row_num]
-            component_type = GCDiff._extract_column_value(block_lines, 'ComponentType')
-            object_class = GCDiff._extract_column_value(block_lines, 'ObjectClass')
-
-            if component_type == 'ABIE':
-                current_object_class = object_class
-                abie_blocks[object_class] = block_lines
-            elif component_type in ('BBIE', 'ASBIE') and current_object_class:
-                # Append to current ABIE's block
-                abie_blocks[current_object_class].extend(block_lines)
-            else:
-                # Orphaned rows (empty component type or other types)
-                orphaned_rows.extend(block_lines)
-
-        # Add orphaned rows as a special ABIE block if any exist
-        if orphaned_rows:
-            abie_blocks['__ORPHANED_ROWS__'] = orphaned_rows
-
-        state = GCFileState()
-        state.header_lines = header_lines
-        state.abie_blocks = abie_blocks
-        state.footer_lines = footer_lines
-        return state
+        return GCDiff.state_from_document(load_gc_file(file_path))
 
     @staticmethod
-    def _extract_column_value(row_lines: List[str], column_name: str) -> str:
-        """Extract a column value from row text lines"""
-        in_target_value = False
-        for i, line in enumerate(row_lines):
-            if f'ColumnRef="{column_name}"' in line:
-                in_target_value = True
-                # Try to find SimpleValue on this line
-                if '<SimpleValue>' in line:
-                    match = re.search(r'<SimpleValue>([^<]+)</SimpleValue>', line)
-                    if match:
-                        return match.group(1)
-            elif in_target_value and '<SimpleValue>' in line:
-                # SimpleValue is on the next line
-                match = re.search(r'<SimpleValue>([^<]+)</SimpleValue>', line)
-                if match:
-                    return match.group(1)
-            elif in_target_value and '</Value>' in line:
-                # Value element closed without finding SimpleValue
+    def state_from_document(doc: GCDocument) -> GCFileState:
+        """Build a GCFileState from a loaded GCDocument.
+
+        ABIE blocks are TextBlocks over the document's memory map and are
+        not decoded until their content is inspected. States are persistent,
+        so the state is built once per document and shared: a release's
+        state is reused as the old state of the next transition.
+        """
+        if doc.file_state is None:
+            doc.file_state = GCFileState(
+                header_lines=list(doc.header_lines),
+                abie_blocks=BlockMap((name, doc.group_block(name)) for name in doc.abie_groups),
+                footer_lines=list(doc.footer_lines),
+            )
+        return doc.file_state
+
+    def new_file_order(self) -> FileOrder:
+        """The new file's ABIE order, shared by all change ops of this diff"""
+        if self._new_file_order is None:
+            self._new_file_order = FileOrder(self.new_state.abie_blocks.keys())
+        return self._new_file_order
+
+    def attach(self, changes: List[ChangeOp]) -> List[ChangeOp]:
+        """
+        Adopt changes computed by another GCDiff of the same two files
+        (e.g. compute_changes() in a worker process), so they can be
+        applied with this differ's states. Returns changes.
+        """
+        for change in changes:
+            order = change.details.get('new_file_order')
+            if isinstance(order, FileOrder):
+                self._new_file_order = order
                 break
-        return ""
+        return changes
 
-    def compute(self) -> List[ChangeOp]:
+    def compute(self, annotate: bool = False) -> List[ChangeOp]:
         """
-        Compute all change operations in commit order:
+        Compute all change operations in commit order (with annotate, ABIE
+        changes also carry details['blast_radius']):
         1. Metadata changes (Identification section only)
         2. Column structure change (replaces ColumnSet area + strips removed col values)
         3. ABIE removals
@@ -182,11 +162,12 @@ class GCDiff:
             changes.append(column_change)
             removed_cols = column_change.details.get('removed_columns', [])
 
-        # 3. Compute column-adjusted old blocks for ABIE comparison.
-        # After column removals are applied, the old rows no longer have
-        # removed column values. This lets ABIE modification commits contain
-        # only genuine content changes (plus new column values from additions).
-        adjusted_old_blocks = self._apply_column_removals_to_blocks(
+        # 3. Compute column-adjusted digests of the old blocks for ABIE
+        # comparison. After column removals are applied, the old rows no
+        # longer have removed column values. This lets ABIE modification
+        # commits contain only genuine content changes (plus new column
+        # values from additions).
+        adjusted_old_digests = self._column_adjusted_digests(
             self.old_state.abie_blocks, removed_cols
         )
 
@@ -194,18 +175,18 @@ class GCDiff:
         abie_removals = self._compute_abie_removals()
         changes.extend(abie_removals)
 
-        # 5. ABIE modifications (using column-adjusted old blocks)
-        abie_modifications = self._compute_abie_modifications(adjusted_old_blocks)
+        # 5. ABIE modifications (using column-adjusted old digests)
+        abie_modifications = self._compute_abie_modifications(adjusted_old_digests, removed_cols)
         changes.extend(abie_modifications)
 
         # 6. ABIE additions (in dependency order)
         abie_additions = self._compute_abie_additions()
         changes.extend(abie_additions)
 
-        # 7. Check for position changes in unmodified ABIEs.
-        # Additions and modifications already handle their own positioning,
-        # so this only catches ABIEs that moved without content changes.
-        move_ops = self._compute_abie_moves(adjusted_old_blocks)
+        # 7. Check for ABIEs left out of position. Additions and
+        # modifications already handle their own positioning, so this
+        # mostly catches ABIEs that moved without content changes.
+        move_ops = self._compute_abie_moves(changes)
         changes.extend(move_ops)
 
         # 8. Footer update if needed (the new file may have a different footer)
@@ -213,6 +194,13 @@ class GCDiff:
         if footer_change:
             changes.append(footer_change)
 
+        # Carry the dependency index forward to the new file (additions
+        # already did), so the next transition only updates it
+        self.dependency_index()
+        if annotate:
+            self._annotate_blast_radius(changes)
+        persist(self.old_doc)
+        persist(self.new_doc)
         return changes
 
     def _compute_column_structure_change(self) -> Optional[ChangeOp]:
@@ -221,8 +209,8 @@ class GCDiff:
         Returns a single ChangeOp that replaces the entire ColumnSet area
         and strips removed column values from all rows.
         """
-        old_columns = self._get_column_set(self.old_file)
-        new_columns = self._get_column_set(self.new_file)
+        old_columns = self.old_doc.columns
+        new_columns = self.new_doc.columns
 
         removed = [c for c in old_columns if c not in new_columns]
         added = [c for c in new_columns if c not in old_columns]
@@ -269,17 +257,21 @@ class GCDiff:
             return header_lines[start:]
         return []
 
-    def _apply_column_removals_to_blocks(self, abie_blocks: ODict, removed_columns: List[str]) -> ODict:
+    def _apply_column_removals_to_blocks(self, abie_blocks: BlockMap, removed_columns: List[str]) -> BlockMap:
         """Apply column value removals to old blocks for comparison purposes"""
         if not removed_columns:
             return abie_blocks
-        adjusted = ODict()
-        for name, lines in abie_blocks.items():
-            adjusted_lines = lines
-            for col_name in removed_columns:
-                adjusted_lines = self._remove_column_from_block(adjusted_lines, col_name)
-            adjusted[name] = adjusted_lines
-        return adjusted
+        removed = set(removed_columns)
+        return abie_blocks.map_values(lambda block: self._remove_column_from_block(block, removed))
+
+    @staticmethod
+    def _column_adjusted_digests(abie_blocks: BlockMap, removed_columns: List[str]) -> Dict[str, bytes]:
+        """Content digest of each block (in order) as it will be once the
+        removed columns are stripped. Without removed columns these are
+        the digests computed at load time."""
+        removed = set(removed_columns)
+        return {name: column_adjusted_digest(block, removed)
+                for name, block in abie_blocks.items()}
 
     def _compute_metadata_change(self) -> Optional[ChangeOp]:
         """Detect changes in the Identification section by comparing text blocks"""
@@ -326,20 +318,6 @@ class GCDiff:
             return start, end, header_lines[start:end+1]
         return None, None, []
 
-    @staticmethod
-    def _get_column_set(file_path: str) -> List[str]:
-        """Extract column names from ColumnSet"""
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        columns = []
-        for col_elem in root.findall('.//Column'):
-            col_id = col_elem.get('Id')
-            if col_id:
-                columns.append(col_id)
-
-        return columns
-
     def _compute_abie_removals(self) -> List[ChangeOp]:
         """Find ABIEs present in old file but not in new file"""
         old_abies = set(self.old_state.abie_blocks.keys())
@@ -365,13 +343,17 @@ class GCDiff:
         new_abies = set(self.new_state.abie_blocks.keys())
 
         added = new_abies - old_abies
+        if not added:
+            return []
 
-        # Use GCAnalyzer on the new file to get dependency ordering
-        added_in_order = self._get_dependency_order(self.new_file, added)
+        # Dependencies first, in GCAnalyzer's commit order (cycle members
+        # by row), from the new file's dependency index
+        groups = self.new_doc.abie_groups
+        added_in_order = self.dependency_index().sort(added, position=lambda name: groups[name][0])
 
         # Include new file's ABIE order so additions can be inserted
         # at the correct position rather than appended at the end
-        new_file_order = list(self.new_state.abie_blocks.keys())
+        new_file_order = self.new_file_order()
 
         changes = []
         for abie_name in added_in_order:
@@ -381,112 +363,84 @@ class GCDiff:
                 details={
                     'object_class': abie_name,
                     'added_abies': added,
-                    'block_lines': self.new_state.abie_blocks[abie_name],
+                    'block': self.new_state.abie_blocks[abie_name],
                     'new_file_order': new_file_order,
                 }
             ))
         return changes
 
-    def _compute_abie_modifications(self, old_blocks: Optional[ODict] = None) -> List[ChangeOp]:
+    def _compute_abie_modifications(self, old_digests: Optional[Dict[str, bytes]] = None,
+                                    removed_columns: Sequence[str] = ()) -> List[ChangeOp]:
         """Find ABIEs that changed between old and new files.
 
         Args:
-            old_blocks: Column-adjusted old blocks for comparison. If None,
-                       uses self.old_state.abie_blocks directly.
+            old_digests: Column-adjusted old block digests for comparison.
+                        If None, uses the digests of self.old_state's blocks.
+            removed_columns: Columns stripped from the old rows before the
+                        modification is applied (used for row-level patches).
         """
-        if old_blocks is None:
-            old_blocks = self.old_state.abie_blocks
+        if old_digests is None:
+            old_digests = self._column_adjusted_digests(self.old_state.abie_blocks, [])
 
-        old_abies = set(old_blocks.keys())
-        new_abies = set(self.new_state.abie_blocks.keys())
+        new_file_order = self.new_file_order()
 
-        common = old_abies & new_abies
-        new_file_order = list(self.new_state.abie_blocks.keys())
-
-        # Maintain new file's ordering
+        # Maintain new file's ordering; compare content digests
         modified = []
-        for abie_name in self.new_state.abie_blocks.keys():
-            if abie_name not in common:
-                continue
-
-            old_block = old_blocks[abie_name]
-            new_block = self.new_state.abie_blocks[abie_name]
-
-            # Compare text blocks
-            old_text = ''.join(old_block)
-            new_text = ''.join(new_block)
-
-            if old_text != new_text:
+        for abie_name, new_block in self.new_state.abie_blocks.items():
+            old_digest = old_digests.get(abie_name)
+            if old_digest is not None and old_digest != new_block.digest:
                 modified.append(abie_name)
 
         changes = []
         for abie_name in modified:
+            description = f'Modify ABIE "{abie_name}"'
+            details = {
+                'object_class': abie_name,
+                'old_block': self.old_state.abie_blocks[abie_name],
+                'new_block': self.new_state.abie_blocks[abie_name],
+                'new_file_order': new_file_order,
+            }
+            if self.row_level:
+                patch = diff_abie_rows(
+                    self.old_doc, self.old_doc.abie_groups[abie_name],
+                    self.new_doc, self.new_doc.abie_groups[abie_name],
+                    set(removed_columns)
+                )
+                if patch is not None:
+                    details['row_patch'] = patch
+                    description += f' ({patch.summary()})'
             changes.append(ChangeOp(
                 op_type='abie_modify',
-                description=f'Modify ABIE "{abie_name}"',
-                details={
-                    'object_class': abie_name,
-                    'old_block': self.old_state.abie_blocks[abie_name],
-                    'new_block': self.new_state.abie_blocks[abie_name],
-                    'new_file_order': new_file_order,
-                }
+                description=description,
+                details=details
             ))
         return changes
 
-    def _compute_abie_moves(self, old_blocks: Optional[ODict] = None) -> List[ChangeOp]:
-        """Find unmodified ABIEs that need to move to a different position.
+    def _compute_abie_moves(self, prior_changes: List[ChangeOp]) -> List[ChangeOp]:
+        """Find the fewest ABIEs that need to move to a different position.
 
-        Additions and modifications already handle their own positioning,
-        so this only catches ABIEs whose content is unchanged but whose
-        position differs between old and new files.
+        Replays the ABIE removals, modifications and additions in
+        prior_changes on the old order (cheap with the persistent state),
+        which gives the order those commits leave behind. The longest
+        subsequence of it that is already in new-file order stays put;
+        every other ABIE gets one move, in new-file order, placing it
+        after its predecessor in the new file. This is the minimal number
+        of moves, and each one lands the ABIE in its final position.
         """
-        if old_blocks is None:
-            old_blocks = self.old_state.abie_blocks
+        new_file_order = self.new_file_order()
 
-        new_file_order = list(self.new_state.abie_blocks.keys())
-        old_abies = set(old_blocks.keys())
-        new_abies = set(self.new_state.abie_blocks.keys())
-        common = old_abies & new_abies
+        state = self.old_state
+        for change in prior_changes:
+            if change.op_type in ('abie_remove', 'abie_modify', 'abie_add'):
+                state = self.apply_change(state, change)
+
+        current_order = list(state.abie_blocks.keys())
+        positions = [new_file_order.index(name) for name in current_order]
+        in_place = set(current_order[i] for i in longest_increasing_subsequence(positions))
 
-        # Only consider ABIEs that are common AND unmodified
-        unmodified_common = []
-        for name in new_file_order:
-            if name not in common:
-                continue
-            old_text = ''.join(old_blocks.get(name, []))
-            new_text = ''.join(self.new_state.abie_blocks.get(name, []))
-            if old_text == new_text:
-                unmodified_common.append(name)
-
-        # Check which unmodified ABIEs are out of position relative to
-        # the new file's order. Compare predecessor relationships using
-        # only ABIEs that exist in both old and new (i.e. skip removed
-        # and added ABIEs when finding predecessors, since those are
-        # handled by their own removal/addition commits).
-        removed_abies = old_abies - new_abies
         changes = []
-        old_order = list(old_blocks.keys())
-        for name in unmodified_common:
-            target_idx = new_file_order.index(name)
-            # Find expected predecessor in new order (among ABIEs that
-            # also existed in old — skip additions)
-            expected_prev = None
-            for i in range(target_idx - 1, -1, -1):
-                if new_file_order[i] in old_blocks:
-                    expected_prev = new_file_order[i]
-                    break
-
-            # Find actual predecessor in old order, skipping ABIEs that
-            # were removed (they won't exist in the new file, so they
-            # can't serve as a stable reference point)
-            old_idx = old_order.index(name) if name in old_order else -1
-            actual_prev = None
-            for i in range(old_idx - 1, -1, -1):
-                if old_order[i] not in removed_abies:
-                    actual_prev = old_order[i]
-                    break
-
-            if expected_prev != actual_prev:
+        for name in new_file_order:
+            if name not in in_place:
                 changes.append(ChangeOp(
                     op_type='abie_move',
                     description=f'Move ABIE "{name}"',
@@ -522,108 +476,101 @@ class GCDiff:
         block = state.abie_blocks[abie_name]
 
         # Find correct predecessor
-        target_idx = new_file_order.index(abie_name)
-        insert_after = None
-        for i in range(target_idx - 1, -1, -1):
-            if new_file_order[i] in state.abie_blocks and new_file_order[i] != abie_name:
-                insert_after = new_file_order[i]
-                break
+        insert_after = new_file_order.present_before(abie_name, state.abie_blocks)
 
-        new_state = GCFileState()
-        new_state.header_lines = state.header_lines.copy()
-        new_state.footer_lines = state.footer_lines.copy()
-
-        new_blocks = ODict()
-        if insert_after is None:
-            new_blocks[abie_name] = block.copy()
-            for k, v in state.abie_blocks.items():
-                if k != abie_name:
-                    new_blocks[k] = v.copy()
-        else:
-            for k, v in state.abie_blocks.items():
-                if k == abie_name:
-                    continue
-                new_blocks[k] = v.copy()
-                if k == insert_after:
-                    new_blocks[abie_name] = block.copy()
-
-        new_state.abie_blocks = new_blocks
-        return new_state
+        return replace(state, abie_blocks=state.abie_blocks.insert_after(abie_name, block, insert_after))
 
     @staticmethod
     def _apply_footer_change(state: GCFileState, change: ChangeOp) -> GCFileState:
         """Apply footer update."""
-        new_state = GCFileState()
-        new_state.header_lines = state.header_lines.copy()
-        new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-        new_state.footer_lines = change.details['new_footer']
-        return new_state
+        return replace(state, footer_lines=change.details['new_footer'])
 
-    @staticmethod
-    def _get_dependency_order(file_path: str, abie_names: set) -> List[str]:
+    def old_dependency_index(self) -> DependencyIndex:
+        """The old file's DependencyIndex, built if no earlier diff left one"""
+        if self.old_doc.dependency_index is None:
+            attach(self.old_doc, 'dependency_index', DependencyIndex.build(abie_dependencies(self.old_doc)))
+        return self.old_doc.dependency_index
+
+    def dependency_index(self) -> DependencyIndex:
         """
-        Get optimal insertion order for ABIEs using dependency analysis.
-        Uses GCAnalyzer to compute dependency graph and topological sort.
-        Names not found in the analyzer (e.g., __ORPHANED_ROWS__) are
-        appended at the end.
+        The new file's DependencyIndex (SCCs and dependency order of its
+        ABIE graph), kept on the document.
+
+        The old file's index is copied and updated for only the ABIEs that
+        were added, removed or whose rows differ (same group digest means
+        same dependencies), so only their rows are read again. The SCCs and
+        heights are updated in place; the dependency order is recomputed
+        from the updated graph when first needed.
         """
-        analyzer = GCAnalyzer(file_path)
-        analyzer.parse()
-        analyzer.build_abies()
-        analyzer.build_dependency_graph()
-        analyzer.find_sccs_tarjan()
-        analyzer.topological_sort_sccs()
-
-        # Get commit order and filter to only requested ABIEs
-        commit_order = analyzer.get_abie_commit_order()
-        result = []
-        found = set()
-
-        for abies in commit_order:
-            for abie in abies:
-                if abie.object_class in abie_names:
-                    result.append(abie.object_class)
-                    found.add(abie.object_class)
-
-        # Append any names not found by the analyzer (e.g., __ORPHANED_ROWS__)
-        for name in sorted(abie_names - found):
-            result.append(name)
-
-        return result
+        old_doc, new_doc = self.old_doc, self.new_doc
+        if new_doc.dependency_index is None:
+            old_index = self.old_dependency_index()
+            changed = [name for name, digest in new_doc.abie_digests.items()
+                       if old_doc.abie_digests.get(name) != digest]
+            updates = dict(abie_dependencies(new_doc, changed))
+            updates.update((name, None) for name in old_index.deps
+                           if name not in new_doc.abie_groups)
+            index = old_index.copy()
+            index.update(updates)
+            attach(new_doc, 'dependency_index', index)
+        return new_doc.dependency_index
+
+    def impact_index(self, old: bool = False) -> ImpactIndex:
+        """Reverse-dependency and reachability index of the new (or old) file"""
+        doc = self.old_doc if old else self.new_doc
+        if doc.impact_index is None:
+            dependencies = self.old_dependency_index() if old else self.dependency_index()
+            attach(doc, 'impact_index', ImpactIndex(dependencies))
+        return doc.impact_index
+
+    def _annotate_blast_radius(self, changes: List[ChangeOp]) -> None:
+        """Record what each ABIE addition/modification/removal affects"""
+        for change in changes:
+            if change.op_type not in ('abie_add', 'abie_modify', 'abie_remove'):
+                continue
+            index = self.impact_index(old=change.op_type == 'abie_remove')
+            name = change.details['object_class']
+            if name in index:
+                change.details['blast_radius'] = index.blast_radius(name)
 
     def apply_change(self, state: GCFileState, change: ChangeOp) -> GCFileState:
         """Apply a single change operation to produce new state"""
         if change.op_type == 'metadata':
-            return self._apply_metadata_change(state, change)
+            new_state = self._apply_metadata_change(state, change)
         elif change.op_type == 'column_structure':
-            return self._apply_column_structure(state, change)
+            new_state = self._apply_column_structure(state, change)
         elif change.op_type == 'abie_add':
-            return self._apply_abie_add(state, change)
+            new_state = self._apply_abie_add(state, change)
         elif change.op_type == 'abie_remove':
-            return self._apply_abie_remove(state, change)
+            new_state = self._apply_abie_remove(state, change)
         elif change.op_type == 'abie_modify':
-            return self._apply_abie_modify(state, change)
+            new_state = self._apply_abie_modify(state, change)
         elif change.op_type == 'abie_move':
-            return self._apply_abie_move(state, change)
+            new_state = self._apply_abie_move(state, change)
         elif change.op_type == 'footer':
-            return self._apply_footer_change(state, change)
+            new_state = self._apply_footer_change(state, change)
         else:
             return state
 
+        # Keep the order index's presence bits in step, so the next
+        # change's predecessor lookup does not need a rebuild
+        if self._new_file_order is not None and new_state.abie_blocks is not state.abie_blocks:
+            touched = [change.details['object_class']] if 'object_class' in change.details else []
+            self._new_file_order.track(state.abie_blocks, new_state.abie_blocks, touched)
+        return new_state
+
     def _apply_metadata_change(self, state: GCFileState, change: ChangeOp) -> GCFileState:
         """Apply metadata changes by replacing only the Identification block"""
-        new_state = GCFileState()
         # Extract new Identification block from the new file
         _, _, new_ident_lines = self._extract_identification_block(self.new_state.header_lines)
         # Find and replace in current header
         start, end, _ = self._extract_identification_block(state.header_lines)
-        if start is not None and end is not None:
-            new_state.header_lines = state.header_lines[:start] + new_ident_lines + state.header_lines[end+1:]
-        else:
-            new_state.header_lines = state.header_lines.copy()
-        new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-        new_state.footer_lines = state.footer_lines.copy()
-        return new_state
+        if start is None or end is None:
+            return state
+        return replace(
+            state,
+            header_lines=state.header_lines[:start] + new_ident_lines + state.header_lines[end+1:]
+        )
 
     def _apply_column_structure(self, state: GCFileState, change: ChangeOp) -> GCFileState:
         """
@@ -633,8 +580,6 @@ class GCDiff:
         """
         removed_cols = change.details.get('removed_columns', [])
 
-        new_state = GCFileState()
-
         # Replace the post-Identification header with the new file's version
         old_ident_end = None
         for i, line in enumerate(state.header_lines):
@@ -644,108 +589,48 @@ class GCDiff:
 
         new_cs_area = self._extract_columnset_area(self.new_state.header_lines)
         if old_ident_end is not None:
-            new_state.header_lines = state.header_lines[:old_ident_end + 1] + new_cs_area
+            header_lines = state.header_lines[:old_ident_end + 1] + new_cs_area
         else:
-            new_state.header_lines = self.new_state.header_lines.copy()
-
-        new_state.footer_lines = state.footer_lines.copy()
+            header_lines = self.new_state.header_lines
 
-        # Strip removed column values from all ABIE blocks
-        new_abie_blocks = ODict()
-        for abie_name, block_lines in state.abie_blocks.items():
-            filtered_lines = block_lines
-            for col_name in removed_cols:
-                filtered_lines = self._remove_column_from_block(filtered_lines, col_name)
-            new_abie_blocks[abie_name] = filtered_lines
+        # Strip removed column values from all ABIE blocks (the only change
+        # that has to touch every block)
+        abie_blocks = self._apply_column_removals_to_blocks(state.abie_blocks, removed_cols)
 
-        new_state.abie_blocks = new_abie_blocks
-        return new_state
+        return replace(state, header_lines=header_lines, abie_blocks=abie_blocks)
 
     @staticmethod
-    def _remove_column_from_block(block_lines: List[str], col_name: str) -> List[str]:
-        """Remove Value elements for a specific column from a row block"""
-        result = []
-        i = 0
-
-        while i < len(block_lines):
-            line = block_lines[i]
-
-            # Check if this line starts a Value element for the column to remove
-            if f'ColumnRef="{col_name}"' in line:
-                # Find the matching </Value> tag
-                if '</Value>' in line:
-                    # Single-line value, skip it
-                    i += 1
-                    continue
-                else:
-                    # Multi-line value, skip until we find </Value>
-                    while i < len(block_lines) and '</Value>' not in block_lines[i]:
-                        i += 1
-                    # Skip the </Value> line too
-                    i += 1
-                    continue
-
-            result.append(line)
-            i += 1
-
-        return result
+    def _remove_column_from_block(block: TextBlock, columns: Set[str]) -> TextBlock:
+        """Remove Value elements for the given columns from a block.
+
+        Uses the loader's value tokenizer, so each block is scanned once
+        for all removed columns and the remaining text stays byte-exact.
+        """
+        return remove_columns(block, columns)
 
     @staticmethod
     def _apply_abie_add(state: GCFileState, change: ChangeOp) -> GCFileState:
         """Apply ABIE addition, inserting at the correct position based on new file ordering."""
         abie_name = change.details['object_class']
-        block_lines = change.details['block_lines']
+        block = change.details['block']
         new_file_order = change.details.get('new_file_order', [])
 
-        new_state = GCFileState()
-        new_state.header_lines = state.header_lines.copy()
-        new_state.footer_lines = state.footer_lines.copy()
-
         if not new_file_order or abie_name not in new_file_order:
             # Fallback: append at end
-            new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-            new_state.abie_blocks[abie_name] = block_lines
-            return new_state
+            return replace(state, abie_blocks=state.abie_blocks.set(abie_name, block))
 
         # Find the ABIE that should precede this one in the target order
         # (looking only at ABIEs that already exist in the current state)
-        target_idx = new_file_order.index(abie_name)
-        insert_after = None
-        for i in range(target_idx - 1, -1, -1):
-            if new_file_order[i] in state.abie_blocks:
-                insert_after = new_file_order[i]
-                break
+        insert_after = new_file_order.present_before(abie_name, state.abie_blocks)
 
-        new_blocks = ODict()
-        if insert_after is None:
-            # Insert at the beginning
-            new_blocks[abie_name] = block_lines
-            for k, v in state.abie_blocks.items():
-                new_blocks[k] = v.copy()
-        else:
-            for k, v in state.abie_blocks.items():
-                new_blocks[k] = v.copy()
-                if k == insert_after:
-                    new_blocks[abie_name] = block_lines
-
-        new_state.abie_blocks = new_blocks
-        return new_state
+        # insert_after=None inserts at the beginning
+        return replace(state, abie_blocks=state.abie_blocks.insert_after(abie_name, block, insert_after))
 
     @staticmethod
     def _apply_abie_remove(state: GCFileState, change: ChangeOp) -> GCFileState:
         """Apply ABIE removal (remove ABIE block from abie_blocks)"""
         abie_name = change.details['object_class']
-
-        new_state = GCFileState()
-        new_state.header_lines = state.header_lines.copy()
-        new_state.footer_lines = state.footer_lines.copy()
-        # Deep copy the abie_blocks to avoid sharing list references
-        new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-
-        if abie_name in new_state.abie_blocks:
-            del new_state.abie_blocks[abie_name]
-
-        return new_state
+        return replace(state, abie_blocks=state.abie_blocks.remove(abie_name))
 
     @staticmethod
     def _apply_abie_modify(state: GCFileState, change: ChangeOp) -> GCFileState:
@@ -754,102 +639,84 @@ class GCDiff:
         new_block = change.details['new_block']
         new_file_order = change.details.get('new_file_order', [])
 
-        new_state = GCFileState()
-        new_state.header_lines = state.header_lines.copy()
-        new_state.footer_lines = state.footer_lines.copy()
+        # A row-level patch rebuilds the block from the current one by
+        # splicing in only the changed rows; if the current block is not
+        # the one the patch was computed against, replace it whole.
+        patch = change.details.get('row_patch')
+        if patch is not None and abie_name in state.abie_blocks:
+            patched = patch.apply(state.abie_blocks[abie_name])
+            if patched is not None:
+                new_block = patched
 
         if not new_file_order or abie_name not in new_file_order:
             # Fallback: replace in place
-            new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-            new_state.abie_blocks[abie_name] = new_block
-            return new_state
-
-        # Check if position needs to change
-        current_keys = list(state.abie_blocks.keys())
-        current_idx = current_keys.index(abie_name) if abie_name in current_keys else -1
+            return replace(state, abie_blocks=state.abie_blocks.set(abie_name, new_block))
 
         # Find correct position: what should come before this ABIE?
-        target_idx = new_file_order.index(abie_name)
-        insert_after = None
-        for i in range(target_idx - 1, -1, -1):
-            if new_file_order[i] in state.abie_blocks and new_file_order[i] != abie_name:
-                insert_after = new_file_order[i]
-                break
+        insert_after = new_file_order.present_before(abie_name, state.abie_blocks)
 
-        # Check if it's already in the right position
-        if insert_after is not None:
-            expected_prev_idx = current_keys.index(insert_after) if insert_after in current_keys else -1
-            if expected_prev_idx >= 0 and current_idx == expected_prev_idx + 1:
-                # Already in correct position, just replace content
-                new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-                new_state.abie_blocks[abie_name] = new_block
-                return new_state
-        elif current_idx == 0:
-            # Should be first and already is first
-            new_state.abie_blocks = ODict((k, v.copy()) for k, v in state.abie_blocks.items())
-            new_state.abie_blocks[abie_name] = new_block
-            return new_state
-
-        # Position needs to change: rebuild with ABIE at correct position
-        new_blocks = ODict()
-        if insert_after is None:
-            # Should be first
-            new_blocks[abie_name] = new_block
-            for k, v in state.abie_blocks.items():
-                if k != abie_name:
-                    new_blocks[k] = v.copy()
-        else:
-            for k, v in state.abie_blocks.items():
-                if k == abie_name:
-                    continue  # Skip, will insert at correct position
-                new_blocks[k] = v.copy()
-                if k == insert_after:
-                    new_blocks[abie_name] = new_block
-
-        new_state.abie_blocks = new_blocks
-        return new_state
+        # Check if it's already in the right position (None = should be first)
+        blocks = state.abie_blocks
+        if abie_name in blocks and blocks.predecessor(abie_name) == insert_after:
+            # Just replace content
+            return replace(state, abie_blocks=blocks.set(abie_name, new_block))
+
+        # Position needs to change: move it while replacing the content
+        return replace(state, abie_blocks=blocks.insert_after(abie_name, new_block, insert_after))
 
     @staticmethod
     def write_state(state: GCFileState, output_path: str) -> None:
         """Write GCFileState to a file"""
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with open(output_path, 'wb') as f:
             # Write header
-            for line in state.header_lines:
-                f.write(line)
+            f.write(''.join(state.header_lines).encode('utf-8'))
 
             # Write all ABIE blocks in order
-            for abie_name, block_lines in state.abie_blocks.items():
-                for line in block_lines:
-                    f.write(line)
+            for block in state.abie_blocks.values():
+                block.write_to(f)
 
             # Write footer
-            for line in state.footer_lines:
-                f.write(line)
+            f.write(''.join(state.footer_lines).encode('utf-8'))
+
+
+def compute_changes(old_file: str, new_file: str, row_level: bool = False) -> List[ChangeOp]:
+    """GCDiff(old_file, new_file).compute() as a picklable function for process pools
+
+    The result pickles with private copies of its text blocks; pass it to
+    GCDiff.attach() on a differ of the same files to apply it. Progress
+    output is discarded, as it would interleave with the caller's.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return GCDiff(old_file, new_file, row_level=row_level).compute()
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: gc_diff.py <old-gc-file> <new-gc-file>")
+    args = [a for a in sys.argv[1:] if a != '--rows']
+    if len(args) < 2:
+        print("Usage: gc_diff.py [--rows] <old-gc-file> <new-gc-file>")
         sys.exit(1)
 
-    old_file = sys.argv[1]
-    new_file = sys.argv[2]
+    old_file = args[0]
+    new_file = args[1]
 
     print(f"Comparing GenericCode files:")
     print(f"  Old: {old_file}")
     print(f"  New: {new_file}")
     print()
 
-    differ = GCDiff(old_file, new_file)
-    changes = differ.compute()
+    differ = GCDiff(old_file, new_file, row_level='--rows' in sys.argv)
+    changes = differ.compute(annotate=True)
 
     print(f"Found {len(changes)} change operations:\n")
     for i, change in enumerate(changes, 1):
         print(f"  {i:3d}. [{change.op_type:15s}] {change.description}")
+        radius = change.details.get('blast_radius')
+        if radius is not None and radius.dependents:
+            print(f"       affects {radius.summary()}")
 
     # Verify by applying all changes
     print("\nVerifying by applying all changes...")
-    state = GCDiff.parse_file(old_file)
+    state = differ.old_state
     for change in changes:
         state = differ.apply_change(state, change)
 
@@ -857,9 +724,9 @@ def main():
         tmp_path = f.name
     differ.write_state(state, tmp_path)
 
-    with open(new_file, 'r') as new_f:
+    with open(new_file, 'rb') as new_f:
         new_content = new_f.read()
-    with open(tmp_path, 'r') as result_f:
+    with open(tmp_path, 'rb') as result_f:
         result_content = result_f.read()
 
     os.unlink(tmp_path)
@@ -868,8 +735,8 @@ def main():
         print("\nVERIFICATION PASSED: Result is byte-identical to new file")
     else:
         print("\nVERIFICATION FAILED: Result differs from new file!")
-        result_lines = result_content.splitlines()
-        new_lines = new_content.splitlines()
+        result_lines = result_content.decode('utf-8').splitlines()
+        new_lines = new_content.decode('utf-8').splitlines()
         for line_num, (a, b) in enumerate(zip(result_lines, new_lines), 1):
             if a != b:
                 print(f"  First diff at line {line_num}:")
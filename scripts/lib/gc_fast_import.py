@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+git fast-import Commit Stream
+
+Streams blobs and commits into one long-lived `git fast-import` process
+instead of running `git add` / `git diff --cached` / `git commit` for every
+commit. The commits it creates are the ones `git commit` would create:
+1. Author and committer come from the same GIT_AUTHOR_* / GIT_COMMITTER_*
+   variables HistoryBuilder.set_git_env() produces
+2. Messages get git's default `-m` whitespace cleanup
+3. File modes follow the source files (100755 for executables)
+4. Commits that would not change the tree are skipped, as
+   `git diff --cached --quiet` did: every blob is sent with a mark and its
+   object id is asked back with `get-mark` before the commit is written
+
+Content is written straight from TextBlocks, so file contents are never
+assembled in memory, and nothing touches the work tree or the index.
+"""
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_loader import TextBlock
+
+# bytes, a file to read, or the blocks of a file in order
+Content = Union[bytes, Path, Sequence[TextBlock]]
+
+
+def clean_message(message: str) -> str:
+    """Apply `git commit -m` whitespace cleanup to a commit message"""
+    lines = []
+    for line in message.split('\n'):
+        line = line.rstrip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def format_identity(env: Mapping[str, str], role: str) -> str:
+    """'Name <email> <epoch> <tz>' for role AUTHOR or COMMITTER from git env vars"""
+    try:
+        name = env[f'GIT_{role}_NAME']
+        email = env[f'GIT_{role}_EMAIL']
+        date = datetime.fromisoformat(env[f'GIT_{role}_DATE'])
+    except KeyError as e:
+        raise ValueError(f"Missing {e.args[0]} for fast-import commit") from None
+    if date.tzinfo is None:
+        raise ValueError(f"GIT_{role}_DATE must include a timezone offset")
+    offset = int(date.utcoffset().total_seconds()) // 60
+    sign = '-' if offset < 0 else '+'
+    offset = abs(offset)
+    return f"{name} <{email}> {int(date.timestamp())} {sign}{offset // 60:02d}{offset % 60:02d}"
+
+
+def _quote(path: str) -> str:
+    """C-style quoted path for fast-import commands"""
+    return '"' + path.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+class FastImportStream:
+    """One `git fast-import` process committing to the repository's current branch"""
+
+    def __init__(self, repo_path: str, ref: Optional[str] = None):
+        """
+        Args:
+            repo_path: Repository (work tree) to import into
+            ref: Branch ref to commit to (default: the ref HEAD points to)
+        """
+        self.repo_path = Path(repo_path)
+        self.ref = ref or self._git('symbolic-ref', 'HEAD')
+        self.commits = 0
+        self.bytes_sent = 0
+        self._next_mark = 1
+        self._files: Dict[str, Tuple[str, str]] = {}  # path -> (mode, blob id)
+
+        # Continue an existing branch from its current tip
+        self._parent = self._git('rev-parse', '--verify', '-q', self.ref + '^{commit}',
+                                 check=False) or None
+        if self._parent:
+            for line in self._git('ls-tree', '-r', '-z', self._parent).split('\0'):
+                if line:
+                    info, path = line.split('\t', 1)
+                    mode, _, oid = info.split()
+                    self._files[path] = (mode, oid)
+
+        self._proc = subprocess.Popen(
+            ['git', 'fast-import', '--quiet', '--done'],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def _git(self, *args: str, check: bool = True) -> str:
+        result = subprocess.run(['git', *args], cwd=self.repo_path,
+                                capture_output=True, text=True, check=check)
+        return result.stdout.strip()
+
+    def exists(self, path: str) -> bool:
+        """Whether path is in the branch's current tree"""
+        return path in self._files
+
+    def _write(self, data: bytes) -> None:
+        self._proc.stdin.write(data)
+
+    def _send_blob(self, content: Content, mode: str) -> Tuple[str, str, int]:
+        """Send a blob and return (mode, object id, mark)
+
+        mode is the file's current mode, which content written in place
+        keeps; a copied file takes its source's executable bit instead.
+        """
+        if isinstance(content, Path):
+            mode = '100755' if os.access(content, os.X_OK) else '100644'
+            content = content.read_bytes()
+        if isinstance(content, bytes):
+            content = [TextBlock.from_bytes(content)]
+
+        mark = self._next_mark
+        self._next_mark += 1
+        size = sum(len(block) for block in content)
+        self._write(f"blob\nmark :{mark}\ndata {size}\n".encode())
+        for block in content:
+            block.write_to(self._proc.stdin)
+        self._write(f"\nget-mark :{mark}\n".encode())
+        self._proc.stdin.flush()
+        self.bytes_sent += size
+
+        oid = self._proc.stdout.readline().decode().strip()
+        if not oid:
+            raise RuntimeError(f"git fast-import exited (status {self._proc.poll()})")
+        return mode, oid, mark
+
+    def commit(self, message: str, env: Mapping[str, str],
+               modify: Optional[Mapping[str, Content]] = None,
+               delete: Iterable[str] = (),
+               rename: Optional[Mapping[str, str]] = None) -> bool:
+        """
+        Commit changes to the branch.
+
+        Args:
+            message: Commit message (cleaned up as `git commit -m` would)
+            env: Mapping with the GIT_AUTHOR_* and GIT_COMMITTER_* variables
+            modify: path -> new content
+            delete: Paths to remove
+            rename: old path -> new path (applied before modify and delete)
+
+        Returns:
+            False if nothing changed and no commit was made
+        """
+        commands: List[str] = []
+        files = dict(self._files)
+
+        for old, new in (rename or {}).items():
+            if old in files and old != new:
+                files[new] = files.pop(old)
+                commands.append(f"R {_quote(old)} {_quote(new)}\n")
+
+        for path, content in (modify or {}).items():
+            mode, oid, mark = self._send_blob(content, files.get(path, ('100644',))[0])
+            if files.get(path) != (mode, oid):
+                files[path] = (mode, oid)
+                commands.append(f"M {mode} :{mark} {_quote(path)}\n")
+
+        for path in delete:
+            if path in files:
+                del files[path]
+                commands.append(f"D {_quote(path)}\n")
+
+        if not commands:
+            return False
+
+        data = clean_message(message).encode('utf-8')
+        header = (f"commit {self.ref}\n"
+                  f"author {format_identity(env, 'AUTHOR')}\n"
+                  f"committer {format_identity(env, 'COMMITTER')}\n"
+                  f"data {len(data)}\n").encode('utf-8')
+        self._write(header + data)
+        if self.commits == 0 and self._parent:
+            self._write(f"from {self._parent}\n".encode())
+        self._write(''.join(commands).encode('utf-8') + b'\n')
+
+        self._files = files
+        self.commits += 1
+        return True
+
+    def close(self) -> None:
+        """Finish the import and update the branch ref"""
+        if self._proc.poll() is None:
+            self._write(b"done\n")
+            self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise subprocess.CalledProcessError(self._proc.returncode, 'git fast-import')
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: gc_fast_import.py <repo-path> <target-file> <gc-file>...")
+        print("\nCommits each gc-file in turn as target-file on the current branch.")
+        sys.exit(1)
+
+    repo_path, target, sources = sys.argv[1], sys.argv[2], sys.argv[3:]
+    env = dict(os.environ)
+    now = datetime.now().astimezone().isoformat(timespec='seconds')
+    for role in ('AUTHOR', 'COMMITTER'):
+        env.setdefault(f'GIT_{role}_NAME', 'OASIS UBL TC')
+        env.setdefault(f'GIT_{role}_EMAIL', 'ubl-tc@oasis-open.org')
+        env.setdefault(f'GIT_{role}_DATE', now)
+
+    stream = FastImportStream(repo_path)
+    for source in sources:
+        committed = stream.commit(f"Import {Path(source).name}", env,
+                                  modify={target: Path(source)})
+        print(f"{'Committed' if committed else 'Unchanged'}: {source}")
+    stream.close()
+    print(f"{stream.commits} commits on {stream.ref}, {stream.bytes_sent} bytes sent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Batched Git Plumbing Session
+
+Commits files from the work tree without `git add` / `git diff --cached` /
+`git commit`. Staging happens in memory and objects are written through
+long-lived plumbing processes:
+1. `git hash-object -w --stdin-paths` hashes and stores work tree files
+2. `git mktree --batch` writes the tree for each commit
+3. `git cat-file --batch` reads the existing branch tip when continuing it
+4. `git commit-tree` writes each commit (git has no batch mode for it), and
+   `git update-ref` moves the branch every CHECKPOINT_INTERVAL commits and
+   when the session is closed, so a crash loses at most a few commits
+
+A commit whose tree equals its parent's is skipped, like the
+`git diff --cached --quiet` check, by comparing blob ids in memory. The
+commits are the ones `git commit` would create (same identities, dates,
+message cleanup and file modes); the index is refreshed once on close.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_fast_import import clean_message
+
+CHECKPOINT_INTERVAL = 25  # Commits between branch ref updates
+
+
+class GitSession:
+    """In-memory index plus persistent git plumbing processes for one work tree"""
+
+    def __init__(self, repo_path: str, ref: Optional[str] = None):
+        """
+        Args:
+            repo_path: Work tree of the repository
+            ref: Branch ref to commit to (default: the ref HEAD points to)
+        """
+        self.repo_path = Path(repo_path)
+        self.ref = ref or self._git('symbolic-ref', 'HEAD')
+        self.commits = 0
+        self._index: Dict[str, Tuple[str, str]] = {}  # path -> (mode, blob id)
+        self._committed: Dict[str, Tuple[str, str]] = {}  # Tree of self.head
+        self._hash_object = self._spawn('hash-object', '-w', '--stdin-paths')
+        self._mktree = self._spawn('mktree', '--batch')
+        self._cat_file = self._spawn('cat-file', '--batch')
+
+        # Continue an existing branch from its current tip
+        self.head = self._git('rev-parse', '--verify', '-q', self.ref + '^{commit}',
+                              check=False) or None
+        if self.head:
+            self._committed = self._read_tree(self._commit_tree_id(self.head))
+            self._index = dict(self._committed)
+
+    def _git(self, *args: str, check: bool = True, input: Optional[str] = None,
+             env: Optional[Mapping[str, str]] = None) -> str:
+        result = subprocess.run(['git', *args], cwd=self.repo_path, input=input,
+                                capture_output=True, encoding='utf-8', check=check, env=env)
+        return result.stdout.strip()
+
+    def _spawn(self, *args: str) -> subprocess.Popen:
+        return subprocess.Popen(['git', *args], cwd=self.repo_path,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    @staticmethod
+    def _request(proc: subprocess.Popen, data: bytes) -> bytes:
+        """Send one request to a batch process and read its one-line reply"""
+        proc.stdin.write(data)
+        proc.stdin.flush()
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"{' '.join(proc.args)} exited (status {proc.poll()})")
+        return line.rstrip(b'\n')
+
+    def _read_object(self, oid: str) -> Tuple[str, bytes]:
+        """Read an object with cat-file --batch: (type, content)"""
+        info = self._request(self._cat_file, f"{oid}\n".encode()).decode()
+        _, obj_type, size = info.split()
+        data = self._cat_file.stdout.read(int(size) + 1)[:-1]
+        return obj_type, data
+
+    def _commit_tree_id(self, commit: str) -> str:
+        _, data = self._read_object(commit)
+        return data.split(b'\n', 1)[0].split()[1].decode()
+
+    def _read_tree(self, tree: str, prefix: str = '') -> Dict[str, Tuple[str, str]]:
+        """Flatten a tree object into path -> (mode, blob id)"""
+        entries = {}
+        _, data = self._read_object(tree)
+        pos = 0
+        while pos < len(data):
+            space = data.index(b' ', pos)
+            nul = data.index(b'\0', space)
+            mode = data[pos:space].decode()
+            name = prefix + data[space + 1:nul].decode()
+            oid = data[nul + 1:nul + 21].hex()
+            pos = nul + 21
+            if mode == '40000':
+                entries.update(self._read_tree(oid, name + '/'))
+            else:
+                entries[name] = (mode.rjust(6, '0'), oid)
+        return entries
+
+    def exists(self, path: str) -> bool:
+        """Whether path is staged"""
+        return path in self._index
+
+    def add(self, path: str) -> None:
+        """Stage the work tree file path (git add)"""
+        full_path = self.repo_path / path
+        mode = '100755' if os.access(full_path, os.X_OK) else '100644'
+        oid = self._request(self._hash_object, f"{full_path}\n".encode()).decode()
+        self._index[path] = (mode, oid)
+
+    def remove(self, path: str) -> None:
+        """Unstage path and delete it from the work tree (git rm)"""
+        if path not in self._index:
+            raise KeyError(f"{path} is not staged")
+        del self._index[path]
+        (self.repo_path / path).unlink(missing_ok=True)
+
+    def move(self, old: str, new: str) -> None:
+        """Rename a staged file in the index and the work tree (git mv)"""
+        if old not in self._index:
+            raise KeyError(f"{old} is not staged")
+        self._index[new] = self._index.pop(old)
+        (self.repo_path / old).rename(self.repo_path / new)
+
+    def _write_tree(self, entries: Dict[str, Tuple[str, str]]) -> str:
+        """Write (nested) trees for path -> (mode, blob id) and return the root id"""
+        files, dirs = [], {}
+        for path, entry in entries.items():
+            if '\n' in path:
+                raise ValueError(f"Unsupported path: {path!r}")
+            name, sep, rest = path.partition('/')
+            if sep:
+                dirs.setdefault(name, {})[rest] = entry
+            else:
+                files.append(f"{entry[0]} blob {entry[1]}\t{name}\n")
+        for name, sub_entries in dirs.items():
+            files.append(f"040000 tree {self._write_tree(sub_entries)}\t{name}\n")
+        return self._request(self._mktree, ''.join(files).encode('utf-8') + b'\n').decode()
+
+    def commit(self, message: str, env: Mapping[str, str]) -> bool:
+        """
+        Commit the staged files on top of the branch.
+
+        Args:
+            message: Commit message (cleaned up as `git commit -m` would)
+            env: Environment with the GIT_AUTHOR_* and GIT_COMMITTER_* variables
+
+        Returns:
+            False if nothing changed and no commit was made
+        """
+        if self._index == self._committed:
+            return False
+
+        tree = self._write_tree(self._index)
+        args = ['commit-tree', tree]
+        if self.head:
+            args += ['-p', self.head]
+        self.head = self._git(*args, input=clean_message(message), env=dict(env))
+        self._committed = dict(self._index)
+        self.commits += 1
+        if self.commits % CHECKPOINT_INTERVAL == 0:
+            self._git('update-ref', self.ref, self.head)
+        return True
+
+    def close(self) -> None:
+        """Stop the batch processes, move the branch and refresh the index"""
+        for proc in (self._hash_object, self._mktree, self._cat_file):
+            if proc.poll() is None:
+                proc.stdin.close()
+                proc.wait()
+        if self.head:
+            self._git('update-ref', self.ref, self.head)
+            if self._git('symbolic-ref', '-q', 'HEAD', check=False) == self.ref:
+                self._git('reset', '-q')
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: gc_git.py <repo-path> <file>... ")
+        print("\nStages the given work tree files and commits them with a GitSession.")
+        sys.exit(1)
+
+    session = GitSession(sys.argv[1])
+    for path in sys.argv[2:]:
+        session.add(path)
+    committed = session.commit(f"Update {', '.join(sys.argv[2:])}", os.environ)
+    session.close()
+    print(f"{'Committed ' + session.head if committed else 'Nothing to commit'} on {session.ref}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Integer-Indexed Dependency Graph Engine
+
+Iterative graph algorithms for the ABIE dependency analysis, over node ids
+instead of object-class strings:
+1. CSRGraph stores adjacency as two `array`s (CSR layout): the successors
+   of node v are targets[offsets[v]:offsets[v + 1]], sorted by id
+2. tarjan_scc() finds strongly connected components with an explicit call
+   stack, so depth is not bounded by Python's recursion limit
+3. condense() builds the SCC-condensed DAG, topological_order() sorts it
+   with an iterative post-order DFS
+4. DependencyIndex keeps the SCCs of a name-keyed graph plus each
+   component's height in the condensation, and updates both in place when
+   nodes are added, removed or change their dependencies, touching only
+   the part of the graph that can be affected. Its dependency order is
+   GCAnalyzer's (Tarjan, then the post-order DFS of the condensation),
+   recomputed over the whole graph after an update, when first needed
+
+The ordering is fully deterministic: nodes are visited in id order and
+successors in ascending id order. GCAnalyzer numbers nodes by sorted
+object-class name, so results never depend on set iteration order (and
+hence not on PYTHONHASHSEED). Both algorithms are O(nodes + edges) and
+handle graphs with hundreds of thousands of nodes.
+"""
+
+import heapq
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+class CSRGraph:
+    """Directed graph over node ids 0..size-1 in compressed sparse row form"""
+
+    def __init__(self, offsets: array, targets: array):
+        """
+        Args:
+            offsets: size + 1 entries; node v's edges are
+                     targets[offsets[v]:offsets[v + 1]]
+            targets: Edge targets, sorted by id within each node
+        """
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_lists(cls, successors: Sequence[Iterable[int]]) -> 'CSRGraph':
+        """Build from one iterable of successor ids per node (duplicates dropped)"""
+        offsets = array('q', [0])
+        targets = array('q')
+        for succ in successors:
+            targets.extend(sorted(set(succ)))
+            offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    @classmethod
+    def from_adjacency(cls, names: Sequence[str],
+                       edges: Mapping[str, Iterable[str]]) -> 'CSRGraph':
+        """
+        Build from name-keyed adjacency. Node ids are positions in names;
+        edges to names not in names are dropped.
+        """
+        ids = {name: i for i, name in enumerate(names)}
+        return cls.from_lists([
+            [ids[dep] for dep in edges.get(name, ()) if dep in ids]
+            for name in names
+        ])
+
+    @property
+    def size(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def successors(self, v: int) -> array:
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+
+
+def tarjan_scc(graph: CSRGraph) -> List[List[int]]:
+    """
+    Strongly connected components (Tarjan's algorithm, iterative).
+
+    Roots are tried in id order and successors followed in id order, so
+    the result is what the recursive formulation produces for that order.
+    Components are returned in reverse topological order (a component
+    comes after every component it has edges to), members in pop order.
+    """
+    n = graph.size
+    offsets, targets = graph.offsets, graph.targets
+    index = array('q', [-1]) * n
+    lowlink = array('q', [0]) * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    sccs: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        # Explicit call stack: (node, next edge position)
+        call: List[Tuple[int, int]] = [(root, offsets[root])]
+
+        while call:
+            v, pos = call[-1]
+            end = offsets[v + 1]
+            descended = False
+            while pos < end:
+                w = targets[pos]
+                pos += 1
+                if index[w] == -1:
+                    # "Recurse" into w, resuming v at pos afterwards
+                    call[-1] = (v, pos)
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    call.append((w, offsets[w]))
+                    descended = True
+                    break
+                if on_stack[w] and index[w] < lowlink[v]:
+                    lowlink[v] = index[w]
+            if descended:
+                continue
+
+            # All of v's edges done: "return" to the caller
+            call.pop()
+            if lowlink[v] == index[v]:
+                scc = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    scc.append(w)
+                    if w == v:
+                        break
+                sccs.append(scc)
+            if call:
+                u = call[-1][0]
+                if lowlink[v] < lowlink[u]:
+                    lowlink[u] = lowlink[v]
+
+    return sccs
+
+
+def condense(graph: CSRGraph, sccs: List[List[int]]) -> Tuple[array, CSRGraph]:
+    """
+    The SCC-condensed DAG.
+
+    Returns:
+        (component id of each node, DAG over component ids without
+        self-loops)
+    """
+    component = array('q', [0]) * graph.size
+    for c, members in enumerate(sccs):
+        for v in members:
+            component[v] = c
+
+    offsets, targets = graph.offsets, graph.targets
+    dag_successors = []
+    for members in sccs:
+        deps = set()
+        for v in members:
+            for pos in range(offsets[v], offsets[v + 1]):
+                deps.add(component[targets[pos]])
+        deps.discard(component[members[0]])
+        dag_successors.append(deps)
+    return component, CSRGraph.from_lists(dag_successors)
+
+
+def topological_order(dag: CSRGraph) -> List[int]:
+    """
+    Topological order of a DAG, dependencies first (iterative post-order
+    DFS; roots in id order, successors in id order).
+    """
+    n = dag.size
+    offsets, targets = dag.offsets, dag.targets
+    visited = bytearray(n)
+    order: List[int] = []
+
+    for root in range(n):
+        if visited[root]:
+            continue
+        visited[root] = 1
+        call: List[Tuple[int, int]] = [(root, offsets[root])]
+        while call:
+            v, pos = call[-1]
+            end = offsets[v + 1]
+            while pos < end and visited[targets[pos]]:
+                pos += 1
+            if pos < end:
+                w = targets[pos]
+                call[-1] = (v, pos + 1)
+                visited[w] = 1
+                call.append((w, offsets[w]))
+            else:
+                call.pop()
+                order.append(v)
+    return order
+
+
+class DependencyIndex:
+    """
+    SCC condensation and dependency order of a name-keyed graph.
+
+    Each node lists the names it depends on; references to names that are
+    not nodes (or to the node itself) are kept but are not edges. A
+    component's height is 0 without dependencies, else one more than its
+    highest dependency. The components and heights are a function of the
+    graph alone, so an index updated release after release has the same
+    ones as an index built from scratch.
+
+    The dependency order is GCAnalyzer.get_abie_commit_order()'s: nodes
+    numbered by sorted name, tarjan_scc(), then topological_order() of the
+    condensation. It depends on the whole graph, so it is not updated
+    incrementally but recomputed (O(nodes + edges)) the first time it is
+    needed after an update.
+    """
+
+    def __init__(self):
+        self.deps: Dict[str, FrozenSet[str]] = {}  # node -> referenced names
+        self.component: Dict[str, int] = {}  # node -> component id
+        self.members: Dict[int, Tuple[str, ...]] = {}  # component id -> sorted names
+        self.height: Dict[int, int] = {}  # component id -> height
+        self._referrers: Dict[str, FrozenSet[str]] = {}  # name -> nodes referencing it
+        self._next_id = 0
+        self._rank: Optional[Dict[str, int]] = None  # node -> position of its SCC in the order
+
+    @classmethod
+    def build(cls, deps: Mapping[str, Iterable[str]]) -> 'DependencyIndex':
+        """Index a whole graph (node -> referenced names)"""
+        index = cls()
+        index.update(deps)
+        return index
+
+    def copy(self) -> 'DependencyIndex':
+        """An independent index (all values are immutable, so shallow copies suffice)"""
+        other = DependencyIndex()
+        other.deps = dict(self.deps)
+        other.component = dict(self.component)
+        other.members = dict(self.members)
+        other.height = dict(self.height)
+        other._referrers = dict(self._referrers)
+        other._next_id = self._next_id
+        other._rank = self._rank  # Replaced, never modified, on update
+        return other
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.deps
+
+    def __len__(self) -> int:
+        return len(self.deps)
+
+    def rank(self) -> Dict[str, int]:
+        """node -> position of its component in the dependency order"""
+        if self._rank is None:
+            names = sorted(self.deps)
+            graph = CSRGraph.from_adjacency(names, {n: list(self._edges(n)) for n in names})
+            sccs = tarjan_scc(graph)
+            _, dag = condense(graph, sccs)
+            self._rank = {names[v]: position
+                          for position, c in enumerate(topological_order(dag))
+                          for v in sccs[c]}
+        return self._rank
+
+    def sort(self, names: Iterable[str], position: Optional[Callable[[str], int]] = None) -> List[str]:
+        """
+        names in dependency order; names that are not nodes go last, sorted.
+
+        Args:
+            names: Names to order
+            position: Orders members of one component (GCAnalyzer uses the
+                      ABIE's row number); default by name
+        """
+        rank = self.rank()
+        tiebreak = position or (lambda name: name)
+        names = set(names)
+        known = [n for n in names if n in self.deps]
+        return (sorted(known, key=lambda n: (rank[n], tiebreak(n)))
+                + sorted(names.difference(known)))
+
+    def order(self, position: Optional[Callable[[str], int]] = None) -> List[str]:
+        """Every node in dependency order (position as for sort())"""
+        return self.sort(self.deps, position)
+
+    def _edges(self, name: str) -> Iterable[str]:
+        return (d for d in self.deps[name] if d != name and d in self.deps)
+
+    def _component_successors(self, c: int) -> Set[int]:
+        succ = {self.component[d] for m in self.members[c] for d in self._edges(m)}
+        succ.discard(c)
+        return succ
+
+    def _component_predecessors(self, c: int) -> Set[int]:
+        pred = {self.component[r] for m in self.members[c]
+                for r in self._referrers.get(m, ()) if r != m}
+        pred.discard(c)
+        return pred
+
+    def _link(self, name: str, deps: FrozenSet[str], add: bool) -> None:
+        for d in deps:
+            referrers = self._referrers.get(d, frozenset())
+            referrers = referrers | {name} if add else referrers - {name}
+            if referrers:
+                self._referrers[d] = referrers
+            else:
+                del self._referrers[d]
+
+    def update(self, changes: Mapping[str, Optional[Iterable[str]]]) -> None:
+        """
+        Apply node changes: name -> its new referenced names, or None to
+        remove the node. Unchanged entries cost nothing.
+
+        Only components that can change are recomputed: those of nodes
+        whose outgoing edges changed (D), plus every node that both reaches
+        and is reachable from D (any new cycle runs through D). Heights are
+        then recomputed for the new components and propagated to their
+        ancestors only while they keep changing.
+        """
+        changed: Set[str] = set()  # Nodes whose outgoing edges may differ
+        stale: Set[int] = set()  # Components to dissolve
+        for name, deps in changes.items():
+            new = None if deps is None else frozenset(deps)
+            old = self.deps.get(name)
+            if old == new:
+                continue
+            if old is not None:
+                self._link(name, old, add=False)
+                stale.add(self.component[name])
+            if new is None:
+                del self.deps[name]
+                del self.component[name]
+                changed.discard(name)
+            else:
+                self.deps[name] = new
+                self._link(name, new, add=True)
+                changed.add(name)
+            if old is None or new is None:
+                # References to name became (or stopped being) edges
+                changed.update(self._referrers.get(name, ()))
+        changed.intersection_update(self.deps)
+        if not changed and not stale:
+            return
+        self._rank = None
+
+        # Region: ancestors of D that are also descendants of D
+        ancestors = set(changed)
+        stack = list(changed)
+        while stack:
+            for r in self._referrers.get(stack.pop(), ()):
+                if r not in ancestors:
+                    ancestors.add(r)
+                    stack.append(r)
+        region = set(changed)
+        stack = list(changed)
+        while stack:
+            for d in self.deps[stack.pop()]:
+                if d in ancestors and d not in region:
+                    region.add(d)
+                    stack.append(d)
+
+        # Dissolve every component the region touches (whole components
+        # are inside the region, except those that lost members to D)
+        stale.update(self.component[n] for n in region if n in self.component)
+        for c in stale:
+            region.update(m for m in self.members.pop(c) if m in self.deps)
+            del self.height[c]
+
+        # New components, in reverse topological order (dependencies first)
+        names = sorted(region)
+        graph = CSRGraph.from_adjacency(names, {n: self.deps[n] for n in names})
+        new_components = []
+        for scc in tarjan_scc(graph):
+            c = self._next_id
+            self._next_id += 1
+            self.members[c] = tuple(sorted(names[v] for v in scc))
+            for m in self.members[c]:
+                self.component[m] = c
+            new_components.append(c)
+
+        pending = []
+        for c in new_components:
+            self.height[c] = max((self.height[s] + 1 for s in self._component_successors(c)),
+                                 default=0)
+        for c in new_components:
+            for p in self._component_predecessors(c):
+                heapq.heappush(pending, (self.height[p], p))
+
+        # Propagate height changes up to the ancestors
+        while pending:
+            _, c = heapq.heappop(pending)
+            height = max((self.height[s] + 1 for s in self._component_successors(c)), default=0)
+            if height != self.height[c]:
+                self.height[c] = height
+                for p in self._component_predecessors(c):
+                    heapq.heappush(pending, (self.height[p], p))
+
+
+def check_order(repo_root: str) -> int:
+    """
+    Carry DependencyIndexes through every release file as the history
+    build does and compare each one's order with GCAnalyzer's commit order
+    for the file (which a build from scratch would use).
+
+    Returns:
+        Number of files whose orders differ
+    """
+    import contextlib
+    import io
+    import os
+    from gc_analyzer import GCAnalyzer
+    from gc_diff import GCDiff
+    from release_manifest import FILE_TYPES, RELEASES, get_release_file
+
+    failures = 0
+    for file_type in FILE_TYPES:
+        paths = [os.path.join(repo_root, rel) for rel in
+                 (get_release_file(release, file_type) for release in RELEASES) if rel]
+        paths = [path for path in paths if os.path.exists(path)]
+        for old_file, new_file in zip(paths, paths[1:]):
+            with contextlib.redirect_stdout(io.StringIO()):
+                differ = GCDiff(old_file, new_file)
+                groups = differ.new_doc.abie_groups
+                carried = differ.dependency_index().order(position=lambda name: groups[name][0])
+                analyzer = GCAnalyzer(new_file, document=differ.new_doc)
+                analyzer.parse()
+                analyzer.build_abies()
+                analyzer.build_dependency_graph()
+                expected = [abie.object_class for abies in analyzer.get_abie_commit_order()
+                            for abie in abies]
+            if carried != expected:
+                failures += 1
+                first = next(i for i, (a, b) in enumerate(zip(carried + [None], expected + [None]))
+                             if a != b)
+                print(f"DIFFERS {new_file}: position {first} "
+                      f"(carried {carried[first:first + 3]}, analyzer {expected[first:first + 3]})")
+            else:
+                print(f"ok      {new_file}: {len(carried)} ABIEs")
+    return failures
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: gc_graph.py <gc-file> | --chain <nodes> | --check <repo-root>")
+        print("\nTimes SCC detection and topological sorting on a release's ABIE")
+        print("graph, or on a synthetic dependency chain with a cycle at its end.")
+        print("With --check, verifies that carried-forward dependency indexes order")
+        print("every release file's ABIEs as GCAnalyzer does.")
+        sys.exit(1)
+
+    if sys.argv[1] == '--check':
+        failures = check_order(sys.argv[2] if len(sys.argv) > 2 else '.')
+        print(f"{failures} files ordered differently" if failures else "All orders match GCAnalyzer")
+        sys.exit(1 if failures else 0)
+
+    if sys.argv[1] == '--chain':
+        n = int(sys.argv[2])
+        graph = CSRGraph.from_lists([[v + 1] if v + 1 < n else [n - 2] for v in range(n)])
+    else:
+        from gc_analyzer import GCAnalyzer
+        analyzer = GCAnalyzer(sys.argv[1])
+        analyzer.parse()
+        analyzer.build_abies()
+        analyzer.build_dependency_graph()
+        names = sorted(analyzer.abies)
+        graph = CSRGraph.from_adjacency(names, analyzer.dependency_graph)
+
+    start = time.perf_counter()
+    sccs = tarjan_scc(graph)
+    mid = time.perf_counter()
+    _, dag = condense(graph, sccs)
+    order = topological_order(dag)
+    end = time.perf_counter()
+
+    print(f"{graph.size} nodes, {graph.edge_count} edges")
+    print(f"  {len(sccs)} SCCs ({sum(1 for s in sccs if len(s) > 1)} multi-node) "
+          f"in {mid - start:.3f}s")
+    print(f"  Topological order of {len(order)} components in {end - mid:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+ABIE Impact Index
+
+Precomputed reverse dependencies and reachability for one release's ABIE
+graph, so impact questions ("which document types does a change to
+Address affect, and through which ABIEs?") are answered with bit
+operations instead of a graph walk per query:
+1. Forward and reverse adjacency in CSR form (gc_graph.CSRGraph): the
+   ABIEs an ABIE uses and the ABIEs that use it directly
+2. Transitive closure in both directions as int bitsets, one per SCC,
+   built in a single pass over the DependencyIndex's components in height
+   order (a component's closure is the union of its neighbours')
+3. Document types: the root ABIEs that no other ABIE uses (Invoice,
+   Order, ...)
+
+reaches() is one bit test, blast_radius() a mask and a popcount, and
+path() only ever steps to ABIEs the closure says lead to the target.
+"""
+
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_graph import CSRGraph, DependencyIndex
+
+
+@dataclass(frozen=True)
+class BlastRadius:
+    """What a change to one ABIE can affect"""
+    object_class: str
+    dependents: int  # ABIEs that use it, directly or transitively
+    documents: Tuple[str, ...]  # Document types among them (itself, if it is one)
+
+    def summary(self) -> str:
+        return f"{self.dependents} dependent ABIEs, {len(self.documents)} document types"
+
+
+def _bit_ids(bits: int) -> List[int]:
+    """Positions of the set bits, ascending"""
+    ids = []
+    while bits:
+        low = bits & -bits
+        ids.append(low.bit_length() - 1)
+        bits ^= low
+    return ids
+
+
+class ImpactIndex:
+    """Reverse adjacency and bitset transitive closure of an ABIE graph"""
+
+    def __init__(self, dependencies: DependencyIndex):
+        self.names: List[str] = sorted(dependencies.deps)  # Node id -> object class
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+
+        self.uses = CSRGraph.from_adjacency(self.names, dependencies.deps)
+        used_by: List[List[int]] = [[] for _ in range(n)]
+        for v in range(n):
+            for w in self.uses.successors(v):
+                if w != v:
+                    used_by[w].append(v)
+        self.used_by = CSRGraph.from_lists(used_by)
+
+        # Components in height order: dependencies before their users
+        components = sorted(dependencies.members,
+                            key=lambda c: (dependencies.height[c], dependencies.members[c][0]))
+        self._component = array('q', [0]) * n  # Node id -> position in components
+        masks = []
+        cyclic = []
+        for i, c in enumerate(components):
+            mask = 0
+            for name in dependencies.members[c]:
+                v = self.ids[name]
+                self._component[v] = i
+                mask |= 1 << v
+            masks.append(mask)
+            first = dependencies.members[c][0]
+            cyclic.append(len(dependencies.members[c]) > 1 or first in dependencies.deps[first])
+
+        successors = [set() for _ in components]
+        predecessors = [set() for _ in components]
+        for v in range(n):
+            cv = self._component[v]
+            for w in self.uses.successors(v):
+                cw = self._component[w]
+                if cw != cv:
+                    successors[cv].add(cw)
+                    predecessors[cw].add(cv)
+
+        # A component reaches itself only through a cycle
+        self._descendants: List[int] = []
+        for i in range(len(components)):
+            bits = masks[i] if cyclic[i] else 0
+            for s in successors[i]:
+                bits |= self._descendants[s] | masks[s]
+            self._descendants.append(bits)
+
+        self._ancestors: List[int] = [0] * len(components)
+        for i in reversed(range(len(components))):
+            bits = masks[i] if cyclic[i] else 0
+            for p in predecessors[i]:
+                bits |= self._ancestors[p] | masks[p]
+            self._ancestors[i] = bits
+
+        self.roots = 0  # Bitset of document types
+        for v in range(n):
+            if self.used_by.offsets[v] == self.used_by.offsets[v + 1]:
+                self.roots |= 1 << v
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def _names(self, bits: int) -> List[str]:
+        return [self.names[v] for v in _bit_ids(bits)]
+
+    def dependents(self, name: str) -> List[str]:
+        """ABIEs that use name directly"""
+        return [self.names[w] for w in self.used_by.successors(self.ids[name])]
+
+    def ancestors(self, name: str) -> List[str]:
+        """ABIEs that use name directly or transitively"""
+        return self._names(self._ancestors[self._component[self.ids[name]]])
+
+    def descendants(self, name: str) -> List[str]:
+        """ABIEs name uses directly or transitively"""
+        return self._names(self._descendants[self._component[self.ids[name]]])
+
+    def reaches(self, source: str, target: str) -> bool:
+        """Whether source uses target directly or transitively"""
+        bits = self._descendants[self._component[self.ids[source]]]
+        return bool(bits >> self.ids[target] & 1)
+
+    def documents(self) -> List[str]:
+        """All document types (root ABIEs)"""
+        return self._names(self.roots)
+
+    def affected_documents(self, name: str) -> List[str]:
+        """Document types that contain name (including name itself if it is one)"""
+        v = self.ids[name]
+        return self._names((self._ancestors[self._component[v]] | 1 << v) & self.roots)
+
+    def blast_radius(self, name: str) -> BlastRadius:
+        v = self.ids[name]
+        ancestors = self._ancestors[self._component[v]] & ~(1 << v)
+        documents = (ancestors | 1 << v) & self.roots
+        return BlastRadius(name, ancestors.bit_count(), tuple(self._names(documents)))
+
+    def path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        A shortest chain of ABIEs from source down to target, or None.
+        The search only enters ABIEs that reach target.
+        """
+        if source not in self.ids or target not in self.ids:
+            return None
+        src, dst = self.ids[source], self.ids[target]
+        if src == dst:
+            return [source]
+        if not self.reaches(source, target):
+            return None
+
+        previous = {src: src}
+        frontier = [src]
+        while frontier:
+            next_frontier = []
+            for v in frontier:
+                for w in self.uses.successors(v):
+                    if w in previous:
+                        continue
+                    if w == dst:
+                        chain = [dst, v]
+                        while chain[-1] != src:
+                            chain.append(previous[chain[-1]])
+                        return [self.names[u] for u in reversed(chain)]
+                    if self._descendants[self._component[w]] >> dst & 1:
+                        previous[w] = v
+                        next_frontier.append(w)
+            frontier = next_frontier
+        return None
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: gc_impact.py <gc-file> <object-class>")
+        print("\nShows which ABIEs and document types a change to an ABIE affects,")
+        print("with one dependency path from each document type.")
+        sys.exit(1)
+
+    from gc_analyzer import abie_dependencies
+    from gc_loader import load_gc_file
+
+    document = load_gc_file(sys.argv[1])
+    start = time.perf_counter()
+    index = ImpactIndex(DependencyIndex.build(abie_dependencies(document)))
+    built = time.perf_counter() - start
+
+    name = sys.argv[2]
+    if name not in index:
+        print(f"No ABIE with object class {name!r} in {sys.argv[1]}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    radius = index.blast_radius(name)
+    query = time.perf_counter() - start
+
+    print(f"Index of {len(index.names)} ABIEs built in {built * 1000:.1f} ms")
+    print(f"{name}: {radius.summary()} (query {query * 1e6:.0f} us)")
+    print(f"  Used directly by: {', '.join(index.dependents(name)) or '-'}")
+    for document in radius.documents:
+        print(f"  {' -> '.join(index.path(document, name))}")
+
+
+if __name__ == '__main__':
+    main()
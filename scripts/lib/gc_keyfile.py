@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Sorted Key File
+
+The on-disk format shared by the cross-release indexes (gc_lineage,
+gc_name_index, ...): a table of byte-string keys, sorted, each with an
+opaque payload, plus a small JSON metadata block:
+1. Header: magic, format version, key count, metadata length
+2. Metadata (JSON), then key and payload offset tables (uint64 each)
+3. Key blob, then payload blob; every section and payload starts on an
+   8-byte boundary so payloads can be cast to typed memoryviews in place
+
+KeyFile maps the file read-only and finds keys by binary search, so
+opening an index is O(1) and a lookup touches O(log n) keys plus the
+payload it returns. Writes go to a temporary file that is renamed into
+place, so readers never see a partial index.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sIIQ')  # magic, format, key count, metadata length
+_ALIGN = 8
+
+
+def _pad(size: int) -> bytes:
+    return b'\0' * (-size % _ALIGN)
+
+
+def release_fingerprint(hashes: Dict[str, str], *extra) -> str:
+    """
+    Identifies the release files an index was built from.
+
+    Args:
+        hashes: Result of release_manifest.build_content_hashes()
+        extra: Anything else the index depends on (e.g. its own format version)
+    """
+    return hashlib.sha256(json.dumps([*extra, sorted(hashes.items())]).encode('utf-8')).hexdigest()
+
+
+def default_index_path(repo_root: str, file_name: str) -> str:
+    """Where an index lives by default: .cache/ubl-gc/ under the repository root"""
+    return os.path.join(str(repo_root), '.cache', 'ubl-gc', file_name)
+
+
+def write_key_file(path: str, magic: bytes, metadata: dict,
+                   entries: Iterable[Tuple[bytes, bytes]]) -> int:
+    """
+    Write a key file atomically.
+
+    Args:
+        path: Destination file
+        magic: 8-byte file type marker checked by KeyFile
+        metadata: JSON-serialisable dict stored with the table
+        entries: (key, payload) pairs; keys must be unique, any order
+
+    Returns:
+        Size of the file in bytes
+    """
+    entries = sorted(entries)
+    meta = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+    meta += b' ' * len(_pad(_HEADER.size + len(meta)))  # JSON allows trailing whitespace
+
+    key_offsets = array('Q', [0])
+    payload_offsets = array('Q', [0])
+    keys = bytearray()
+    payloads = bytearray()
+    previous = None
+    for key, payload in entries:
+        if key == previous:
+            raise ValueError(f"Duplicate key {key!r}")
+        previous = key
+        keys += key
+        key_offsets.append(len(keys))
+        payloads += payload
+        payloads += _pad(len(payloads))
+        payload_offsets.append(len(payloads))
+    keys += _pad(len(keys))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(magic, FORMAT_VERSION, len(entries), len(meta)))
+        f.write(meta)
+        f.write(key_offsets.tobytes())
+        f.write(payload_offsets.tobytes())
+        f.write(keys)
+        f.write(payloads)
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+class KeyFile:
+    """Read-only, memory-mapped sorted key table"""
+
+    def __init__(self, path: str, magic: bytes):
+        """
+        Raises:
+            ValueError: path is not a key file of this type and format
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            file_magic, version, count, meta_len = _HEADER.unpack_from(self._map)
+            if file_magic != magic or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a {magic.rstrip(bytes(1)).decode()} file "
+                                 f"(format {FORMAT_VERSION})")
+            self.metadata: dict = json.loads(self._map[_HEADER.size:_HEADER.size + meta_len])
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is truncated") from None
+        except ValueError:
+            self._map.close()
+            raise
+
+        view = memoryview(self._map)
+        offset = _HEADER.size + meta_len
+        table = 8 * (count + 1)
+        self._key_offsets = view[offset:offset + table].cast('Q')
+        offset += table
+        self._payload_offsets = view[offset:offset + table].cast('Q')
+        offset += table
+        key_len = self._key_offsets[count]
+        self._keys = view[offset:offset + key_len]
+        offset += key_len + len(_pad(key_len))
+        self._payloads = view[offset:offset + self._payload_offsets[count]]
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        for view in (self._key_offsets, self._payload_offsets, self._keys, self._payloads):
+            view.release()
+        self._map.close()
+
+    def key(self, i: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def payload(self, i: int) -> memoryview:
+        """The i-th key's payload (padded to a multiple of 8 bytes)"""
+        return self._payloads[self._payload_offsets[i]:self._payload_offsets[i + 1]]
+
+    def lower_bound(self, key: bytes) -> int:
+        """Index of the first key >= key"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: bytes) -> Optional[int]:
+        """Index of key, or None"""
+        i = self.lower_bound(key)
+        return i if i < self._count and self.key(i) == key else None
+
+    def prefix_range(self, prefix: bytes) -> range:
+        """Indexes of the keys that start with prefix"""
+        # The first key past the prefix is the first key >= its successor
+        successor = prefix.rstrip(b'\xff')
+        if not successor:
+            return range(self.lower_bound(prefix), self._count)
+        successor = successor[:-1] + bytes([successor[-1] + 1])
+        return range(self.lower_bound(prefix), self.lower_bound(successor))
+
+
+def open_current(path: str, magic: bytes, fingerprint: str) -> Optional[KeyFile]:
+    """
+    Open path if it is a readable key file of this type whose metadata
+    'fingerprint' matches; None if it is missing, unreadable or stale.
+    """
+    try:
+        index = KeyFile(path, magic)
+    except (OSError, ValueError):
+        return None
+    if index.metadata.get('fingerprint') != fingerprint:
+        index.close()
+        return None
+    return index
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: gc_keyfile.py <index-file>")
+        print("\nPrints the metadata summary and key count of an index file.")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    with open(path, 'rb') as f:
+        magic = f.read(8)
+    index = KeyFile(path, magic)
+    print(f"{path}: {magic.rstrip(bytes(1)).decode()}, {len(index)} keys, "
+          f"{os.path.getsize(path)} bytes")
+    for name, value in index.metadata.items():
+        summary = f"{len(value)} entries" if isinstance(value, (list, dict)) else value
+        print(f"  {name}: {summary}")
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
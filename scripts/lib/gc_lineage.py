@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Dictionary Entry Lineage Index
+
+Records the history of every DictionaryEntryName across all releases in
+the manifest, per file type, and stores it in a compact file that answers
+"when did this entry appear, change and disappear?" without touching git
+or re-parsing a release:
+1. Build: each file type's releases are walked in manifest order and
+   compared with the previous release that has that file. Byte-identical
+   files (content hashes) are skipped outright, and ABIE groups and rows
+   whose content digests match are skipped the way GCDiff skips them;
+   only the remaining rows are compared value by value
+2. Events: 'added' (first appearance, or reappearance), 'changed' (with
+   the ColumnRefs whose values differ) and 'removed'. Columns that are
+   only in one release's ColumnSet are not counted as row changes
+3. Storage: a gc_keyfile table of DENs (sorted by their UTF-8 bytes),
+   each with its events as 16-bit words. The file is memory-mapped and
+   looked up by binary search, so opening it costs nothing and a query
+   reads a few hundred bytes
+
+The index records a fingerprint of the release files it was built from;
+LineageIndex.load_or_build() rebuilds it when a file has changed.
+Releases whose file is missing on disk are skipped (their changes are
+attributed to the next release present).
+"""
+
+import os
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_keyfile import KeyFile, default_index_path, open_current, release_fingerprint, write_key_file
+from gc_loader import GCDocument, load_gc_file
+from gc_row_diff import ROW_KEY
+from release_manifest import FILE_TYPES, RELEASES, build_content_hashes, get_release_file
+
+EVENT_KINDS = ('added', 'changed', 'removed')
+ADDED, CHANGED, REMOVED = range(len(EVENT_KINDS))
+INDEX_FORMAT = 2
+MAGIC = b'lineage\0'
+
+DEFAULT_INDEX_FILE = 'lineage.idx'
+
+# (release, file type, kind, changed column ids)
+RawEvent = Tuple[int, int, int, Tuple[int, ...]]
+
+
+@dataclass(frozen=True)
+class LineageEvent:
+    """One step in the history of a DictionaryEntryName"""
+    release: str  # Release label
+    file_type: str  # entities, signature or endorsed
+    kind: str  # added, changed or removed
+    columns: Tuple[str, ...] = ()  # ColumnRefs whose values changed
+
+    def describe(self) -> str:
+        text = f"{self.release}: {self.kind}"
+        if self.file_type != 'entities':
+            text += f" ({self.file_type})"
+        if self.columns:
+            text += f" [{', '.join(self.columns)}]"
+        return text
+
+
+def _rows_by_den(doc: GCDocument) -> Dict[str, Tuple[str, int]]:
+    """DEN -> (object class, row number); the first row wins for duplicates"""
+    rows = {}
+    for object_class, row_nums in doc.abie_groups.items():
+        for row_num in row_nums:
+            den = doc.row_values[row_num].get(ROW_KEY)
+            if den and den not in rows:
+                rows[den] = (object_class, row_num)
+    return rows
+
+
+def _changed_columns(old: Dict[str, str], new: Dict[str, str], shared) -> List[str]:
+    return [column for column in shared if old.get(column, '') != new.get(column, '')]
+
+
+def _fingerprint(hashes: Dict[str, str]) -> str:
+    return release_fingerprint(hashes, MAGIC.decode(), INDEX_FORMAT)
+
+
+class LineageBuilder:
+    """Collects lineage events release by release"""
+
+    def __init__(self):
+        self.columns: List[str] = []
+        self._column_ids: Dict[str, int] = {}
+        self.events: Dict[str, List[RawEvent]] = {}
+
+    def _column_id(self, column: str) -> int:
+        if column not in self._column_ids:
+            self._column_ids[column] = len(self.columns)
+            self.columns.append(column)
+        return self._column_ids[column]
+
+    def _record(self, den: str, release: int, file_type: int, kind: int,
+                columns: Tuple[int, ...] = ()) -> None:
+        self.events.setdefault(den, []).append((release, file_type, kind, columns))
+
+    def compare(self, release: int, file_type: int,
+                old: Optional[GCDocument], new: Optional[GCDocument]) -> None:
+        """Record the events between two versions of a file (None: file absent)"""
+        old_rows = _rows_by_den(old) if old is not None else {}
+        new_rows = _rows_by_den(new) if new is not None else {}
+        old_columns = set(old.columns) if old is not None else set()
+        shared = [c for c in new.columns if c in old_columns] if new is not None else []
+
+        for den, (object_class, row_num) in new_rows.items():
+            if den not in old_rows:
+                self._record(den, release, file_type, ADDED)
+                continue
+            old_class, old_row = old_rows[den]
+            if old_class == object_class and old.abie_digests.get(object_class) == new.abie_digests[object_class]:
+                continue
+            if old.row_digest(old_row) == new.row_digest(row_num):
+                continue
+            columns = _changed_columns(old.row_values[old_row], new.row_values[row_num], shared)
+            if columns:
+                self._record(den, release, file_type, CHANGED,
+                             tuple(self._column_id(c) for c in columns))
+
+        for den in old_rows:
+            if den not in new_rows:
+                self._record(den, release, file_type, REMOVED)
+
+
+def build_lineage(repo_root: str, verbose: bool = False) -> Tuple[LineageBuilder, str]:
+    """
+    Walk every release in the manifest and collect the lineage events.
+
+    Returns:
+        (builder, fingerprint of the release files the events came from)
+    """
+    repo_root = str(repo_root)
+    hashes = build_content_hashes(repo_root)
+    fingerprint = _fingerprint(hashes)
+    builder = LineageBuilder()
+
+    for type_id, file_type in enumerate(FILE_TYPES):
+        previous: Optional[GCDocument] = None
+        previous_hash = None
+        for release_id, release in enumerate(RELEASES):
+            rel_path = get_release_file(release, file_type)
+            if rel_path is None:
+                if previous is not None:
+                    builder.compare(release_id, type_id, previous, None)
+                previous, previous_hash = None, None
+                continue
+            content_hash = hashes.get(rel_path)
+            if content_hash is None:
+                continue  # Missing on disk
+            if content_hash == previous_hash:
+                continue
+            doc = load_gc_file(os.path.join(repo_root, rel_path), content_hash)
+            builder.compare(release_id, type_id, previous, doc)
+            previous, previous_hash = doc, content_hash
+            if verbose:
+                print(f"  {release['label']} {file_type}: {len(builder.events)} entries so far")
+
+    return builder, fingerprint
+
+
+def write_lineage_index(path: str, builder: LineageBuilder, fingerprint: str) -> None:
+    """
+    Write the index file. Each DEN's payload is 16-bit words: the event
+    count, then per event (release, file type << 8 | kind, column count,
+    column ids...), oldest release first.
+    """
+    entries = []
+    for den, events in builder.events.items():
+        words = array('H', [len(events)])
+        for release, file_type, kind, columns in sorted(events, key=lambda e: e[0]):
+            words.extend((release, file_type << 8 | kind, len(columns), *columns))
+        entries.append((den.encode('utf-8'), words.tobytes()))
+
+    write_key_file(path, MAGIC, {
+        'fingerprint': fingerprint,
+        'releases': [release['label'] for release in RELEASES],
+        'file_types': list(FILE_TYPES),
+        'columns': builder.columns,
+    }, entries)
+
+
+class LineageIndex:
+    """Read-only view of a lineage index file"""
+
+    def __init__(self, keys: KeyFile):
+        self._keys = keys
+        self.fingerprint: str = keys.metadata['fingerprint']
+        self.releases: List[str] = keys.metadata['releases']
+        self.file_types: List[str] = keys.metadata['file_types']
+        self.columns: List[str] = keys.metadata['columns']
+
+    @classmethod
+    def open(cls, path: str) -> 'LineageIndex':
+        return cls(KeyFile(path, MAGIC))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, den: str) -> bool:
+        return self._keys.find(den.encode('utf-8')) is not None
+
+    def close(self) -> None:
+        self._keys.close()
+
+    def history(self, den: str) -> List[LineageEvent]:
+        """Every recorded event of a DictionaryEntryName, oldest first"""
+        i = self._keys.find(den.encode('utf-8'))
+        if i is None:
+            return []
+        words = self._keys.payload(i).cast('H')
+        pos = 1
+        events = []
+        for _ in range(words[0]):
+            release, kind_word, n_columns = words[pos], words[pos + 1], words[pos + 2]
+            columns = tuple(self.columns[c] for c in words[pos + 3:pos + 3 + n_columns])
+            events.append(LineageEvent(self.releases[release], self.file_types[kind_word >> 8],
+                                       EVENT_KINDS[kind_word & 0xff], columns))
+            pos += 3 + n_columns
+        words.release()
+        return events
+
+    def first_seen(self, den: str) -> Optional[str]:
+        """Label of the release where den first appeared"""
+        history = self.history(den)
+        return history[0].release if history else None
+
+    def names(self, prefix: str = '') -> List[str]:
+        """Every DEN in the index that starts with prefix, in byte order"""
+        return [self._keys.key(i).decode('utf-8')
+                for i in self._keys.prefix_range(prefix.encode('utf-8'))]
+
+    @classmethod
+    def load_or_build(cls, repo_root: str, path: Optional[str] = None,
+                      rebuild: bool = False, verbose: bool = False) -> 'LineageIndex':
+        """
+        Open the index at path (default: .cache/ubl-gc/lineage.idx under
+        repo_root), building it first if it is missing, unreadable or was
+        built from different release files.
+        """
+        path = path or default_index_path(repo_root, DEFAULT_INDEX_FILE)
+        if not rebuild:
+            keys = open_current(path, MAGIC, _fingerprint(build_content_hashes(str(repo_root))))
+            if keys is not None:
+                return cls(keys)
+        builder, fingerprint = build_lineage(repo_root, verbose=verbose)
+        write_lineage_index(path, builder, fingerprint)
+        return cls.open(path)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: gc_lineage.py <repo-root> [--rebuild] <dictionary-entry-name | prefix*>...")
+        print("\nShows when each entry first appeared, changed (and which columns) and")
+        print("was removed, building .cache/ubl-gc/lineage.idx on first use.")
+        sys.exit(1)
+
+    repo_root = sys.argv[1]
+    queries = [arg for arg in sys.argv[2:] if arg != '--rebuild']
+    start = time.perf_counter()
+    index = LineageIndex.load_or_build(repo_root, rebuild='--rebuild' in sys.argv, verbose=True)
+    print(f"Lineage of {len(index)} entries ready in {time.perf_counter() - start:.2f}s\n")
+
+    for query in queries:
+        if query.endswith('*'):
+            names = index.names(query[:-1])
+            print(f"{query}: {len(names)} entries")
+            for name in names:
+                print(f"  {name}")
+            continue
+        start = time.perf_counter()
+        history = index.history(query)
+        elapsed = time.perf_counter() - start
+        if not history:
+            print(f"{query}: not in any release")
+            continue
+        print(f"{query} (query {elapsed * 1e6:.0f} us)")
+        for event in history:
+            print(f"  {event.describe()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+GenericCode File Loader
+
+Reads a UBL GenericCode (.gc) file once and exposes everything the other
+tools need from it:
+1. A byte-offset index of the header, every <Row> and the footer
+2. Parsed row values (ColumnRef -> SimpleValue)
+3. The ColumnSet column ids
+4. ABIE grouping of rows (ABIE row + following BBIE/ASBIE rows)
+5. Content digests of every row and every ABIE group
+
+The file is memory-mapped. Text blocks are TextBlock objects that refer to
+byte spans of the mapping and are only decoded into lines when someone
+inspects their content, so a 3 MB release costs a few arrays of offsets
+instead of tens of thousands of line strings.
+
+GCAnalyzer, GCDiff and GCCommitBuilder all consume the same GCDocument,
+and load_gc_file() keeps the most recently loaded documents around so a
+release used as the "new" side of one transition is not read again as the
+"old" side of the next. With set_persistent_cache() the parsed index and
+the results attached to it (attach(), saved by persist()) are also kept
+on disk (see gc_cache.py), so a warm run skips text parsing entirely.
+"""
+
+import mmap
+import os
+from hashlib import blake2b
+import re
+import sys
+from array import array
+from collections import OrderedDict as ODict
+from dataclasses import dataclass, field, replace
+from typing import (TYPE_CHECKING, BinaryIO, Collection, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple)
+
+if TYPE_CHECKING:  # These modules import this one
+    from gc_bitmap import ReleaseBitmaps
+    from gc_diff import GCFileState
+    from gc_graph import DependencyIndex
+    from gc_impact import ImpactIndex
+
+ORPHANED_ROWS = '__ORPHANED_ROWS__'
+
+_ROW_START_RE = re.compile(rb'^[ \t]*<Row[ >]', re.MULTILINE)
+_ROW_END_RE = re.compile(rb'^[ \t]*</Row>[ \t\r]*(?:\n|\Z)', re.MULTILINE)
+# One <Value> element, from the start of its first line to the end of the
+# line holding </Value>, so removing a token's span keeps the text byte-exact.
+_VALUE_TOKEN_RE = re.compile(
+    rb'^[ \t]*<Value ColumnRef="([^"]*)"[^>]*>'
+    rb'(?:\s*<SimpleValue>([^<]*)</SimpleValue>)?'
+    rb'.*?</Value>[^\n]*(?:\n|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+_COLUMN_RE = re.compile(r'<Column\s[^>]*\bId="([^"]+)"')
+_XML_ENTITIES = {'&lt;': '<', '&gt;': '>', '&quot;': '"', '&apos;': "'", '&amp;': '&'}
+_ENTITY_RE = re.compile('|'.join(_XML_ENTITIES))
+
+# blake2b digest length for rows and blocks; 128 bits is plenty to treat
+# equal digests as equal content
+DIGEST_SIZE = 16
+
+
+def split_lines(text: str) -> List[str]:
+    """Split text into lines keeping '\\n' endings, like file.readlines()"""
+    lines = text.split('\n')
+    result = [line + '\n' for line in lines[:-1]]
+    if lines[-1]:
+        result.append(lines[-1])
+    return result
+
+
+class TextBlock:
+    """
+    Immutable run of source text made of one or more byte spans of buffers.
+
+    Blocks sliced from a loaded file share its memory map; the bytes are
+    only copied (raw) or decoded (lines) when asked for. Blocks built from
+    edited lines own a private buffer. Slicing and concatenating blocks
+    only combines span lists, so an edited ABIE can mix untouched spans of
+    the old file with rows from the new one without copying either.
+    """
+    __slots__ = ('_pieces', '_lines', '_digest')
+
+    def __init__(self, buf, spans: Tuple[Tuple[int, int], ...], digest: Optional[bytes] = None):
+        self._pieces = tuple((buf, start, end) for start, end in spans)
+        self._lines: Optional[List[str]] = None
+        self._digest = digest
+
+    def __reduce__(self):
+        # Memory maps cannot be pickled: another process gets a private copy
+        data = self.raw
+        return (TextBlock, (data, ((0, len(data)),), self._digest))
+
+    @classmethod
+    def _from_pieces(cls, pieces: Iterable[Tuple[object, int, int]]) -> 'TextBlock':
+        block = cls.__new__(cls)
+        block._pieces = _merge_pieces(pieces)
+        block._lines = None
+        block._digest = None
+        return block
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'TextBlock':
+        """Build a block from text lines"""
+        lines = list(lines)
+        data = ''.join(lines).encode('utf-8')
+        block = cls(data, ((0, len(data)),))
+        block._lines = lines
+        return block
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TextBlock':
+        """Build a block that owns a copy of some bytes"""
+        return cls(data, ((0, len(data)),))
+
+    @classmethod
+    def concat(cls, blocks: List['TextBlock']) -> 'TextBlock':
+        """Join blocks without copying their bytes"""
+        if len(blocks) == 1:
+            return blocks[0]
+        return cls._from_pieces(piece for b in blocks for piece in b._pieces)
+
+    def slice(self, start: int, end: int) -> 'TextBlock':
+        """The bytes [start, end) of the block, as a block over the same buffers"""
+        pieces = []
+        offset = 0
+        for buf, s, e in self._pieces:
+            size = e - s
+            lo = max(start - offset, 0)
+            hi = min(end - offset, size)
+            if lo < hi:
+                pieces.append((buf, s + lo, s + hi))
+            offset += size
+            if offset >= end:
+                break
+        return self._from_pieces(pieces)
+
+    def __len__(self) -> int:
+        """Size in bytes"""
+        return sum(end - start for _, start, end in self._pieces)
+
+    @property
+    def raw(self) -> bytes:
+        """The block's bytes (copied out of the buffer)"""
+        return b''.join(buf[start:end] for buf, start, end in self._pieces)
+
+    @property
+    def digest(self) -> bytes:
+        """blake2b digest of the block's bytes (cached)"""
+        if self._digest is None:
+            h = blake2b(digest_size=DIGEST_SIZE)
+            for buf, start, end in self._pieces:
+                h.update(buf[start:end])
+            self._digest = h.digest()
+        return self._digest
+
+    @property
+    def lines(self) -> List[str]:
+        """The block decoded into text lines (cached)"""
+        if self._lines is None:
+            self._lines = split_lines(self.raw.decode('utf-8'))
+        return self._lines
+
+    def write_to(self, f: BinaryIO) -> None:
+        """Write the block to a binary file without an intermediate copy"""
+        for buf, start, end in self._pieces:
+            f.write(buf[start:end])
+
+
+def _merge_spans(spans: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    """Merge spans that are directly adjacent in the buffer"""
+    merged = []
+    for start, end in spans:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def _merge_pieces(pieces: Iterable[Tuple[object, int, int]]) -> Tuple[Tuple[object, int, int], ...]:
+    """Merge (buffer, start, end) pieces that are adjacent in the same buffer"""
+    merged = []
+    for buf, start, end in pieces:
+        if start == end:
+            continue
+        if merged and merged[-1][0] is buf and merged[-1][2] == start:
+            merged[-1] = (buf, merged[-1][1], end)
+        else:
+            merged.append((buf, start, end))
+    return tuple(merged)
+
+
+class ValueToken(NamedTuple):
+    """One <Value> element of a row, with the byte span of its lines"""
+    column: str  # ColumnRef
+    value: Optional[str]  # SimpleValue text, unescaped and stripped (None if empty)
+    start: int   # Offset of the start of the <Value> line
+    end: int     # Offset just past the line holding </Value>
+
+
+def tokenize_values(buf, start: int = 0, end: Optional[int] = None) -> Iterator[ValueToken]:
+    """
+    Read every <Value> element in buf[start:end] in a single pass.
+
+    Works on any bytes-like buffer (a memory map, a row, a whole ABIE
+    block). Values are unescaped and stripped, matching what an XML parser
+    would return for the SimpleValue text.
+    """
+    if end is None:
+        end = len(buf)
+    for m in _VALUE_TOKEN_RE.finditer(buf, start, end):
+        text = m.group(2)
+        value = _unescape(text.decode('utf-8')).strip() if text else None
+        yield ValueToken(sys.intern(m.group(1).decode('utf-8')), value,
+                         m.start(), m.end())
+
+
+def remove_columns(block: TextBlock, columns: Collection[str]) -> TextBlock:
+    """Drop the <Value> elements of the given columns from a block"""
+    if not columns:
+        return block
+    data = block.raw
+    pieces = []
+    pos = 0
+    for token in tokenize_values(data):
+        if token.column in columns:
+            pieces.append(data[pos:token.start])
+            pos = token.end
+    if pos == 0:
+        return block
+    pieces.append(data[pos:])
+    return TextBlock.from_bytes(b''.join(pieces))
+
+
+def column_adjusted_digest(block: TextBlock, columns: Collection[str]) -> bytes:
+    """Digest of the block remove_columns() would return, without building it"""
+    if not columns:
+        return block.digest
+    data = memoryview(block.raw)
+    h = None
+    pos = 0
+    for token in tokenize_values(data):
+        if token.column in columns:
+            if h is None:
+                h = blake2b(digest_size=DIGEST_SIZE)
+            h.update(data[pos:token.start])
+            pos = token.end
+    if h is None:
+        return block.digest
+    h.update(data[pos:])
+    return h.digest()
+
+
+def _unescape(text: str) -> str:
+    """Resolve the predefined XML entities the way an XML parser would"""
+    if '&' not in text:
+        return text
+    return _ENTITY_RE.sub(lambda m: _XML_ENTITIES[m.group(0)], text)
+
+
+@dataclass
+class GCRowIndex:
+    """Byte offsets of the header, every <Row> block and the footer"""
+    buffer: object  # memoryview over the mapped file
+    header_span: Tuple[int, int] = (0, 0)  # Before first <Row> line
+    footer_span: Tuple[int, int] = (0, 0)  # After last </Row> line
+    row_starts: array = field(default_factory=lambda: array('q'))  # Start of <Row> line
+    row_ends: array = field(default_factory=lambda: array('q'))  # End of </Row> line
+
+    def __len__(self) -> int:
+        return len(self.row_starts)
+
+    def row_span(self, row_num: int) -> Tuple[int, int]:
+        """Byte span of a row (row numbers are 1-based)"""
+        return self.row_starts[row_num - 1], self.row_ends[row_num - 1]
+
+    def block(self, spans: List[Tuple[int, int]], digest: Optional[bytes] = None) -> TextBlock:
+        return TextBlock(self.buffer, _merge_spans(spans), digest)
+
+
+@dataclass
+class GCDocument:
+    """A GenericCode file indexed into text blocks, row values and ABIE groups"""
+    file_path: str
+    index: GCRowIndex
+    row_values: Dict[int, Dict[str, str]] = field(default_factory=dict)  # row_num -> ColumnRef -> value
+    columns: List[str] = field(default_factory=list)  # ColumnSet ids in order
+    abie_groups: ODict = field(default_factory=ODict)  # object_class -> row_nums
+    row_digests: bytes = b''  # DIGEST_SIZE bytes per row, in row order
+    abie_digests: Dict[str, bytes] = field(default_factory=dict)  # object_class -> group digest
+    content_hash: str = ''  # SHA-256 of the file, when known (persistent cache or manifest)
+    analysis: Optional[dict] = None  # Cached GCAnalyzer results (rows, SCCs, order)
+    dependency_index: Optional['DependencyIndex'] = None  # Of the ABIE graph
+    impact_index: Optional['ImpactIndex'] = None  # Of the ABIE graph
+    bitmaps: Optional['ReleaseBitmaps'] = None  # Of the categorical columns
+    file_state: Optional['GCFileState'] = None  # Of this document (shared, not persisted)
+    dirty: bool = False  # Results attached since the document was last persisted
+
+    @property
+    def header(self) -> TextBlock:
+        return self.index.block([self.index.header_span])
+
+    @property
+    def footer(self) -> TextBlock:
+        return self.index.block([self.index.footer_span])
+
+    @property
+    def header_lines(self) -> List[str]:
+        return self.header.lines
+
+    @property
+    def footer_lines(self) -> List[str]:
+        return self.footer.lines
+
+    @property
+    def row_count(self) -> int:
+        return len(self.index)
+
+    def row_tokens(self, row_num: int) -> List[ValueToken]:
+        """The <Value> tokens of one row, with spans into the mapped file"""
+        start, end = self.index.row_span(row_num)
+        return list(tokenize_values(self.index.buffer, start, end))
+
+    def row_digest(self, row_num: int) -> bytes:
+        """Content digest of one row's <Row>...</Row> bytes"""
+        offset = (row_num - 1) * DIGEST_SIZE
+        return self.row_digests[offset:offset + DIGEST_SIZE]
+
+    def row_block(self, row_num: int) -> TextBlock:
+        """The <Row>...</Row> block of one row"""
+        return self.index.block([self.index.row_span(row_num)], self.row_digest(row_num))
+
+    def rows_block(self, row_nums: Iterable[int]) -> TextBlock:
+        """Several rows as one block, in the order given"""
+        return self.index.block([self.index.row_span(n) for n in row_nums])
+
+    def group_block(self, object_class: str) -> TextBlock:
+        """The text of one ABIE group"""
+        spans = [self.index.row_span(n) for n in self.abie_groups[object_class]]
+        return self.index.block(spans, self.abie_digests.get(object_class))
+
+
+def _map_file(file_path: str):
+    """Memory-map a file read-only (empty files get an empty buffer)"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_row_index(buf) -> GCRowIndex:
+    """Scan a mapped GenericCode file for row boundaries"""
+    index = GCRowIndex(buffer=memoryview(buf))
+    index.row_starts.extend(m.start() for m in _ROW_START_RE.finditer(buf))
+    index.row_ends.extend(m.end() for m in _ROW_END_RE.finditer(buf))
+
+    # Pair starts with ends by position; unmatched trailing starts are dropped
+    row_count = min(len(index.row_starts), len(index.row_ends))
+    del index.row_starts[row_count:]
+    del index.row_ends[row_count:]
+
+    if row_count:
+        index.header_span = (0, index.row_starts[0])
+        index.footer_span = (index.row_ends[-1], len(buf))
+    else:
+        index.header_span = (0, len(buf))
+        index.footer_span = (len(buf), len(buf))
+    return index
+
+
+def parse_gc_document(file_path: str) -> GCDocument:
+    """Map and index a GenericCode file in a single pass"""
+    buf = _map_file(file_path)
+    index = build_row_index(buf)
+    doc = GCDocument(file_path=file_path, index=index)
+
+    doc.columns = [m.group(1) for line in doc.header_lines
+                   for m in _COLUMN_RE.finditer(line)]
+
+    # Row values: one tokenizer pass over the row area, assigned to rows by offset
+    starts, ends = index.row_starts, index.row_ends
+    row_count = len(index)
+    for row_num in range(1, row_count + 1):
+        doc.row_values[row_num] = {}
+    if row_count:
+        row = 0
+        for token in tokenize_values(buf, starts[0], ends[-1]):
+            while row < row_count and token.start >= ends[row]:
+                row += 1
+            if row == row_count:
+                break
+            if token.start < starts[row] or token.value is None:
+                continue
+            doc.row_values[row + 1][token.column] = token.value
+
+    # Group rows into ABIE groups
+    current_object_class = None
+    orphaned_rows = []  # Rows with no component type or other types
+
+    for row_num, values in doc.row_values.items():
+        component_type = values.get('ComponentType', '')
+        if component_type == 'ABIE':
+            current_object_class = values.get('ObjectClass', '')
+            doc.abie_groups[current_object_class] = [row_num]
+        elif component_type in ('BBIE', 'ASBIE') and current_object_class:
+            doc.abie_groups[current_object_class].append(row_num)
+        else:
+            orphaned_rows.append(row_num)
+
+    if orphaned_rows:
+        doc.abie_groups[ORPHANED_ROWS] = orphaned_rows
+
+    # Content digests, so diffs compare 16 bytes instead of whole blocks
+    view = index.buffer
+    doc.row_digests = b''.join(
+        blake2b(view[start:end], digest_size=DIGEST_SIZE).digest()
+        for start, end in zip(starts, ends)
+    )
+    for object_class, row_nums in doc.abie_groups.items():
+        h = blake2b(digest_size=DIGEST_SIZE)
+        for row_num in row_nums:
+            h.update(view[starts[row_num - 1]:ends[row_num - 1]])
+        doc.abie_digests[object_class] = h.digest()
+
+    return doc
+
+
+def _document_to_payload(doc: GCDocument) -> dict:
+    """Everything needed to rebuild a GCDocument without parsing"""
+    index = doc.index
+    return {
+        'header_span': index.header_span,
+        'footer_span': index.footer_span,
+        'row_starts': index.row_starts.tobytes(),
+        'row_ends': index.row_ends.tobytes(),
+        'row_values': doc.row_values,
+        'columns': doc.columns,
+        'abie_groups': doc.abie_groups,
+        'row_digests': doc.row_digests,
+        'abie_digests': doc.abie_digests,
+        'analysis': doc.analysis,
+        'dependency_index': doc.dependency_index,
+        'impact_index': doc.impact_index,
+        'bitmaps': doc.bitmaps,
+    }
+
+
+def _document_from_payload(file_path: str, buf, payload: dict) -> GCDocument:
+    """Rebuild a GCDocument over a freshly mapped file from a cached payload"""
+    index = GCRowIndex(buffer=memoryview(buf),
+                       header_span=payload['header_span'],
+                       footer_span=payload['footer_span'])
+    index.row_starts.frombytes(payload['row_starts'])
+    index.row_ends.frombytes(payload['row_ends'])
+    return GCDocument(file_path=file_path, index=index,
+                      row_values=payload['row_values'],
+                      columns=payload['columns'],
+                      abie_groups=payload['abie_groups'],
+                      row_digests=payload['row_digests'],
+                      abie_digests=payload['abie_digests'],
+                      analysis=payload['analysis'],
+                      dependency_index=payload['dependency_index'],
+                      impact_index=payload['impact_index'],
+                      bitmaps=payload['bitmaps'])
+
+
+_persistent_cache = None  # gc_cache.ReleaseCache, see set_persistent_cache()
+
+
+def set_persistent_cache(cache) -> None:
+    """Enable (or disable with None) the on-disk cache of parsed files"""
+    global _persistent_cache
+    _persistent_cache = cache
+
+
+def get_persistent_cache():
+    """The on-disk cache set with set_persistent_cache(), or None"""
+    return _persistent_cache
+
+
+def _load_with_persistent_cache(file_path: str, digest: Optional[str] = None) -> GCDocument:
+    """Load from the on-disk cache, parsing and storing on a miss"""
+    from gc_cache import file_digest
+
+    digest = digest or file_digest(file_path)
+    payload = _persistent_cache.load(digest)
+    if payload is not None:
+        doc = _document_from_payload(file_path, _map_file(file_path), payload)
+    else:
+        doc = parse_gc_document(file_path)
+        _persistent_cache.store(digest, _document_to_payload(doc))
+    doc.content_hash = digest
+    return doc
+
+
+ATTACHED_FIELDS = ('analysis', 'dependency_index', 'impact_index', 'bitmaps')
+
+
+def attach(doc: GCDocument, name: str, value) -> None:
+    """Keep a derived result on a document; persist(doc) saves it if caching"""
+    if name not in ATTACHED_FIELDS:
+        raise ValueError(f"{name} is not one of {', '.join(ATTACHED_FIELDS)}")
+    setattr(doc, name, value)
+    doc.dirty = True
+
+
+def persist(doc: GCDocument) -> None:
+    """Store a document with its attached results in the on-disk cache, if changed"""
+    if doc.dirty and _persistent_cache is not None and doc.content_hash:
+        _persistent_cache.store(doc.content_hash, _document_to_payload(doc))
+    doc.dirty = False
+
+
+_CACHE_SIZE = 8
+_document_cache: ODict = ODict()  # (path, mtime_ns, size) -> GCDocument
+
+
+def load_gc_file(file_path: str, content_hash: Optional[str] = None) -> GCDocument:
+    """
+    Load a GenericCode file, reusing a recently loaded GCDocument if the
+    file has not changed on disk. Returned documents are shared and must
+    be treated as read-only.
+
+    If the file's SHA-256 is already known (content_hash, e.g. from
+    release_manifest.build_content_hashes), a recently loaded document with
+    the same content is reused even if it came from another path; the
+    caller then gets a shallow copy whose file_path is its own.
+    """
+    st = os.stat(file_path)
+    key = (os.path.realpath(file_path), st.st_mtime_ns, st.st_size)
+
+    doc = _document_cache.get(key)
+    if doc is not None:
+        _document_cache.move_to_end(key)
+        return doc
+
+    if content_hash:
+        doc = next((d for d in _document_cache.values() if d.content_hash == content_hash), None)
+        if doc is not None and doc.file_path != str(file_path):
+            doc = replace(doc, file_path=str(file_path))
+    if doc is None:
+        if _persistent_cache is not None:
+            doc = _load_with_persistent_cache(str(file_path), content_hash)
+        else:
+            doc = parse_gc_document(str(file_path))
+            doc.content_hash = content_hash or ''
+    _document_cache[key] = doc
+    while len(_document_cache) > _CACHE_SIZE:
+        _document_cache.popitem(last=False)
+    return doc
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: gc_loader.py <path-to-gc-file>")
+        sys.exit(1)
+
+    doc = load_gc_file(sys.argv[1])
+    print(f"Loaded {doc.file_path}")
+    print(f"  {len(doc.header)} header bytes, {doc.row_count} rows, "
+          f"{len(doc.footer)} footer bytes")
+    print(f"  {len(doc.columns)} columns, {len(doc.abie_groups)} ABIE groups")
+
+
+if __name__ == '__main__':
+    main()
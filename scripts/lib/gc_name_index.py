@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Cross-Release Name Index
+
+Inverted index from element names to where they occur in every release,
+so finding an element by name needs neither GCAnalyzer nor a re-parse:
+1. Keys: the values of DictionaryEntryName, UBLName, ObjectClass,
+   PropertyTerm and AssociatedObjectClass (whitespace-stripped), one key
+   space per column
+2. Postings: (release, file type, row number, byte offset of the <Row>
+   in the release file), ordered by release, file type and row
+3. Build: every release file in the manifest is loaded once through
+   gc_loader; files that several releases share byte for byte are read
+   once and their postings repeated for each release
+4. Storage: a gc_keyfile table (key = column id byte + UTF-8 value,
+   payload = 16-byte posting records), memory-mapped on open
+
+Exact lookups are one binary search and prefix lookups a binary search
+plus a scan of the matching keys, so query time depends on the number of
+distinct names, not on the number of releases indexed.
+"""
+
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_keyfile import KeyFile, default_index_path, open_current, release_fingerprint, write_key_file
+from gc_loader import load_gc_file
+from release_manifest import FILE_TYPES, RELEASES, build_content_hashes, get_release_file
+
+NAME_COLUMNS = ('DictionaryEntryName', 'UBLName', 'ObjectClass', 'PropertyTerm', 'AssociatedObjectClass')
+INDEX_FORMAT = 1
+MAGIC = b'names\0\0\0'
+DEFAULT_INDEX_FILE = 'names.idx'
+
+_POSTING = struct.Struct('<HBxIQ')  # release, file type, row number, byte offset
+
+
+class Posting(NamedTuple):
+    """One occurrence of a name"""
+    release: str  # Release label
+    file_type: str  # entities, signature or endorsed
+    row: int  # Row number in the file (1-based)
+    offset: int  # Byte offset of the row's <Row> line in the file
+
+
+def _file_postings(doc) -> List[tuple]:
+    """(column id, value, row number, byte offset) for every indexed value of a file"""
+    entries = []
+    for row_num, values in doc.row_values.items():
+        offset = doc.index.row_span(row_num)[0]
+        for column_id, column in enumerate(NAME_COLUMNS):
+            value = values.get(column, '').strip()
+            if value:
+                entries.append((column_id, value, row_num, offset))
+    return entries
+
+
+def _key(column: str, value: str) -> bytes:
+    if column not in NAME_COLUMNS:
+        raise KeyError(f"{column} is not an indexed column (one of {', '.join(NAME_COLUMNS)})")
+    return bytes([NAME_COLUMNS.index(column)]) + value.encode('utf-8')
+
+
+def build_name_index(repo_root: str, path: str, verbose: bool = False) -> int:
+    """
+    Index every release file in the manifest and write the index to path.
+
+    Returns:
+        Size of the index file in bytes
+    """
+    repo_root = str(repo_root)
+    hashes = build_content_hashes(repo_root)
+    postings: Dict[bytes, bytearray] = {}
+    by_content: Dict[str, List[tuple]] = {}  # content hash -> _file_postings()
+    indexed = []
+
+    for release_id, release in enumerate(RELEASES):
+        for type_id, file_type in enumerate(FILE_TYPES):
+            rel_path = get_release_file(release, file_type)
+            content_hash = hashes.get(rel_path) if rel_path else None
+            if content_hash is None:
+                continue
+            if content_hash not in by_content:
+                doc = load_gc_file(os.path.join(repo_root, rel_path), content_hash)
+                by_content[content_hash] = _file_postings(doc)
+            for column_id, value, row_num, offset in by_content[content_hash]:
+                key = bytes([column_id]) + value.encode('utf-8')
+                record = _POSTING.pack(release_id, type_id, row_num, offset)
+                if key in postings:
+                    postings[key] += record
+                else:
+                    postings[key] = bytearray(record)
+            indexed.append(rel_path)
+            if verbose:
+                print(f"  {release['label']} {file_type}: {len(postings)} keys so far")
+
+    return write_key_file(path, MAGIC, {
+        'fingerprint': _fingerprint(hashes),
+        'releases': [release['label'] for release in RELEASES],
+        'file_types': list(FILE_TYPES),
+        'columns': list(NAME_COLUMNS),
+        'files': len(indexed),
+    }, ((key, bytes(records)) for key, records in postings.items()))
+
+
+def _fingerprint(hashes: Dict[str, str]) -> str:
+    return release_fingerprint(hashes, MAGIC.decode().rstrip('\0'), INDEX_FORMAT, NAME_COLUMNS)
+
+
+class NameIndex:
+    """Read-only view of a name index file"""
+
+    def __init__(self, keys: KeyFile, repo_root: Optional[str] = None):
+        self._keys = keys
+        self.repo_root = repo_root  # For row_xml()
+        self.releases: List[str] = keys.metadata['releases']
+        self.file_types: List[str] = keys.metadata['file_types']
+
+    @classmethod
+    def open(cls, path: str, repo_root: Optional[str] = None) -> 'NameIndex':
+        return cls(KeyFile(path, MAGIC), repo_root)
+
+    @classmethod
+    def load_or_build(cls, repo_root: str, path: Optional[str] = None,
+                      rebuild: bool = False, verbose: bool = False) -> 'NameIndex':
+        """
+        Open the index at path (default: .cache/ubl-gc/names.idx under
+        repo_root), building it first if it is missing, unreadable or was
+        built from different release files.
+        """
+        path = path or default_index_path(repo_root, DEFAULT_INDEX_FILE)
+        if not rebuild:
+            keys = open_current(path, MAGIC, _fingerprint(build_content_hashes(str(repo_root))))
+            if keys is not None:
+                return cls(keys, repo_root)
+        build_name_index(repo_root, path, verbose=verbose)
+        return cls.open(path, repo_root)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def close(self) -> None:
+        self._keys.close()
+
+    def _postings(self, i: int) -> List[Posting]:
+        return [Posting(self.releases[release], self.file_types[file_type], row, offset)
+                for release, file_type, row, offset in _POSTING.iter_unpack(self._keys.payload(i))]
+
+    def lookup(self, column: str, value: str) -> List[Posting]:
+        """Every occurrence of an exact value of an indexed column"""
+        i = self._keys.find(_key(column, value))
+        return self._postings(i) if i is not None else []
+
+    def count(self, column: str, value: str) -> int:
+        """Number of occurrences, without decoding them"""
+        i = self._keys.find(_key(column, value))
+        return len(self._keys.payload(i)) // _POSTING.size if i is not None else 0
+
+    def values(self, column: str, prefix: str = '') -> List[str]:
+        """The distinct values of a column that start with prefix, in byte order"""
+        key = _key(column, prefix)
+        return [self._keys.key(i)[1:].decode('utf-8') for i in self._keys.prefix_range(key)]
+
+    def lookup_prefix(self, column: str, prefix: str) -> Dict[str, List[Posting]]:
+        """value -> occurrences, for every value of a column that starts with prefix"""
+        key = _key(column, prefix)
+        return {self._keys.key(i)[1:].decode('utf-8'): self._postings(i)
+                for i in self._keys.prefix_range(key)}
+
+    def row_xml(self, posting: Posting) -> str:
+        """The <Row> element a posting points at, read from the release file"""
+        if self.repo_root is None:
+            raise ValueError("NameIndex was opened without a repository root")
+        release = RELEASES[self.releases.index(posting.release)]
+        with open(os.path.join(self.repo_root, get_release_file(release, posting.file_type)), 'rb') as f:
+            f.seek(posting.offset)
+            text = b''
+            while b'</Row>' not in text:
+                chunk = f.read(4096)
+                if not chunk:
+                    break
+                text += chunk
+        end = text.find(b'</Row>')
+        return text[:end + len('</Row>')].decode('utf-8').strip() if end >= 0 else ''
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: gc_name_index.py <repo-root> [--rebuild] [<column>=]<value>[*]...")
+        print(f"\nColumns: {', '.join(NAME_COLUMNS)} (default DictionaryEntryName).")
+        print("A trailing * makes a prefix query. Builds .cache/ubl-gc/names.idx on first use.")
+        sys.exit(1)
+
+    repo_root = sys.argv[1]
+    queries = [arg for arg in sys.argv[2:] if arg != '--rebuild']
+    start = time.perf_counter()
+    index = NameIndex.load_or_build(repo_root, rebuild='--rebuild' in sys.argv, verbose=True)
+    print(f"Name index of {len(index)} keys ready in {time.perf_counter() - start:.2f}s\n")
+
+    for query in queries:
+        column, _, value = query.rpartition('=')
+        column = column or 'DictionaryEntryName'
+        start = time.perf_counter()
+        if value.endswith('*'):
+            results = index.lookup_prefix(column, value[:-1])
+        else:
+            results = {value: index.lookup(column, value)}
+        elapsed = time.perf_counter() - start
+        total = sum(len(p) for p in results.values())
+        print(f"{column}={value}: {len(results)} values, {total} occurrences (query {elapsed * 1e6:.0f} us)")
+        for name, postings in list(results.items())[:20]:
+            releases = sorted({p.release for p in postings}, key=index.releases.index)
+            print(f"  {name}: {len(postings)} rows in {len(releases)} releases "
+                  f"({releases[0] if releases else '-'} .. {releases[-1] if releases else '-'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Commit Pipeline
+
+Runs the history build as overlapping stages connected by bounded queues,
+so Python CPU work and git process time overlap instead of alternating:
+1. Diff: upcoming transitions are diffed in a worker process pool
+   (HistoryBuilder's; one worker with --jobs 1), at most 2 per worker
+   ahead of the commits
+2. Apply + hash: HistoryBuilder runs in a producer thread, applies each
+   change and hands the resulting content to commit(), which computes the
+   git blob id in-process (so no-op commits are known immediately) and
+   queues the commit
+3. Store: `git hash-object -w --stdin` writes each blob, its content
+   streamed from the TextBlocks straight into the process; the blobs of
+   the queued commits are written concurrently
+4. Commit: one long-lived `git mktree --batch` writes each tree and
+   `git commit-tree` records it with the release's author/date; the
+   branch ref follows every CHECKPOINT_INTERVAL commits and on close
+
+Stages 3 and 4 run on an asyncio event loop with every git process
+driven through asyncio.create_subprocess_exec pipes. Full queues block
+the stage that feeds them, which keeps memory bounded to a few commits'
+content. The commits are the ones `git commit` creates in the default
+mode; the work tree is only brought up to date by HistoryBuilder.finish().
+
+CommitPipeline has the same commit()/exists()/close() interface as
+FastImportStream, so HistoryBuilder and GCCommitBuilder drive it unchanged.
+"""
+
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_fast_import import Content, clean_message
+from gc_git import CHECKPOINT_INTERVAL
+from gc_loader import TextBlock
+
+DEFAULT_DEPTH = 4  # Commits waiting in each queue
+
+
+@dataclass
+class CommitJob:
+    """One queued commit: blobs to store, the commit's files, message"""
+    message: str
+    env: Dict[str, str]
+    files: Dict[str, Tuple[str, str]]  # path -> (mode, blob id) of the whole tree
+    blobs: List[Tuple[str, List[TextBlock]]] = field(default_factory=list)  # (oid, content)
+
+
+class _BlobHasher:
+    """File-like sink that computes a git blob id"""
+
+    def __init__(self, size: int):
+        self._sha = hashlib.sha1(b'blob %d\0' % size)
+
+    def write(self, data: bytes) -> None:
+        self._sha.update(data)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+def blob_id(content: List[TextBlock]) -> str:
+    """The object id git gives a file with this content"""
+    hasher = _BlobHasher(sum(len(block) for block in content))
+    for block in content:
+        block.write_to(hasher)
+    return hasher.hexdigest()
+
+
+class CommitPipeline:
+    """Bounded-queue store/commit stages on an asyncio loop, fed from a producer thread"""
+
+    def __init__(self, repo_path: str, ref: Optional[str] = None, depth: int = DEFAULT_DEPTH):
+        """
+        Args:
+            repo_path: Work tree of the repository
+            ref: Branch ref to commit to (default: the ref HEAD points to)
+            depth: Maximum number of commits waiting in each queue
+        """
+        self.repo_path = Path(repo_path)
+        self.ref = ref or self._git('symbolic-ref', 'HEAD')
+        self.depth = depth
+        self.commits = 0
+        self.bytes_sent = 0
+        self._files: Dict[str, Tuple[str, str]] = {}  # path -> (mode, blob id)
+
+        # Continue an existing branch from its current tip
+        self.head = self._git('rev-parse', '--verify', '-q', self.ref + '^{commit}',
+                              check=False) or None
+        if self.head:
+            for line in self._git('ls-tree', '-r', '-z', self.head).split('\0'):
+                if line:
+                    info, path = line.split('\t', 1)
+                    mode, _, oid = info.split()
+                    self._files[path] = (mode, oid)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: Optional[asyncio.Queue] = None
+        self._stored: Optional[asyncio.Queue] = None
+        self._mktree: Optional[asyncio.subprocess.Process] = None
+        self._stages: List[asyncio.Task] = []
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._committed = 0  # Commits made by the commit stage
+
+    def _git(self, *args: str, check: bool = True) -> str:
+        result = subprocess.run(['git', *args], cwd=self.repo_path,
+                                capture_output=True, encoding='utf-8', check=check)
+        return result.stdout.strip()
+
+    def run(self, produce: Callable, *args):
+        """
+        Run produce(*args) in a producer thread while the store and commit
+        stages consume its commits; returns what produce returns. produce
+        must call close() once it has queued its last commit.
+        """
+        return asyncio.run(self._main(produce, args))
+
+    async def _main(self, produce: Callable, args: tuple):
+        self._loop = asyncio.get_running_loop()
+        self._jobs = asyncio.Queue(self.depth)
+        self._stored = asyncio.Queue(self.depth)
+        self._mktree = await self._spawn('mktree', '--batch')
+        self._stages = [asyncio.create_task(self._store_stage()),
+                        asyncio.create_task(self._commit_stage())]
+        try:
+            return await asyncio.to_thread(produce, *args)
+        finally:
+            # Producer failed before close(): let the stages finish
+            await self._shutdown()
+
+    # Producer side (called from the producer thread)
+
+    def exists(self, path: str) -> bool:
+        """Whether path is in the branch's tree as of the last queued commit"""
+        return path in self._files
+
+    def commit(self, message: str, env: Mapping[str, str],
+               modify: Optional[Mapping[str, Content]] = None,
+               delete: Iterable[str] = (),
+               rename: Optional[Mapping[str, str]] = None) -> bool:
+        """
+        Queue a commit, waiting while the pipeline is full.
+
+        Args:
+            message: Commit message (cleaned up as `git commit -m` would)
+            env: Mapping with the GIT_AUTHOR_* and GIT_COMMITTER_* variables
+            modify: path -> new content
+            delete: Paths to remove
+            rename: old path -> new path (applied before modify and delete)
+
+        Returns:
+            False if nothing changed and no commit was queued
+        """
+        self._raise_error()
+        files = dict(self._files)
+        job = CommitJob(message, dict(env), files)
+
+        for old, new in (rename or {}).items():
+            if old in files and old != new:
+                files[new] = files.pop(old)
+
+        for path, content in (modify or {}).items():
+            mode = files.get(path, ('100644',))[0]
+            if isinstance(content, Path):
+                mode = '100755' if os.access(content, os.X_OK) else '100644'
+                content = content.read_bytes()
+            if isinstance(content, bytes):
+                content = [TextBlock.from_bytes(content)]
+            oid = blob_id(content)
+            if files.get(path) != (mode, oid):
+                files[path] = (mode, oid)
+                job.blobs.append((oid, list(content)))
+
+        for path in delete:
+            files.pop(path, None)
+
+        if files == self._files:
+            return False
+
+        asyncio.run_coroutine_threadsafe(self._jobs.put(job), self._loop).result()
+        self._files = files
+        self.commits += 1
+        return True
+
+    def close(self) -> None:
+        """Wait until every queued commit is made and move the branch to the last one"""
+        if self._loop is None:
+            raise RuntimeError("CommitPipeline.close() called outside run()")
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Commit pipeline failed: {self._error}") from self._error
+
+    # Stages (run on the event loop)
+
+    async def _shutdown(self) -> None:
+        if self._closed:
+            await asyncio.gather(*self._stages)
+            return
+        self._closed = True
+        await self._jobs.put(None)
+        await asyncio.gather(*self._stages)
+        self._mktree.stdin.close()
+        await self._mktree.wait()
+        # Even after a failure, keep the commits that were made
+        if self.head:
+            await self._run_git('update-ref', self.ref, self.head)
+
+    async def _store_stage(self) -> None:
+        """Start writing each job's blobs; the commit stage waits for them"""
+        while (job := await self._jobs.get()) is not None:
+            store = asyncio.create_task(self._store_blobs(job.blobs))
+            job.blobs = []  # The task holds the content until it is written
+            await self._stored.put((job, store))
+        await self._stored.put(None)
+
+    async def _store_blobs(self, blobs: List[Tuple[str, List[TextBlock]]]) -> None:
+        for oid, content in blobs:
+            stored = await self._hash_object(content)
+            if stored != oid:
+                raise RuntimeError(f"git stored blob {stored}, expected {oid}")
+
+    async def _commit_stage(self) -> None:
+        """Write the tree and commit of each job, in order"""
+        while (item := await self._stored.get()) is not None:
+            job, store = item
+            try:
+                await store
+                if self._error is not None:
+                    continue  # Drain so the producer is never blocked
+                tree = await self._write_tree(job.files)
+                args = ['commit-tree', tree] + (['-p', self.head] if self.head else [])
+                self.head = await self._run_git(
+                    *args, input=clean_message(job.message).encode('utf-8'), env=job.env)
+                self._committed += 1
+                if self._committed % CHECKPOINT_INTERVAL == 0:
+                    await self._run_git('update-ref', self.ref, self.head)
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+
+    async def _write_tree(self, entries: Mapping[str, Tuple[str, str]]) -> str:
+        """Write (nested) trees for path -> (mode, blob id) and return the root id"""
+        files, dirs = [], {}
+        for path, entry in entries.items():
+            if '\n' in path:
+                raise ValueError(f"Unsupported path: {path!r}")
+            name, sep, rest = path.partition('/')
+            if sep:
+                dirs.setdefault(name, {})[rest] = entry
+            else:
+                files.append(f"{entry[0]} blob {entry[1]}\t{name}\n")
+        for name, sub_entries in dirs.items():
+            files.append(f"040000 tree {await self._write_tree(sub_entries)}\t{name}\n")
+        self._mktree.stdin.write(''.join(files).encode('utf-8') + b'\n')
+        await self._mktree.stdin.drain()
+        line = await self._mktree.stdout.readline()
+        if not line:
+            raise RuntimeError(f"git mktree exited (status {self._mktree.returncode})")
+        return line.decode().strip()
+
+    async def _spawn(self, *args: str) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            'git', *args, cwd=self.repo_path,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+
+    async def _hash_object(self, content: List[TextBlock]) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            'git', 'hash-object', '-w', '--stdin', cwd=self.repo_path,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+        reader = asyncio.create_task(proc.stdout.read())
+        for block in content:
+            block.write_to(proc.stdin)
+            await proc.stdin.drain()
+            self.bytes_sent += len(block)
+        proc.stdin.close()
+        oid = (await reader).decode().strip()
+        stderr = await proc.stderr.read()
+        if await proc.wait() != 0:
+            raise RuntimeError(f"git hash-object failed: {stderr.decode().strip()}")
+        return oid
+
+    async def _run_git(self, *args: str, input: Optional[bytes] = None,
+                       env: Optional[Mapping[str, str]] = None) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            'git', *args, cwd=self.repo_path, env=env,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await proc.communicate(input)
+        if proc.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {stderr.decode().strip()}")
+        return stdout.decode().strip()
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: gc_pipeline.py <repo-path> <target-file> <gc-file>...")
+        print("\nCommits each gc-file in turn as target-file through a CommitPipeline.")
+        sys.exit(1)
+
+    repo_path, target, sources = sys.argv[1], sys.argv[2], sys.argv[3:]
+    env = dict(os.environ)
+    for role in ('AUTHOR', 'COMMITTER'):
+        env.setdefault(f'GIT_{role}_NAME', 'OASIS UBL TC')
+        env.setdefault(f'GIT_{role}_EMAIL', 'ubl-tc@oasis-open.org')
+
+    pipeline = CommitPipeline(repo_path)
+
+    def produce():
+        for source in sources:
+            committed = pipeline.commit(f"Import {Path(source).name}", env,
+                                        modify={target: Path(source)})
+            print(f"{'Queued' if committed else 'Unchanged'}: {source}")
+        pipeline.close()
+
+    pipeline.run(produce)
+    subprocess.run(['git', 'reset', '-q', '--hard'], cwd=repo_path, check=True)
+    print(f"{pipeline.commits} commits on {pipeline.ref}, {pipeline.bytes_sent} bytes stored")
+
+
+if __name__ == '__main__':
+    main()
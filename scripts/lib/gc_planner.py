@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+History Build Planner
+
+Computes exactly what build_history.py would commit without touching git:
+1. The first release (and any large file that is added) is planned with the
+   real GCAnalyzer + GCBuilder: one commit for the empty file plus one per
+   build step
+2. Every file present in two consecutive releases is diffed with the real
+   GCDiff.compute() and its changes are replayed, skipping changes that
+   leave the file's bytes unchanged (the no-op commits the builder skips);
+   byte-identical pairs (manifest content hashes) are not diffed at all
+3. Adds, removals and version renames are one commit each
+
+Each transition reports its commit count and the bytes of file content git
+has to hash for those commits (the size of the file after every commit).
+The analyses and diffs are independent, so they can run in a process pool.
+A projected build time is derived from the totals for each commit backend.
+"""
+
+import contextlib
+import io
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_analyzer import GCAnalyzer
+from gc_builder import GCBuilder
+from gc_diff import GCDiff, GCFileState
+from gc_loader import load_gc_file
+from release_manifest import (FILE_TYPES, RELEASES, build_content_hashes, get_release_file,
+                              get_release_pairs, get_source_path, get_target_name)
+
+# Cost model per commit backend: (seconds per commit, seconds per MB of file
+# content), added to the compute time the planner measures. The per-MB cost
+# covers serializing and hashing each file version. Least-squares fit to
+# build_history.py --jobs 1 wall-clock times for the first release alone and
+# with its first 3 and 7 transitions (131, 512 and 591 commits; 143, 1269
+# and 1525 MB) on one core with git 2.39. The fit is within about 15% of
+# those runs; other machines will differ, so treat it as an estimate.
+BACKEND_COSTS = {
+    "worktree": (0.010, 0.024),
+    "git-session": (0.020, 0.004),
+    "fast-import": (0.008, 0.010),
+    "pipeline": (0.002, 0.019),
+}
+
+
+@dataclass
+class FilePlan:
+    """Commits build_history.py would make for one file in one release"""
+    target: str
+    action: str  # initialize, add, diff, rename, remove or missing
+    commits: int = 0
+    content_bytes: int = 0  # Sum of the file's size after each commit
+    compute_seconds: float = 0.0  # Time spent analyzing/diffing
+    note: str = ""
+
+
+@dataclass
+class TransitionPlan:
+    """All file plans for one release (or release transition)"""
+    label: str
+    files: List[FilePlan] = field(default_factory=list)
+
+    @property
+    def commits(self) -> int:
+        return sum(f.commits for f in self.files)
+
+    @property
+    def content_bytes(self) -> int:
+        return sum(f.content_bytes for f in self.files)
+
+    @property
+    def compute_seconds(self) -> float:
+        return sum(f.compute_seconds for f in self.files)
+
+
+def _state_size(state: GCFileState) -> int:
+    return (len(''.join(state.header_lines).encode('utf-8'))
+            + state.abie_blocks.byte_size()
+            + len(''.join(state.footer_lines).encode('utf-8')))
+
+
+def _same_content(a: GCFileState, b: GCFileState) -> bool:
+    """Whether two states serialize to the same bytes"""
+    if ''.join(a.header_lines) != ''.join(b.header_lines):
+        return False
+    if ''.join(a.footer_lines) != ''.join(b.footer_lines):
+        return False
+    if a.abie_blocks is b.abie_blocks:
+        return True
+    if a.abie_blocks.byte_size() != b.abie_blocks.byte_size():
+        return False
+    if [x.digest for x in a.abie_blocks.values()] == [y.digest for y in b.abie_blocks.values()]:
+        return True
+    # Same bytes split differently between blocks
+    return (b''.join(x.raw for x in a.abie_blocks.values())
+            == b''.join(y.raw for y in b.abie_blocks.values()))
+
+
+def plan_build(source: str, target: str, action: str = "initialize") -> FilePlan:
+    """Plan the ABIE-by-ABIE creation of a file (GCCommitBuilder)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        document = load_gc_file(source)
+        analyzer = GCAnalyzer(source, document=document)
+        analyzer.parse()
+        analyzer.build_abies()
+        analyzer.build_dependency_graph()
+        analyzer.find_sccs_tarjan()
+        analyzer.topological_sort_sccs()
+        steps = GCBuilder(analyzer).plan_build()
+
+    # Each commit holds header + all rows added so far + footer
+    size = len(document.header) + len(document.footer)
+    content_bytes = size
+    for step in steps:
+        size += sum(len(document.row_block(row.row_num)) for row in step.rows_to_add)
+        content_bytes += size
+
+    return FilePlan(target, action, commits=len(steps) + 1, content_bytes=content_bytes,
+                    compute_seconds=time.perf_counter() - start,
+                    note=f"{len(steps)} ABIE groups")
+
+
+def plan_diff(old_file: str, new_file: str, target: str, row_level: bool = False) -> FilePlan:
+    """Plan the per-change commits for a file present in two releases"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        differ = GCDiff(old_file, new_file, row_level=row_level)
+        changes = differ.compute()
+
+        commits = content_bytes = skipped = 0
+        state = differ.old_state
+        for change in changes:
+            new_state = differ.apply_change(state, change)
+            if _same_content(state, new_state):
+                skipped += 1
+            else:
+                commits += 1
+                content_bytes += _state_size(new_state)
+            state = new_state
+
+    note = f"{len(changes)} changes"
+    if skipped:
+        note += f", {skipped} no-op"
+    return FilePlan(target, "diff", commits=commits, content_bytes=content_bytes,
+                    compute_seconds=time.perf_counter() - start, note=note)
+
+
+def _run(task: tuple) -> FilePlan:
+    kind, args = task[0], task[1:]
+    if kind == "build":
+        return plan_build(*args)
+    if kind == "diff":
+        return plan_diff(*args)
+    return args[0]  # A FilePlan that needs no computation
+
+
+def plan_history(repo_root: str, start_at: int = 0, workers: int = 1,
+                 row_level: bool = False) -> List[TransitionPlan]:
+    """
+    Plan the whole history build (mirrors HistoryBuilder.build).
+
+    Args:
+        repo_root: Repository root containing history/
+        start_at: Release index to start at (as --start-at)
+        workers: Worker processes (default: 1, runs inline)
+        row_level: Diff with row-level patches (as --row-diff)
+    """
+    repo_root = Path(repo_root)
+    hashes = build_content_hashes(repo_root)
+    plans: List[TransitionPlan] = []
+    tasks: List[tuple] = []  # One per FilePlan, in plan order
+
+    def missing(path: Path, target: str) -> bool:
+        if path.exists():
+            return False
+        tasks.append(("done", FilePlan(target, "missing", note=f"{path} not found")))
+        return True
+
+    if start_at == 0:
+        first = RELEASES[0]
+        plans.append(TransitionPlan(first["label"]))
+        source = get_source_path(repo_root, first, "entities")
+        target = get_target_name("entities", first["version"])
+        if not missing(source, target):
+            tasks.append(("build", str(source), target))
+        tasks.append(("end", plans[0]))
+
+    for old_rel, new_rel in get_release_pairs():
+        if RELEASES.index(old_rel) < start_at:
+            continue
+        plan = TransitionPlan(f"{old_rel['label']} -> {new_rel['label']}")
+        plans.append(plan)
+        is_version_change = old_rel["version"] != new_rel["version"]
+
+        for file_type in FILE_TYPES:
+            old_file = get_source_path(repo_root, old_rel, file_type)
+            new_file = get_source_path(repo_root, new_rel, file_type)
+            old_target = get_target_name(file_type, old_rel["version"])
+            new_target = get_target_name(file_type, new_rel["version"])
+
+            if old_file is None and new_file is None:
+                continue
+            elif old_file is None:
+                if missing(new_file, new_target):
+                    pass
+                elif file_type == "endorsed":
+                    tasks.append(("build", str(new_file), new_target, "add"))
+                else:
+                    size = new_file.stat().st_size
+                    tasks.append(("done", FilePlan(new_target, "add", 1, size)))
+            elif new_file is None:
+                tasks.append(("done", FilePlan(old_target, "remove", 1)))
+            else:
+                if is_version_change:
+                    tasks.append(("done", FilePlan(new_target, "rename", 1,
+                                                   note=f"from {old_target}")))
+                old_hash = hashes.get(get_release_file(old_rel, file_type))
+                if old_hash is not None and old_hash == hashes.get(get_release_file(new_rel, file_type)):
+                    tasks.append(("done", FilePlan(new_target, "diff", note="identical")))
+                elif not (missing(old_file, new_target) or missing(new_file, new_target)):
+                    tasks.append(("diff", str(old_file), str(new_file), new_target, row_level))
+
+        # Marks where this transition's tasks end
+        tasks.append(("end", plan))
+
+    work = [t for t in tasks if t[0] != "end"]
+    if workers <= 1:
+        results = [_run(t) for t in work]
+    else:
+        # spawn, like build_history.py's diff pool, so workers inherit no
+        # pipes or locks from the parent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            results = list(pool.map(_run, work))
+
+    # Distribute the results over their transitions, in order
+    pending = iter(results)
+    current: List[FilePlan] = []
+    for task in tasks:
+        if task[0] == "end":
+            task[1].files = current
+            current = []
+        else:
+            current.append(next(pending))
+    return plans
+
+
+def projected_seconds(plans: List[TransitionPlan], backend: str) -> float:
+    """Estimated build time for a commit backend (see BACKEND_COSTS)"""
+    per_commit, per_mb = BACKEND_COSTS[backend]
+    commits = sum(p.commits for p in plans)
+    mb = sum(p.content_bytes for p in plans) / 1e6
+    return sum(p.compute_seconds for p in plans) + commits * per_commit + mb * per_mb
+
+
+def format_plan(plans: List[TransitionPlan], verbose: bool = False) -> str:
+    """Human-readable report of a plan"""
+    lines = [f"{'Release / transition':<40s} {'commits':>8s} {'MB':>9s} {'compute':>8s}",
+             "-" * 68]
+    for plan in plans:
+        lines.append(f"{plan.label:<40s} {plan.commits:8d} "
+                     f"{plan.content_bytes / 1e6:9.1f} {plan.compute_seconds:7.2f}s")
+        if verbose:
+            for f in plan.files:
+                detail = f" ({f.note})" if f.note else ""
+                lines.append(f"  {f.action:<10s} {f.target}: {f.commits} commits{detail}")
+    lines.append("-" * 68)
+    commits = sum(p.commits for p in plans)
+    content = sum(p.content_bytes for p in plans)
+    compute = sum(p.compute_seconds for p in plans)
+    lines.append(f"{'Total':<40s} {commits:8d} {content / 1e6:9.1f} {compute:7.2f}s")
+    missing = [f for p in plans for f in p.files if f.action == "missing"]
+    if missing:
+        lines.append(f"\n{len(missing)} source files not found (not counted)")
+    lines.append("\nProjected build time:")
+    for backend in BACKEND_COSTS:
+        lines.append(f"  {backend:<12s} {projected_seconds(plans, backend):8.1f}s")
+    return "\n".join(lines)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('-')]
+    flags = [a for a in sys.argv[1:] if a.startswith('-')]
+    if len(args) < 1 or any(f not in ('-v', '--rows') for f in flags):
+        print("Usage: gc_planner.py [-v] [--rows] <repo-root> [start-at] [workers]")
+        sys.exit(1)
+
+    plans = plan_history(args[0],
+                         start_at=int(args[1]) if len(args) > 1 else 0,
+                         workers=int(args[2]) if len(args) > 2 else 1,
+                         row_level='--rows' in flags)
+    print(format_plan(plans, verbose='-v' in flags))
+
+
+if __name__ == '__main__':
+    main()
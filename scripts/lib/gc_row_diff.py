@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+GenericCode Row-Level Differ
+
+Diffs the rows of one ABIE between two GenericCode files, keyed by
+DictionaryEntryName, and produces a RowPatch:
+1. Row changes (add, remove, modify, move) for reporting
+2. A recipe for the new block: runs of the current block's bytes that are
+   kept, interleaved with rows taken from the new file
+
+Applying a patch only slices and concatenates TextBlocks, so the cost is
+proportional to the number of changed rows rather than to the size of the
+ABIE, and unchanged rows are never copied. Rows are compared by the
+loader's content digests (column-adjusted when columns were removed).
+"""
+
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Collection, List, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_blocks import longest_increasing_subsequence
+from gc_loader import GCDocument, TextBlock, load_gc_file, remove_columns
+
+ROW_KEY = 'DictionaryEntryName'
+
+
+@dataclass
+class RowPatch:
+    """Row-level edit turning one version of an ABIE block into another"""
+    base_length: int  # Byte length of the block the patch applies to
+    base_digest: bytes  # Content digest of that block
+    recipe: List[Union[Tuple[int, int], TextBlock]] = field(default_factory=list)  # (start, end) of base, or new rows
+    changes: List[Tuple[str, str]] = field(default_factory=list)  # (row_add|row_remove|row_modify|row_move, DEN)
+
+    def apply(self, block: TextBlock) -> Optional[TextBlock]:
+        """Build the new block from block, or None if block is not the patch's base"""
+        if len(block) != self.base_length or block.digest != self.base_digest:
+            return None
+        return TextBlock.concat([
+            block.slice(*piece) if isinstance(piece, tuple) else piece
+            for piece in self.recipe
+        ])
+
+    def summary(self) -> str:
+        """Short description such as '3 rows: 2 modified, 1 added'"""
+        counts = {}
+        for kind, _ in self.changes:
+            counts[kind] = counts.get(kind, 0) + 1
+        parts = []
+        for kind, label in (('row_modify', 'modified'), ('row_add', 'added'),
+                            ('row_remove', 'removed'), ('row_move', 'moved')):
+            if kind in counts:
+                parts.append(f"{counts[kind]} {label}")
+        if not parts:
+            return 'no row changes'
+        total = len(self.changes)
+        return f"{total} row{'s' if total != 1 else ''}: " + ', '.join(parts)
+
+
+def _row_keys(doc: GCDocument, row_nums: List[int]) -> Optional[List[str]]:
+    """DictionaryEntryName of each row, or None if they are not unique keys"""
+    keys = [doc.row_values[n].get(ROW_KEY) for n in row_nums]
+    if not all(keys) or len(set(keys)) != len(keys):
+        return None
+    return keys
+
+
+def diff_abie_rows(old_doc: GCDocument, old_rows: List[int],
+                   new_doc: GCDocument, new_rows: List[int],
+                   removed_columns: Collection[str] = ()) -> Optional[RowPatch]:
+    """
+    Diff two versions of an ABIE's rows.
+
+    The patch applies to the old rows as they are after removed_columns
+    have been stripped. Returns None when rows cannot be keyed (missing or
+    duplicate DictionaryEntryNames); callers then replace the whole block.
+    """
+    old_keys = _row_keys(old_doc, old_rows)
+    new_keys = _row_keys(new_doc, new_rows)
+    if old_keys is None or new_keys is None:
+        return None
+
+    # Byte span and digest of each old row within the (column-adjusted) block
+    old_blocks = [old_doc.row_block(n) for n in old_rows]
+    if removed_columns:
+        old_blocks = [remove_columns(block, removed_columns) for block in old_blocks]
+    old_spans = []
+    offset = 0
+    for block in old_blocks:
+        old_spans.append((offset, offset + len(block)))
+        offset += len(block)
+
+    old_index = {key: i for i, key in enumerate(old_keys)}
+    new_index = {key: i for i, key in enumerate(new_keys)}
+
+    # Common rows that keep their relative order; the rest of the common
+    # unchanged rows are moves
+    common = [i for i, key in enumerate(old_keys) if key in new_index]
+    in_place = set(common[k] for k in longest_increasing_subsequence(
+        [new_index[old_keys[i]] for i in common]))
+
+    changes = [('row_remove', key) for key in old_keys if key not in new_index]
+
+    recipe: List[Union[Tuple[int, int], TextBlock]] = []
+    for key, row_num in zip(new_keys, new_rows):
+        i = old_index.get(key)
+        if i is not None and old_blocks[i].digest == new_doc.row_digest(row_num):
+            if i not in in_place:
+                changes.append(('row_move', key))
+            start, end = old_spans[i]
+            if recipe and isinstance(recipe[-1], tuple) and recipe[-1][1] == start:
+                recipe[-1] = (recipe[-1][0], end)
+            else:
+                recipe.append((start, end))
+        else:
+            changes.append(('row_modify' if i is not None else 'row_add', key))
+            recipe.append(new_doc.row_block(row_num))
+
+    return RowPatch(base_length=offset, base_digest=TextBlock.concat(old_blocks).digest,
+                    recipe=recipe, changes=changes)
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: gc_row_diff.py <old-gc-file> <new-gc-file> <object-class>")
+        sys.exit(1)
+
+    old_doc = load_gc_file(sys.argv[1])
+    new_doc = load_gc_file(sys.argv[2])
+    object_class = sys.argv[3]
+    if object_class not in old_doc.abie_groups or object_class not in new_doc.abie_groups:
+        print(f"ABIE \"{object_class}\" is not in both files")
+        sys.exit(1)
+
+    removed = set(old_doc.columns) - set(new_doc.columns)
+    patch = diff_abie_rows(old_doc, old_doc.abie_groups[object_class],
+                           new_doc, new_doc.abie_groups[object_class], removed)
+    if patch is None:
+        print("Rows cannot be keyed by DictionaryEntryName; the block is replaced whole")
+        return
+
+    print(f"{object_class}: {patch.summary()}")
+    for kind, key in patch.changes:
+        print(f"  [{kind:10s}] {key}")
+    kept = sum(piece[1] - piece[0] for piece in patch.recipe if isinstance(piece, tuple))
+    print(f"  {kept} of {patch.base_length} bytes kept from the old block")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Cross-Release Full-Text Index
+
+Substring and phrase search over the free-text columns (Definition,
+AlternativeBusinessTerms, Examples and the notes columns) of every release,
+answered from a prebuilt trigram index instead of a scan of the archive:
+1. Texts: each distinct (column, text) is stored once, with the rows and
+   releases it occurs in (a definition usually survives many releases
+   unchanged, so this is far smaller than the archive)
+2. Trigrams: every 3-character sequence of a text's normalised form
+   (case-folded, whitespace collapsed) maps to the sorted ids of the
+   texts that contain it (a uint32 count, then the ids)
+3. Queries: the posting lists of the query's trigrams are intersected,
+   smallest first, by binary search; the few surviving candidates are
+   then checked against the text itself. Queries shorter than three
+   characters fall back to checking every text
+4. Storage: one gc_keyfile table holding the trigram postings, the texts
+   and their occurrences, and the DictionaryEntryNames they belong to,
+   memory-mapped on open
+
+A phrase query matches whole words in order ("tax total" matches "the Tax
+Total amount" but not "syntax totals"); a substring query matches anywhere.
+"""
+
+import bisect
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_keyfile import KeyFile, default_index_path, open_current, release_fingerprint, write_key_file
+from gc_loader import load_gc_file
+from gc_row_diff import ROW_KEY
+from release_manifest import FILE_TYPES, RELEASES, build_content_hashes, get_release_file
+
+TEXT_COLUMNS = ('Definition', 'AlternativeBusinessTerms', 'Examples', 'AnalystNotes', 'EditorsNotes')
+INDEX_FORMAT = 1
+MAGIC = b'text\0\0\0\0'
+DEFAULT_INDEX_FILE = 'text.idx'
+
+# Key spaces in the key file
+_TRIGRAM, _TEXT, _DEN = b'g', b't', b'd'
+_ID = struct.Struct('>I')  # Big-endian, so ids sort numerically as key suffixes
+_TEXT_HEADER = struct.Struct('<HxxI')  # column id, occurrence count
+_OCCURRENCE = struct.Struct('<HBxII')  # release, file type, row number, DEN id
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """The form texts are indexed and matched in: case-folded, single spaces"""
+    return _WHITESPACE_RE.sub(' ', text).strip().casefold()
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass(frozen=True)
+class TextHit:
+    """One row whose text matched"""
+    release: str  # Release label
+    file_type: str  # entities, signature or endorsed
+    row: int  # Row number in the file (1-based)
+    dictionary_entry_name: str
+    column: str  # ColumnRef the text is in
+    text: str
+
+
+def build_text_index(repo_root: str, path: str, verbose: bool = False) -> int:
+    """
+    Index the free-text columns of every release file and write the index to path.
+
+    Returns:
+        Size of the index file in bytes
+    """
+    repo_root = str(repo_root)
+    hashes = build_content_hashes(repo_root)
+    text_ids: Dict[Tuple[int, str], int] = {}  # (column id, text) -> text id
+    occurrences: List[bytearray] = []  # text id -> packed _OCCURRENCEs
+    den_ids: Dict[str, int] = {}
+    by_content: Dict[str, List[Tuple[int, int, int]]] = {}  # content hash -> (text id, row, DEN id)
+
+    for release_id, release in enumerate(RELEASES):
+        for type_id, file_type in enumerate(FILE_TYPES):
+            rel_path = get_release_file(release, file_type)
+            content_hash = hashes.get(rel_path) if rel_path else None
+            if content_hash is None:
+                continue
+            if content_hash not in by_content:
+                doc = load_gc_file(os.path.join(repo_root, rel_path), content_hash)
+                entries = []
+                for row_num, values in doc.row_values.items():
+                    den_id = den_ids.setdefault(values.get(ROW_KEY, '').strip(), len(den_ids))
+                    for column_id, column in enumerate(TEXT_COLUMNS):
+                        text = values.get(column, '').strip()
+                        if not text:
+                            continue
+                        text_id = text_ids.setdefault((column_id, text), len(text_ids))
+                        if text_id == len(occurrences):
+                            occurrences.append(bytearray())
+                        entries.append((text_id, row_num, den_id))
+                by_content[content_hash] = entries
+            for text_id, row_num, den_id in by_content[content_hash]:
+                occurrences[text_id] += _OCCURRENCE.pack(release_id, type_id, row_num, den_id)
+            if verbose:
+                print(f"  {release['label']} {file_type}: {len(text_ids)} distinct texts so far")
+
+    postings: Dict[str, array] = {}
+    entries = []
+    for (column_id, text), text_id in text_ids.items():
+        for trigram in trigrams(normalize(text)):
+            postings.setdefault(trigram, array('I')).append(text_id)
+        occurrence_data = occurrences[text_id]
+        entries.append((_TEXT + _ID.pack(text_id),
+                        _TEXT_HEADER.pack(column_id, len(occurrence_data) // _OCCURRENCE.size)
+                        + occurrence_data + text.encode('utf-8')))
+    entries.extend((_TRIGRAM + trigram.encode('utf-8'), array('I', [len(ids)]).tobytes() + ids.tobytes())
+                   for trigram, ids in postings.items())
+    entries.extend((_DEN + _ID.pack(den_id), den.encode('utf-8')) for den, den_id in den_ids.items())
+
+    return write_key_file(path, MAGIC, {
+        'fingerprint': _fingerprint(hashes),
+        'releases': [release['label'] for release in RELEASES],
+        'file_types': list(FILE_TYPES),
+        'columns': list(TEXT_COLUMNS),
+        'texts': len(text_ids),
+        'trigrams': len(postings),
+    }, entries)
+
+
+def _fingerprint(hashes: Dict[str, str]) -> str:
+    return release_fingerprint(hashes, MAGIC.decode().rstrip('\0'), INDEX_FORMAT, TEXT_COLUMNS)
+
+
+class TextIndex:
+    """Read-only view of a full-text index file"""
+
+    def __init__(self, keys: KeyFile):
+        self._keys = keys
+        self.releases: List[str] = keys.metadata['releases']
+        self.file_types: List[str] = keys.metadata['file_types']
+        self.columns: List[str] = keys.metadata['columns']
+        # Texts and DENs are keyed by consecutive ids, so id -> key position is arithmetic
+        self._texts = keys.prefix_range(_TEXT)
+        self._dens = keys.prefix_range(_DEN)
+
+    @classmethod
+    def open(cls, path: str) -> 'TextIndex':
+        return cls(KeyFile(path, MAGIC))
+
+    @classmethod
+    def load_or_build(cls, repo_root: str, path: Optional[str] = None,
+                      rebuild: bool = False, verbose: bool = False) -> 'TextIndex':
+        """
+        Open the index at path (default: .cache/ubl-gc/text.idx under
+        repo_root), building it first if it is missing, unreadable or was
+        built from different release files.
+        """
+        path = path or default_index_path(repo_root, DEFAULT_INDEX_FILE)
+        if not rebuild:
+            keys = open_current(path, MAGIC, _fingerprint(build_content_hashes(str(repo_root))))
+            if keys is not None:
+                return cls(keys)
+        build_text_index(repo_root, path, verbose=verbose)
+        return cls.open(path)
+
+    def __len__(self) -> int:
+        """Number of distinct texts"""
+        return len(self._texts)
+
+    def close(self) -> None:
+        self._keys.close()
+
+    def _text(self, text_id: int) -> Tuple[int, str]:
+        """(column id, text) of a text id"""
+        payload = self._keys.payload(self._texts[text_id])
+        column_id, count = _TEXT_HEADER.unpack_from(payload)
+        start = _TEXT_HEADER.size + count * _OCCURRENCE.size
+        return column_id, bytes(payload[start:]).rstrip(b'\0').decode('utf-8')
+
+    def _occurrences(self, text_id: int) -> Iterable[Tuple[int, int, int, int]]:
+        payload = self._keys.payload(self._texts[text_id])
+        _, count = _TEXT_HEADER.unpack_from(payload)
+        return _OCCURRENCE.iter_unpack(payload[_TEXT_HEADER.size:_TEXT_HEADER.size + count * _OCCURRENCE.size])
+
+    def _den(self, den_id: int) -> str:
+        return bytes(self._keys.payload(self._dens[den_id])).rstrip(b'\0').decode('utf-8')
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        """Text ids that contain every trigram of the normalised query"""
+        grams = trigrams(query)
+        if not grams:
+            return range(len(self._texts))
+        lists = []
+        for gram in grams:
+            i = self._keys.find(_TRIGRAM + gram.encode('utf-8'))
+            if i is None:
+                return []
+            words = self._keys.payload(i).cast('I')
+            lists.append(words[1:1 + words[0]])
+        lists.sort(key=len)
+        candidates = []
+        for text_id in lists[0]:
+            for ids in lists[1:]:
+                i = bisect.bisect_left(ids, text_id)
+                if i == len(ids) or ids[i] != text_id:
+                    break
+            else:
+                candidates.append(text_id)
+        return candidates
+
+    def search(self, query: str, phrase: bool = False,
+               columns: Optional[Iterable[str]] = None) -> Dict[str, List[TextHit]]:
+        """
+        Find the rows whose text contains query.
+
+        Args:
+            query: Text to find (case and whitespace are ignored)
+            phrase: Match whole words only
+            columns: Restrict to these ColumnRefs (default: all indexed columns)
+
+        Returns:
+            Release label -> hits in that release, releases in manifest order
+        """
+        needle = normalize(query)
+        column_ids = {self.columns.index(c) for c in columns} if columns else None
+        pattern = re.compile(r'(?<!\w)' + re.escape(needle) + r'(?!\w)') if phrase else None
+
+        hits: Dict[int, List[TextHit]] = {}
+        for text_id in self._candidates(needle):
+            column_id, text = self._text(text_id)
+            if column_ids is not None and column_id not in column_ids:
+                continue
+            haystack = normalize(text)
+            if not (pattern.search(haystack) if pattern else needle in haystack):
+                continue
+            for release, file_type, row, den_id in self._occurrences(text_id):
+                hits.setdefault(release, []).append(TextHit(
+                    self.releases[release], self.file_types[file_type], row,
+                    self._den(den_id), self.columns[column_id], text))
+
+        return {self.releases[release]: sorted(hits[release], key=lambda h: (h.file_type, h.row))
+                for release in sorted(hits)}
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) < 2:
+        print("Usage: gc_text_index.py <repo-root> [--rebuild] [--phrase] [--column=<ColumnRef>] <query>")
+        print(f"\nSearches {', '.join(TEXT_COLUMNS)} in every release.")
+        print("Builds .cache/ubl-gc/text.idx on first use.")
+        sys.exit(1)
+
+    repo_root, query = args[0], ' '.join(args[1:])
+    columns = [arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--column=')]
+    start = time.perf_counter()
+    index = TextIndex.load_or_build(repo_root, rebuild='--rebuild' in sys.argv, verbose=True)
+    print(f"Text index of {len(index)} distinct texts ready in {time.perf_counter() - start:.2f}s\n")
+
+    start = time.perf_counter()
+    results = index.search(query, phrase='--phrase' in sys.argv, columns=columns or None)
+    elapsed = time.perf_counter() - start
+    total = sum(len(hits) for hits in results.values())
+    print(f"{query!r}: {total} hits in {len(results)} releases (query {elapsed * 1000:.1f} ms)")
+    for release, hits in results.items():
+        print(f"  {release}: {len(hits)} hits")
+        for hit in hits[:5]:
+            print(f"    row {hit.row} {hit.dictionary_entry_name} [{hit.column}]")
+        if len(hits) > 5:
+            print(f"    ... {len(hits) - 5} more")
+
+
+if __name__ == '__main__':
+    main()
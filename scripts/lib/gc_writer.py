@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Incremental GenericCode File Writer
+
+Keeps one .gc file on disk in step with successive GCFileStates while a
+transition is replayed, instead of rewriting the whole file after every
+ChangeOp (GCDiff.write_state). Each write only touches the bytes that can
+have changed:
+1. A block replaced by one of the same size is overwritten in place
+2. Otherwise the file is rewritten from the first changed byte onwards
+   (the first affected ABIE, the first changed header byte, or the footer)
+   and truncated
+
+Byte offsets come from the state's BlockMap, which keeps running block
+sizes, so locating a change is O(log n). Because the file only changes
+from the first affected block on, per-commit I/O is the size of the
+change plus whatever follows it, not the size of the file.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gc_diff import ChangeOp, GCDiff, GCFileState
+
+
+def _encode(lines) -> bytes:
+    return ''.join(lines).encode('utf-8')
+
+
+def _encode_state(state: GCFileState, header: bytes, footer: bytes) -> bytes:
+    return header + b''.join(block.raw for block in state.abie_blocks.values()) + footer
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Length of the common prefix of two byte strings"""
+    # Binary search over memoryview slices: O(log n) comparisons, each a
+    # memcmp of the untested span, instead of a Python step per byte
+    a, b = memoryview(a), memoryview(b)
+    lo, hi = 0, min(len(a), len(b))  # a[:lo] == b[:lo]; they differ before hi
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class IncrementalWriter:
+    """Writes successive GCFileStates to one file, touching only changed bytes"""
+
+    def __init__(self, file_path: str, state: Optional[GCFileState] = None):
+        """
+        Args:
+            file_path: The .gc file to maintain
+            state: What the file currently contains, if known. It is only
+                   trusted if the file holds exactly those bytes; otherwise
+                   the first write rewrites the whole file.
+        """
+        self.file_path = Path(file_path)
+        self.state: Optional[GCFileState] = None
+        self.bytes_written = 0
+        self._header = b''
+        self._footer = b''
+
+        if state is not None and self.file_path.exists():
+            header = _encode(state.header_lines)
+            footer = _encode(state.footer_lines)
+            size = len(header) + state.abie_blocks.byte_size() + len(footer)
+            if (self.file_path.stat().st_size == size
+                    and self.file_path.read_bytes() == _encode_state(state, header, footer)):
+                self.state, self._header, self._footer = state, header, footer
+
+    def write(self, state: GCFileState, change: Optional[ChangeOp] = None) -> int:
+        """
+        Bring the file to state and return the number of bytes written.
+
+        change must be the single ChangeOp that produced state from the
+        previously written state; without it the whole file is rewritten.
+        """
+        old = self.state
+        if old is None or change is None:
+            return self._rewrite_all(state)
+
+        header = self._header if state.header_lines is old.header_lines else _encode(state.header_lines)
+        footer = self._footer if state.footer_lines is old.footer_lines else _encode(state.footer_lines)
+        old_blocks, new_blocks = old.abie_blocks, state.abie_blocks
+
+        with open(self.file_path, 'r+b') as f:
+            if header != self._header:
+                start = _common_prefix(header, self._header)
+                if new_blocks is old_blocks and len(header) == len(self._header):
+                    # Same-size header edit: overwrite the differing part
+                    written = self._write_at(f, start, header[start:])
+                else:
+                    written = self._write_tail(f, start, header[start:], state, 0, footer)
+            elif new_blocks is not old_blocks:
+                written = self._write_blocks(f, header, old_blocks, state, change, footer)
+            elif footer != self._footer:
+                start = len(header) + new_blocks.byte_size()
+                written = self._write_tail(f, start, b'', state, len(new_blocks), footer)
+            else:
+                written = 0
+
+        self.state, self._header, self._footer = state, header, footer
+        return written
+
+    def _write_blocks(self, f, header: bytes, old_blocks, state: GCFileState,
+                      change: ChangeOp, footer: bytes) -> int:
+        """Write an ABIE-level change: in place if possible, else from the ABIE on"""
+        new_blocks = state.abie_blocks
+        name = change.details.get('object_class')
+        if name is None:
+            # Changes that touch every block (column structure)
+            return self._write_tail(f, len(header), b'', state, 0, footer)
+
+        in_old, in_new = name in old_blocks, name in new_blocks
+        old_idx = old_blocks.index(name) if in_old else len(old_blocks)
+        new_idx = new_blocks.index(name) if in_new else len(new_blocks)
+
+        if (in_old and in_new and old_idx == new_idx
+                and len(old_blocks[name]) == len(new_blocks[name])):
+            # Same position, same size: only this block's bytes change
+            offset = len(header) + new_blocks.byte_offset(new_idx)
+            return self._write_at(f, offset, new_blocks[name].raw)
+
+        # Everything before the first affected position is unchanged
+        first = min(old_idx, new_idx)
+        offset = len(header) + new_blocks.byte_offset(first)
+        return self._write_tail(f, offset, b'', state, first, footer)
+
+    def _write_at(self, f, offset: int, data: bytes) -> int:
+        f.seek(offset)
+        f.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def _write_tail(self, f, offset: int, prefix: bytes, state: GCFileState,
+                    first_block: int, footer: bytes) -> int:
+        """Rewrite the file from offset: prefix, blocks from first_block on, footer"""
+        f.seek(offset)
+        f.write(prefix)
+        for _, block in state.abie_blocks.items(first_block):
+            block.write_to(f)
+        f.write(footer)
+        f.truncate()
+        written = f.tell() - offset
+        self.bytes_written += written
+        return written
+
+    def _rewrite_all(self, state: GCFileState) -> int:
+        GCDiff.write_state(state, str(self.file_path))
+        self.state = state
+        self._header = _encode(state.header_lines)
+        self._footer = _encode(state.footer_lines)
+        written = os.path.getsize(self.file_path)
+        self.bytes_written += written
+        return written
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: gc_writer.py <old-gc-file> <new-gc-file> <output-file>")
+        sys.exit(1)
+
+    differ = GCDiff(sys.argv[1], sys.argv[2])
+    changes = differ.compute()
+
+    state = differ.old_state
+    writer = IncrementalWriter(sys.argv[3])
+    writer.write(state)
+    full = writer.bytes_written
+    for change in changes:
+        state = differ.apply_change(state, change)
+        writer.write(state, change)
+
+    print(f"Applied {len(changes)} changes to {sys.argv[3]}")
+    print(f"  {writer.bytes_written - full} bytes written incrementally "
+          f"(about {full * len(changes)} with a full rewrite per change)")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,12 @@ Verified against actual filesystem on 2026-02-13.
 All file paths relative to repository root.
 """
 
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 # All 35 UBL releases in chronological order
 RELEASES = [
     # ========== UBL 2.0 (2006) - 8 releases ==========
@@ -408,7 +414,6 @@ RELEASES = [
 # Validation: ensure all files exist on disk
 def validate_manifest():
     """Verify that all files referenced in the manifest exist on disk."""
-    import os
     repo_root = "/home/user/ubl-gc"
     missing = []
 
@@ -508,6 +513,118 @@ def get_all_versions():
             seen.append(release['version'])
     return seen
 
+FILE_TYPES = ('entities', 'signature', 'endorsed')
+
+
+def get_release_file(release, file_type):
+    """Repository-relative path of one of a release's files, or None.
+
+    Args:
+        release: Release dict from RELEASES
+        file_type: One of 'entities', 'signature', 'endorsed'
+    """
+    if file_type not in FILE_TYPES:
+        raise ValueError(f"Unknown file type: {file_type}")
+    filename = release[f'{file_type}_file']
+    if filename is None:
+        return None
+    return f"{release['dir']}/{filename}"
+
+
+def get_source_path(repo_root, release, file_type):
+    """Path of one of a release's files under repo_root, or None."""
+    rel_path = get_release_file(release, file_type)
+    return None if rel_path is None else Path(repo_root) / rel_path
+
+
+def get_target_name(file_type, version):
+    """Versioned filename a release file is committed as on the history branch.
+
+    Preserves the original OASIS naming convention with version numbers.
+    At version transitions the file is renamed.
+    """
+    if file_type == 'entities':
+        return f"UBL-Entities-{version}.gc"
+    elif file_type == 'signature':
+        return f"UBL-Signature-Entities-{version}.gc"
+    elif file_type == 'endorsed':
+        return f"UBL-Endorsed-Entities-{version}.gc"
+    else:
+        raise ValueError(f"Unknown file type: {file_type}")
+
+
+def build_content_hashes(repo_root, cache_file=None, workers=None):
+    """Compute the SHA-256 of every release file, in parallel.
+
+    Several releases ship byte-identical files, which callers can detect
+    (and skip) by comparing hashes. Hashes are cached in a JSON file
+    keyed by path and only recomputed when a file's mtime or size changes.
+
+    Args:
+        repo_root: Repository root the manifest paths are relative to
+        cache_file: JSON cache (default: .cache/ubl-gc/content-hashes.json)
+        workers: Hashing threads (default: ThreadPoolExecutor's default)
+
+    Returns:
+        Dict of repository-relative path -> hex digest (missing files omitted)
+    """
+    repo_root = str(repo_root)
+    if cache_file is None:
+        cache_file = os.path.join(repo_root, '.cache', 'ubl-gc', 'content-hashes.json')
+
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+
+    def file_hash(rel_path):
+        """(path, [mtime_ns, size, digest]) or None if the file is missing"""
+        try:
+            st = os.stat(os.path.join(repo_root, rel_path))
+        except FileNotFoundError:
+            return None
+        entry = cached.get(rel_path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return rel_path, entry
+        h = hashlib.sha256()
+        with open(os.path.join(repo_root, rel_path), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return rel_path, [st.st_mtime_ns, st.st_size, h.hexdigest()]
+
+    paths = sorted({get_release_file(r, t) for r in RELEASES for t in FILE_TYPES} - {None})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = dict(e for e in pool.map(file_hash, paths) if e is not None)
+
+    if entries != cached:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, cache_file)
+
+    return {path: entry[2] for path, entry in entries.items()}
+
+
+def get_identical_pairs(hashes):
+    """Release transitions whose file of some type is byte-identical.
+
+    Args:
+        hashes: Result of build_content_hashes()
+
+    Returns:
+        List of (old_release, new_release, file_type) tuples.
+    """
+    identical = []
+    for old, new in get_release_pairs():
+        for file_type in FILE_TYPES:
+            old_hash = hashes.get(get_release_file(old, file_type))
+            if old_hash is not None and old_hash == hashes.get(get_release_file(new, file_type)):
+                identical.append((old, new, file_type))
+    return identical
+
+
 # Statistics
 TOTAL_RELEASES = len(RELEASES)
 TOTAL_ENTITIES_FILES = sum(1 for r in RELEASES if r['entities_file'])
@@ -541,6 +658,13 @@ if __name__ == '__main__':
     print(f"Version transitions (require 6-step commits): {len(get_version_transitions())}")
     print()
 
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    identical = get_identical_pairs(build_content_hashes(repo_root))
+    print(f"Byte-identical files between consecutive releases: {len(identical)}")
+    for old, new, file_type in identical:
+        print(f"  {old['label']} -> {new['label']}: {file_type}")
+    print()
+
     # Validate manifest
     missing = validate_manifest()
     if missing: